@@ -1,6 +1,10 @@
+import os
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from project.wsgi import application as app  # noqa
+if os.environ.get("VOTING_ASGI"):
+    from project.asgi import application as app  # noqa
+else:
+    from project.wsgi import application as app  # noqa
@@ -70,6 +70,7 @@ MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "voting.middleware.AdmissionControlMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -93,6 +94,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "project.wsgi.application"
+ASGI_APPLICATION = "project.asgi.application"
 
 
 # Database
@@ -192,3 +194,77 @@ ACCOUNT_EMAIL_VERIFICATION = "none"
 ACCOUNT_USER_MODEL_EMAIL_FIELD = None
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
+
+
+# Voting
+
+# Taille des clés RSA générées pour chaque vote
+VOTING_KEY_SIZE = int(os.environ.get("VOTING_KEY_SIZE", "2048"))
+
+# Nombre maximal de bulletins acceptés en une seule requête d'envoi groupé
+VOTING_BATCH_MAX_BALLOTS = int(os.environ.get("VOTING_BATCH_MAX_BALLOTS", "10000"))
+
+# Nombre maximal de jetons vérifiés en une seule requête de recherche groupée (/vote/<uuid>/lookup)
+VOTING_LOOKUP_MAX_TOKENS = int(os.environ.get("VOTING_LOOKUP_MAX_TOKENS", "10000"))
+
+# Nombre maximal de votes d'une requête de session (clés publiques ou signatures)
+VOTING_SESSION_MAX_VOTES = int(os.environ.get("VOTING_SESSION_MAX_VOTES", "100"))
+
+# Pool de processus dédiés à la signature (0 : signature dans le thread de la requête)
+VOTING_SIGNING_WORKERS = int(os.environ.get("VOTING_SIGNING_WORKERS", "0"))
+# Nombre maximal de signatures en attente dans le pool avant de répondre 503
+VOTING_SIGNING_QUEUE_SIZE = int(os.environ.get("VOTING_SIGNING_QUEUE_SIZE", "64"))
+# Délai maximal (en secondes) d'une signature dans le pool
+VOTING_SIGNING_TIMEOUT = float(os.environ.get("VOTING_SIGNING_TIMEOUT", "10"))
+
+# Moteur de calcul RSA : "auto" (le plus rapide disponible), "gmpy2", "cryptography" ou "python"
+VOTING_CRYPTO_BACKEND = os.environ.get("VOTING_CRYPTO_BACKEND", "auto")
+
+# Taille maximale (en caractères) du JSON d'un bulletin, vérifiée avant tout décodage
+VOTING_MAX_BALLOT_SIZE = int(os.environ.get("VOTING_MAX_BALLOT_SIZE", "65536"))
+
+# Dossier du journal local des bulletins en attente d'enregistrement (vide : enregistrement immédiat)
+VOTING_BALLOT_LOG_DIR = os.environ.get("VOTING_BALLOT_LOG_DIR", "")
+
+# Variantes asynchrones des vues de signature, de dépôt et de consultation (déploiement ASGI)
+VOTING_ASYNC_VIEWS = bool(int(os.environ.get("VOTING_ASYNC_VIEWS", "0")))
+
+# Durée de vie (en secondes) des métadonnées de vote gardées en mémoire et dans le cache de Django
+VOTING_METADATA_CACHE_TTL = int(os.environ.get("VOTING_METADATA_CACHE_TTL", "30"))
+
+# Contrôle d'admission des points d'entrée de signature, de dépôt et de lecture (voir voting/middleware.py)
+VOTING_ADMISSION_CONTROL = bool(int(os.environ.get("VOTING_ADMISSION_CONTROL", "0")))
+
+# Nombre maximal de requêtes traitées simultanément par processus, par catégorie de point d'entrée
+# (0 : pas de limite) ; au-delà, réponse 503 immédiate
+VOTING_CONCURRENCY_LIMITS = {
+    "sign": int(os.environ.get("VOTING_SIGN_CONCURRENCY", "4")),
+    "submit": int(os.environ.get("VOTING_SUBMIT_CONCURRENCY", "8")),
+    "read": int(os.environ.get("VOTING_READ_CONCURRENCY", "64")),
+}
+
+# Débit autorisé par catégorie, en (requêtes par seconde, rafale), par utilisateur pour la signature
+# et par adresse IP pour le reste (0 requête par seconde : pas de limite) ; au-delà, réponse 429
+VOTING_RATE_LIMITS = {
+    "sign": (float(os.environ.get("VOTING_SIGN_RATE", "1")), int(os.environ.get("VOTING_SIGN_BURST", "10"))),
+    "submit": (float(os.environ.get("VOTING_SUBMIT_RATE", "20")), int(os.environ.get("VOTING_SUBMIT_BURST", "200"))),
+    "read": (float(os.environ.get("VOTING_READ_RATE", "50")), int(os.environ.get("VOTING_READ_BURST", "500"))),
+}
+
+# Stockage des seaux à jetons : "local" (mémoire de chaque processus : avec N processus, le débit
+# réellement autorisé est N fois VOTING_RATE_LIMITS) ou "cache" (cache de Django, partagé)
+VOTING_RATE_LIMIT_STORE = os.environ.get("VOTING_RATE_LIMIT_STORE", "local")
+
+# Clé de request.META contenant l'adresse IP du client : "REMOTE_ADDR" sans proxy, l'en-tête posé par
+# le proxy sinon (ex. "HTTP_X_FORWARDED_FOR") ; obligatoire si des limites par adresse IP sont actives
+VOTING_CLIENT_IP_HEADER = os.environ.get("VOTING_CLIENT_IP_HEADER", "")
+
+# Nombre de proxys de confiance qui ajoutent une adresse à VOTING_CLIENT_IP_HEADER : l'adresse du
+# client est la N-ième en partant de la droite (les entrées plus à gauche viennent du client)
+VOTING_TRUSTED_PROXY_COUNT = max(1, int(os.environ.get("VOTING_TRUSTED_PROXY_COUNT", "1")))
+
+# Durée (en secondes) pendant laquelle un CDN peut servir l'empreinte ou la racine de l'urne sans la revalider
+VOTING_BOARD_MAX_AGE = int(os.environ.get("VOTING_BOARD_MAX_AGE", "5"))
+
+# Nombre maximal de bulletins par page du flux des bulletins (/vote/<uuid>/feed)
+VOTING_FEED_PAGE_SIZE = int(os.environ.get("VOTING_FEED_PAGE_SIZE", "1000"))
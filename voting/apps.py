@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VotingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "voting"
+
+    def ready(self):
+        from . import signals  # noqa
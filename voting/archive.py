@@ -0,0 +1,202 @@
+"""
+Archive binaire compacte des bulletins d'un vote, pour la conservation et la vérification par des tiers.
+
+Ce module n'utilise pas Django : un vérificateur peut le copier tel quel. Format (entiers gros-boutistes) :
+
+    En-tête     MAGIC (8 octets) | UUID du vote (16) | racine de Merkle (32) | nombre de bulletins (8)
+                | longueur de la clé publique (4) | clé publique PEM
+    Bulletins   dans l'ordre d'arrivée, chacun : drapeaux (1) | longueur du jeton (2)
+                | longueur de la signature (2) | longueur du résultat (4) | jeton | signature | résultat
+    Index       position (8) et numéro d'arrivée (8) de chaque bulletin, triés par jeton
+    Fin         position de l'index (8) | MAGIC (8)
+
+Le jeton et la signature sont stockés décodés (octets bruts) quand ce sont du Base64 qui se
+réencode à l'identique, sinon en UTF-8 ; les drapeaux indiquent lequel. Le résultat est le JSON
+canonique, en UTF-8.
+"""
+import base64
+import binascii
+import mmap
+import struct
+import uuid
+from collections import namedtuple
+
+MAGIC = b"VOTEARC\x01"
+HEADER = struct.Struct(">8s16s32sQI")
+RECORD = struct.Struct(">BHHI")
+INDEX_ENTRY = struct.Struct(">QQ")
+TRAILER = struct.Struct(">Q8s")
+
+TOKEN_BASE64 = 1
+SIGNATURE_BASE64 = 2
+
+# Taille approximative des morceaux produits par archive_chunks()
+BUFFER_SIZE = 64 * 1024
+
+ArchivedBallot = namedtuple("ArchivedBallot", ["sequence", "token", "result", "server_signature"])
+
+
+class ArchiveError(ValueError):
+    """Le fichier n'est pas une archive de bulletins valide."""
+
+
+def _pack_text(value):
+    """Renvoie (est du Base64, octets) pour un jeton ou une signature."""
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        pass
+    else:
+        if base64.b64encode(raw).decode("ascii") == value:
+            return True, raw
+    return False, value.encode("utf-8")
+
+
+def _unpack_text(raw, is_base64):
+    return base64.b64encode(raw).decode("ascii") if is_base64 else bytes(raw).decode("utf-8")
+
+
+def token_key(token):
+    """Clé de tri d'un jeton dans l'index : son drapeau suivi de ses octets stockés."""
+    is_base64, raw = _pack_text(token)
+    return bytes([TOKEN_BASE64 if is_base64 else 0]) + raw
+
+
+def archive_chunks(vote_uuid, public_key_pem, root, size, rows):
+    """
+    Produit l'archive d'un vote par morceaux d'environ BUFFER_SIZE octets, sans retour en arrière
+    (écriture dans un flux, réponse HTTP...).
+
+    `rows` contient les triplets (jeton, résultat, signature) dans l'ordre d'arrivée : ce doivent
+    être exactement les `size` bulletins de l'arbre de Merkle de racine `root`. Seules les clés
+    de l'index sont gardées en mémoire.
+    """
+    public_key = public_key_pem.encode("ascii")
+    header = HEADER.pack(MAGIC, uuid.UUID(str(vote_uuid)).bytes, bytes(root), size, len(public_key)) + public_key
+
+    buffer = [header]
+    buffer_size = position = len(header)
+    index = []
+    for sequence, (token, result, server_signature) in enumerate(rows):
+        token_is_base64, token_raw = _pack_text(token)
+        signature_is_base64, signature_raw = _pack_text(server_signature)
+        result_raw = result.encode("utf-8")
+        flags = (TOKEN_BASE64 if token_is_base64 else 0) | (SIGNATURE_BASE64 if signature_is_base64 else 0)
+        record = RECORD.pack(flags, len(token_raw), len(signature_raw), len(result_raw))
+        record += token_raw + signature_raw + result_raw
+
+        index.append((bytes([flags & TOKEN_BASE64]) + token_raw, position, sequence))
+        buffer.append(record)
+        buffer_size += len(record)
+        position += len(record)
+        if buffer_size >= BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            buffer_size = 0
+
+    if len(index) != size:
+        raise ArchiveError(f"{len(index)} bulletin(s) lu(s) au lieu de {size}.")
+    index.sort()
+    buffer.extend(INDEX_ENTRY.pack(offset, sequence) for _, offset, sequence in index)
+    buffer.append(TRAILER.pack(position, MAGIC))
+    yield b"".join(buffer)
+
+
+class BallotArchive:
+    """
+    Lecteur d'archive : le fichier est projeté en mémoire (mmap), rien n'est chargé à l'avance.
+
+    La recherche d'un jeton (get) est une recherche dichotomique dans l'index, en O(log n) ;
+    iter_raw() parcourt les bulletins sans copie, en renvoyant des memoryview sur le fichier.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ArchiveError("L'archive est vide.")
+        self._view = memoryview(self._mmap)
+        try:
+            self._read_header()
+        except (ArchiveError, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise ArchiveError(f"Archive invalide : {e}")
+
+    def _read_header(self):
+        magic, vote_uuid, root, self.size, key_length = HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ArchiveError("en-tête inconnu")
+        self.vote_uuid = str(uuid.UUID(bytes=vote_uuid))
+        self.root = root
+        self._records_offset = HEADER.size + key_length
+        self.public_key_pem = bytes(self._view[HEADER.size:self._records_offset]).decode("ascii")
+
+        self._index_offset, magic = TRAILER.unpack_from(self._view, len(self._view) - TRAILER.size)
+        if magic != MAGIC or self._index_offset + self.size * INDEX_ENTRY.size + TRAILER.size != len(self._view):
+            raise ArchiveError("fin de fichier inattendue")
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def _record_at(self, offset):
+        """Renvoie (drapeaux, jeton, signature, résultat, position suivante), sans copie."""
+        flags, token_length, signature_length, result_length = RECORD.unpack_from(self._view, offset)
+        start = offset + RECORD.size
+        token_end = start + token_length
+        signature_end = token_end + signature_length
+        result_end = signature_end + result_length
+        return (
+            flags,
+            self._view[start:token_end],
+            self._view[token_end:signature_end],
+            self._view[signature_end:result_end],
+            result_end,
+        )
+
+    def _decode(self, sequence, flags, token, signature, result):
+        return ArchivedBallot(
+            sequence,
+            _unpack_text(token, flags & TOKEN_BASE64),
+            bytes(result).decode("utf-8"),
+            _unpack_text(signature, flags & SIGNATURE_BASE64),
+        )
+
+    def iter_raw(self):
+        """Parcourt les bulletins dans l'ordre d'arrivée : (numéro, drapeaux, jeton, signature, résultat)."""
+        offset = self._records_offset
+        for sequence in range(self.size):
+            flags, token, signature, result, offset = self._record_at(offset)
+            yield sequence, flags, token, signature, result
+
+    def __iter__(self):
+        for raw in self.iter_raw():
+            yield self._decode(*raw)
+
+    def get(self, token):
+        """Renvoie le bulletin (ArchivedBallot) de ce jeton, ou None s'il n'est pas dans l'archive."""
+        key = token_key(token)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset, sequence = INDEX_ENTRY.unpack_from(self._view, self._index_offset + middle * INDEX_ENTRY.size)
+            flags, stored_token, signature, result, _ = self._record_at(offset)
+            stored_key = bytes([flags & TOKEN_BASE64]) + stored_token
+            if stored_key < key:
+                low = middle + 1
+            elif stored_key > key:
+                high = middle
+            else:
+                return self._decode(sequence, flags, stored_token, signature, result)
+        return None
+
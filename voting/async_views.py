@@ -0,0 +1,166 @@
+"""
+Variantes asynchrones des vues les plus sollicitées, activées par le réglage VOTING_ASYNC_VIEWS.
+
+Servies par ASGI (project/asgi.py), elles utilisent l'ORM asynchrone de Django et exécutent
+les calculs RSA dans un thread (ou dans le pool de signature, voir VOTING_SIGNING_WORKERS) :
+un seul worker peut ainsi garder ouvertes des milliers de connexions lentes. Ce qui peut
+toucher à la base (clés, schéma) est lu avant, avec sync_to_async : les fonctions passées à
+asyncio.to_thread ne font que des calculs.
+"""
+import asyncio
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from . import merkle
+from .ballot_log import get_ballot_log
+from .caching import aboard_version, board_condition, immutable_response
+from .executor import SigningUnavailable, sign_with_key
+from .ingest import InvalidBallot, astore_ballot, check_ballot, enqueue_ballot
+from .metadata import aget_vote_metadata_or_404
+from .models import Ballot, BallotBoxClosed, VoterStatus
+from .schema import get_ballot_schema
+from .signing import SigningError
+from .snapshot import ballot_filename, redirect_to_snapshot
+from .views import vote_hash_entries
+
+
+async def asign_for_voter(user, vote_meta, blinded_message_b64):
+    """Version asynchrone de views.sign_for_voter()."""
+    if not blinded_message_b64 or not isinstance(blinded_message_b64, str):
+        return 400, {"error": "Message aveuglé manquant"}
+
+    # 1. Gestion de l'idempotence via VoterStatus
+    status, created = await VoterStatus.objects.aget_or_create(
+        user=user,
+        vote_id=vote_meta.id
+    )
+
+    # Calcul du hash du message aveuglé pour comparaison
+    incoming_hash = hashlib.sha256(blinded_message_b64.encode()).hexdigest()
+
+    if status.has_signed:
+        # Si le hash correspond, c'est un retry (problème réseau client) : on renvoie la signature
+        if status.blinded_message_hash == incoming_hash:
+            return 200, {
+                "signature": status.generated_signature,
+                "status": "already_signed_retry"
+            }
+        else:
+            # Si le hash est différent, c'est une tentative de signer un DEUXIÈME bulletin
+            return 403, {
+                "error": "Vous avez déjà obtenu une signature pour un bulletin différent."
+            }
+
+    # 2. Phase de signature cryptographique, hors de la boucle d'événements (le PEM de la clé
+    # privée peut devoir être lu en base : il est chargé avant)
+    private_key_pem = await sync_to_async(vote_meta.get_private_key_pem)()
+    try:
+        sig_b64 = await asyncio.to_thread(sign_with_key, vote_meta.uuid, private_key_pem, blinded_message_b64)
+    except SigningError as e:
+        return 400, {"error": str(e)}
+    except SigningUnavailable as e:
+        return 503, {"error": str(e)}
+
+    # 3. Sauvegarde de l'état pour l'idempotence futur
+    status.blinded_message_hash = incoming_hash
+    status.generated_signature = sig_b64
+    status.has_signed = True
+    await status.asave()
+
+    return 200, {"signature": sig_b64}
+
+
+@csrf_exempt
+@login_required
+async def sign_blind_token(request, vote_uuid):
+    """Version asynchrone de views.sign_blind_token()."""
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    vote_meta = await aget_vote_metadata_or_404(vote_uuid)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+
+    status_code, data = await asign_for_voter(await request.auser(), vote_meta, data.get("blinded_message"))
+    response = JsonResponse(data, status=status_code)
+    if status_code == 503:
+        response["Retry-After"] = "1"
+    return response
+
+
+@csrf_exempt
+async def submit_vote(request, vote_uuid):
+    """Version asynchrone de views.submit_vote()."""
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    # 1. Récupération du vote concerné
+    vote_meta = await aget_vote_metadata_or_404(vote_uuid)
+    if vote_meta.snapshot_digest:
+        return JsonResponse({"error": str(BallotBoxClosed())}, status=400)
+
+    # 2. Extraction des composants du bulletin
+    json_payload = request.POST.get('data', '')
+    token = request.POST.get('token', '')
+    signature_b64 = request.POST.get('signature', '')
+
+    # 3. Vérification du JSON, de son contenu et de la signature, hors de la boucle d'événements
+    # (le schéma peut devoir être compilé à partir de la base : il est chargé avant)
+    public_key, schema = await sync_to_async(lambda: (vote_meta.get_public_key(), get_ballot_schema(vote_meta)))()
+    try:
+        result_data = await asyncio.to_thread(check_ballot, public_key, token, json_payload, signature_b64, schema=schema)
+    except InvalidBallot as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # 4. Enregistrement anonyme dans l'urne (Ballot)
+    ballot = Ballot(
+        token=token,
+        vote_id=vote_meta.id,
+        result=json_payload,
+        server_signature=signature_b64,
+    )
+    ballot.set_validated_result(result_data)
+    if ballot_log := get_ballot_log():
+        status_code, data = await sync_to_async(enqueue_ballot)(vote_meta, ballot, ballot_log)
+    else:
+        status_code, data = await astore_ballot(ballot)
+    return JsonResponse(data, status=status_code)
+
+
+@redirect_to_snapshot(lambda request, token: f"ballots/{ballot_filename(token)}")
+async def ballot_view(request, vote_uuid, token):
+    vote_meta = await aget_vote_metadata_or_404(vote_uuid)
+    ballot = await aget_object_or_404(Ballot.objects.only("token", "result"), vote_id=vote_meta.id, token=token)
+    return immutable_response(
+        request, merkle.leaf_hash(ballot.token, ballot.result).hex(), ballot.result, "application/json"
+    )
+
+
+@redirect_to_snapshot("hash.txt")
+@board_condition
+async def vote_hash(request, vote_uuid):
+    # L'ETag est celui de la version de l'urne réellement lue, pas celle vue par board_condition
+    size = await aboard_version((await aget_vote_metadata_or_404(vote_uuid)).id)
+    sha256 = hashlib.sha256()
+
+    first = True
+    # aiterator() uses database cursor fetching in chunks
+    async for entry in vote_hash_entries(vote_uuid, size).aiterator():
+        if first:
+            first = False
+        else:
+            sha256.update(b"\n")
+        sha256.update(entry.encode("utf-8"))
+
+    response = HttpResponse(sha256.hexdigest(), content_type="text/plain")
+    response["ETag"] = quote_etag(str(size))
+    return response
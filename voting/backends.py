@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+import rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+class PythonBackend:
+    """Arithmétique en Python pur, via le paquet rsa : toujours disponible."""
+
+    name = "python"
+
+    def powmod(self, base: int, exp: int, mod: int) -> int:
+        return pow(base, exp, mod)
+
+    def generate_keys(self, key_size: int) -> tuple[rsa.PublicKey, rsa.PrivateKey]:
+        return rsa.newkeys(key_size)
+
+
+class Gmpy2Backend(PythonBackend):
+    """Exponentiation modulaire avec GMP (paquet gmpy2)."""
+
+    name = "gmpy2"
+
+    def __init__(self):
+        import gmpy2
+
+        self.gmpy2 = gmpy2
+
+    def powmod(self, base, exp, mod):
+        return int(self.gmpy2.powmod(base, exp, mod))
+
+    def generate_keys(self, key_size):
+        # Les nombres premiers viennent d'une bibliothèque éprouvée (OpenSSL, sinon rsa) :
+        # GMP ne sert qu'aux calculs
+        try:
+            return CryptographyBackend().generate_keys(key_size)
+        except ImportError:
+            return super().generate_keys(key_size)
+
+
+class CryptographyBackend(PythonBackend):
+    """
+    Génération de clés avec OpenSSL (paquet cryptography).
+
+    OpenSSL n'expose pas d'exponentiation RSA brute (sans padding), nécessaire pour les
+    signatures aveugles : les calculs restent donc en Python pur.
+    """
+
+    name = "cryptography"
+
+    def __init__(self):
+        from cryptography.hazmat.primitives.asymmetric import rsa as openssl_rsa
+
+        self.openssl_rsa = openssl_rsa
+
+    def generate_keys(self, key_size):
+        numbers = self.openssl_rsa.generate_private_key(
+            public_exponent=rsa.key.DEFAULT_EXPONENT,
+            key_size=key_size,
+        ).private_numbers()
+        n, e = numbers.public_numbers.n, numbers.public_numbers.e
+        return rsa.PublicKey(n, e), rsa.PrivateKey(n, e, numbers.d, numbers.p, numbers.q)
+
+
+BACKENDS = {backend.name: backend for backend in (Gmpy2Backend, CryptographyBackend, PythonBackend)}
+
+
+def available_backends():
+    """Renvoie les moteurs utilisables dans cet environnement, du plus rapide au plus lent."""
+    backends = []
+    for backend_class in BACKENDS.values():
+        try:
+            backends.append(backend_class())
+        except ImportError:
+            pass
+    return backends
+
+
+@lru_cache
+def _load_backend(name):
+    if name == "auto":
+        return available_backends()[0]
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ImproperlyConfigured(f"Moteur cryptographique inconnu : {name} (choix : auto, {', '.join(BACKENDS)})")
+    except ImportError as e:
+        raise ImproperlyConfigured(f"Le moteur cryptographique {name} n'est pas disponible : {e}")
+
+
+def get_backend(name=None):
+    """
+    Renvoie le moteur cryptographique choisi par le réglage VOTING_CRYPTO_BACKEND
+    ("auto" par défaut : le plus rapide disponible).
+    """
+    if name is None:
+        try:
+            name = settings.VOTING_CRYPTO_BACKEND
+        except (AttributeError, ImproperlyConfigured):
+            # Utilisation hors de Django (processus de signature, vérification autonome...)
+            name = "auto"
+    return _load_backend(name)
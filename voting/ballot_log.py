@@ -0,0 +1,140 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+
+class BallotLog:
+    """
+    Journal local, en ajout seul, des bulletins vérifiés mais pas encore enregistrés dans la base.
+
+    Chaque bulletin est écrit puis synchronisé sur disque (fsync) avant d'être acquitté :
+    un arrêt brutal ne peut donc pas perdre un bulletin acquitté. Le vidage commence par
+    renommer le journal courant en segment ; les écritures suivantes partent dans un nouveau
+    journal, et un segment n'est supprimé qu'une fois ses bulletins enregistrés dans la base ;
+    les bulletins que la base refuse sont recopiés dans un fichier rejected-*.log.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.current = self.directory / "current.log"
+        self.gate = self.directory / "gate.lock"
+
+    @contextmanager
+    def _lock_gate(self, operation):
+        fd = os.open(self.gate, os.O_RDONLY | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)
+
+    def accepting(self):
+        """
+        Verrou partagé, tenu pendant l'acquittement d'un bulletin : aucune urne ne peut être close
+        (voir closing) entre la vérification qu'elle est ouverte et l'écriture dans le journal.
+        """
+        return self._lock_gate(fcntl.LOCK_SH)
+
+    def closing(self):
+        """Verrou exclusif, tenu pendant la fermeture d'une urne : les acquittements attendent."""
+        return self._lock_gate(fcntl.LOCK_EX)
+
+    def append(self, vote_uuid, token, result, signature):
+        line = json.dumps({
+            "vote": str(vote_uuid),
+            "token": token,
+            "data": result,
+            "signature": signature,
+        }, separators=(',', ':')).encode() + b"\n"
+
+        while True:
+            fd = os.open(self.current, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # Le journal a pu être renommé en segment pendant qu'on attendait le verrou
+                try:
+                    rotated = os.fstat(fd).st_ino != os.stat(self.current).st_ino
+                except FileNotFoundError:
+                    rotated = True
+                if rotated:
+                    continue
+                os.write(fd, line)
+                os.fsync(fd)
+                return
+            finally:
+                os.close(fd)
+
+    def rotate(self):
+        """Renomme le journal courant en segment à vider (s'il n'est pas vide)."""
+        try:
+            fd = os.open(self.current, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size:
+                os.rename(self.current, self.directory / f"segment-{time.time_ns()}.log")
+                self._fsync_directory()
+        finally:
+            os.close(fd)
+
+    def segments(self):
+        return sorted(self.directory.glob("segment-*.log"))
+
+    def read_segment(self, segment):
+        """Renvoie les bulletins d'un segment, groupés par UUID de vote, dans l'ordre d'écriture."""
+        entries = defaultdict(list)
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne incomplète : l'écriture n'a pas été synchronisée, donc pas acquittée
+                    continue
+                entries[entry.pop("vote")].append(entry)
+        return entries
+
+    def keep_rejected(self, segment, entries):
+        """Recopie les bulletins refusés d'un segment (avec leur vote et l'erreur) ; renvoie le fichier écrit."""
+        path = self.directory / f"rejected-{segment.name}"
+        with open(path, "ab") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._fsync_directory()
+        return path
+
+    def remove_segment(self, segment):
+        os.remove(segment)
+        self._fsync_directory()
+
+    def _fsync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+_ballot_log = None
+_ballot_log_lock = threading.Lock()
+
+
+def get_ballot_log():
+    """Renvoie le journal des bulletins, ou None si l'enregistrement différé est désactivé."""
+    global _ballot_log
+    if not settings.VOTING_BALLOT_LOG_DIR:
+        return None
+    with _ballot_log_lock:
+        if _ballot_log is None:
+            _ballot_log = BallotLog(settings.VOTING_BALLOT_LOG_DIR)
+    return _ballot_log
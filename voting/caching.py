@@ -0,0 +1,69 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .metadata import aget_vote_metadata_or_404, get_vote_metadata_or_404
+from .models import MerkleTree
+
+# Un bulletin ou une clé publique ne change jamais une fois publié
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def immutable_response(request, etag, content, content_type):
+    """Réponse pour un contenu qui ne change jamais, avec un ETag fort (304 si le client l'a déjà)."""
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag) or HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def board_version(vote_id):
+    """
+    Version de l'urne d'un vote : son nombre de bulletins, qui augmente à chaque nouveau bulletin.
+
+    Une seule requête, sur la ligne de l'arbre de Merkle du vote.
+    """
+    return MerkleTree.objects.filter(vote_id=vote_id).values_list("size", flat=True).first() or 0
+
+
+async def aboard_version(vote_id):
+    return await MerkleTree.objects.filter(vote_id=vote_id).values_list("size", flat=True).afirst() or 0
+
+
+def patch_board_response(response, etag):
+    response.headers.setdefault("ETag", etag)
+    # Les caches partagés (CDN) peuvent servir la réponse quelques secondes, les navigateurs revalident
+    patch_cache_control(response, public=True, max_age=0, s_maxage=settings.VOTING_BOARD_MAX_AGE)
+    return response
+
+
+def board_condition(view):
+    """
+    Équivalent de condition() pour les vues de l'urne d'un vote (premier argument : vote_uuid).
+
+    L'ETag est la version de l'urne : une requête conditionnelle reçoit un 304 avant que la vue
+    ne fasse la moindre requête coûteuse. Fonctionne aussi avec les vues asynchrones.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, vote_uuid, *args, **kwargs):
+            vote_meta = await aget_vote_metadata_or_404(vote_uuid)
+            etag = quote_etag(str(await aboard_version(vote_meta.id)))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, vote_uuid, *args, **kwargs)
+            return patch_board_response(response, etag)
+    else:
+        @wraps(view)
+        def inner(request, vote_uuid, *args, **kwargs):
+            etag = quote_etag(str(board_version(get_vote_metadata_or_404(vote_uuid).id)))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, vote_uuid, *args, **kwargs)
+            return patch_board_response(response, etag)
+    return inner
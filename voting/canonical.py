@@ -0,0 +1,74 @@
+import json
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_MAX_SIZE = 64 * 1024
+
+# Un nombre avec exposant ("1e+16") : Python et orjson ne l'écrivent pas de la même façon
+_EXPONENT = re.compile(r"\d[eE]")
+
+
+class CanonicalJSONError(ValueError):
+    """Le JSON n'est pas sous forme canonique (minifié, trié par clés, ASCII)."""
+
+
+class InvalidJSON(CanonicalJSONError):
+    """Le texte n'est pas du JSON valide."""
+
+
+def dumps(obj) -> str:
+    """Sérialise un objet sous forme canonique, identique au safeStringify du client JS."""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def get_max_size():
+    try:
+        return settings.VOTING_MAX_BALLOT_SIZE
+    except (AttributeError, ImproperlyConfigured):
+        # Utilisation hors de Django (vérification autonome...)
+        return DEFAULT_MAX_SIZE
+
+
+def loads(payload: str, max_size=None):
+    """
+    Décode un JSON en vérifiant qu'il est sous forme canonique, et renvoie l'objet décodé.
+
+    La taille est vérifiée avant tout décodage. Si orjson est installé, il sert de chemin
+    rapide quand le texte ne peut pas contenir de nombre flottant (pas de "." ni d'exposant)
+    et ne contient que de l'ASCII imprimable : sa sortie est alors identique octet pour octet
+    à celle de json.dumps. Dans tous les autres cas, on se rabat sur le module json de la
+    bibliothèque standard.
+    """
+    max_size = get_max_size() if max_size is None else max_size
+    if len(payload) > max_size:
+        raise CanonicalJSONError(f"Le champ 'result' ne doit pas dépasser {max_size} caractères.")
+
+    if (
+        orjson is not None
+        # json.dumps échappe tout ce qui n'est pas de l'ASCII imprimable, orjson non
+        and payload.isascii() and payload.isprintable()
+        and "." not in payload and not _EXPONENT.search(payload)
+    ):
+        try:
+            parsed = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # Entiers de plus de 64 bits, NaN... : le module json tranchera
+            pass
+        else:
+            if orjson.dumps(parsed, option=orjson.OPT_SORT_KEYS) == payload.encode():
+                return parsed
+
+    try:
+        parsed = json.loads(payload)
+    except json.JSONDecodeError:
+        raise InvalidJSON("Le champ 'result' doit être un JSON valide.")
+    if dumps(parsed) != payload:
+        raise CanonicalJSONError("Le champ 'result' doit être un JSON minifié, trié par clés, sans espaces inutiles.")
+    return parsed
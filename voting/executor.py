@@ -0,0 +1,114 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .keys import key_cache
+from .signing import sign_blinded_message
+
+
+class SigningUnavailable(Exception):
+    """Le pool de signature est saturé, n'a pas répondu à temps ou a perdu un processus."""
+
+
+def _sign_in_worker(vote_uuid, private_key_pem, blinded_message_b64):
+    # Exécuté dans un processus du pool : chaque processus garde ses propres clés déchiffrées
+    # dans son cache, le PEM n'est donc décodé qu'une fois par processus.
+    priv_key = key_cache.get_private_key(vote_uuid, private_key_pem)
+    return sign_blinded_message(priv_key, blinded_message_b64)
+
+
+class SigningExecutor:
+    """
+    Pool de processus dédiés aux opérations sur la clé privée.
+
+    L'exponentiation modulaire garde le GIL pendant tout le calcul : en la déportant dans
+    des processus séparés, les threads du serveur WSGI restent disponibles pour les autres
+    requêtes. La file d'attente est bornée et chaque signature a un délai maximal.
+    Si un processus s'arrête brutalement, le pool entier est inutilisable : il est remplacé
+    par un nouveau pool.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self._pool = self._new_pool()
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+
+    def _new_pool(self):
+        # "spawn" évite de dupliquer les threads et connexions à la base du serveur
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_pool(self, broken_pool):
+        """Remplace un pool cassé ; si plusieurs threads le constatent en même temps, un seul le remplace."""
+        with self._pool_lock:
+            if self._pool is broken_pool:
+                self._pool = self._new_pool()
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, vote_uuid, private_key_pem, blinded_message_b64):
+        """Envoie une signature au pool et renvoie le Future correspondant."""
+        if not self._slots.acquire(blocking=False):
+            raise SigningUnavailable("Trop de signatures en attente.")
+        try:
+            future = self._pool.submit(_sign_in_worker, str(vote_uuid), private_key_pem, blinded_message_b64)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def sign(self, vote_uuid, private_key_pem, blinded_message_b64):
+        """Signe un message aveuglé dans le pool et attend le résultat."""
+        pool = self._pool
+        try:
+            future = self.submit(vote_uuid, private_key_pem, blinded_message_b64)
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise SigningUnavailable("La signature n'a pas abouti dans le délai imparti.")
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise SigningUnavailable("Un processus de signature s'est arrêté : réessayez.")
+
+    def shutdown(self):
+        self._pool.shutdown(cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_signing_executor():
+    """Renvoie le pool de signature du processus, ou None s'il est désactivé (VOTING_SIGNING_WORKERS = 0)."""
+    global _executor
+    if not settings.VOTING_SIGNING_WORKERS:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = SigningExecutor(
+                settings.VOTING_SIGNING_WORKERS,
+                settings.VOTING_SIGNING_QUEUE_SIZE,
+                settings.VOTING_SIGNING_TIMEOUT,
+            )
+    return _executor
+
+
+def sign_with_key(vote_uuid, private_key_pem, blinded_message_b64):
+    """
+    Signe un message aveuglé avec la clé privée PEM donnée, dans le pool s'il est activé.
+
+    Ne fait aucune requête : peut être appelée dans un thread quelconque (asyncio.to_thread).
+    """
+    executor = get_signing_executor()
+    if executor is None:
+        return sign_blinded_message(key_cache.get_private_key(vote_uuid, private_key_pem), blinded_message_b64)
+    return executor.sign(vote_uuid, private_key_pem, blinded_message_b64)
+
+
+def sign_for_vote(vote_obj, blinded_message_b64):
+    """Signe un message aveuglé avec la clé privée du vote, dans le pool s'il est activé."""
+    return sign_with_key(vote_obj.uuid, vote_obj.get_private_key_pem(), blinded_message_b64)
@@ -0,0 +1,117 @@
+import csv
+import json
+
+from . import archive
+from .models import Ballot, MerkleTree
+
+EXPORT_FIELDS = ("sequence", "token", "result", "server_signature", "created_at")
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Nombre de bulletins lus à chaque aller-retour avec le curseur côté serveur
+CHUNK_SIZE = 2000
+
+# Taille approximative des morceaux envoyés au client (ou écrits dans le fichier)
+BUFFER_SIZE = 64 * 1024
+
+
+def export_rows(vote_id, after=None, before=None):
+    """
+    Bulletins d'un vote dans l'ordre d'arrivée, lus par morceaux avec un curseur côté serveur.
+
+    `after` est le numéro (sequence) du dernier bulletin déjà reçu : un téléchargement
+    interrompu reprend ainsi juste après. `before`, s'il est donné, exclut les bulletins à
+    partir de ce numéro.
+    """
+    ballots = Ballot.objects.filter(vote_id=vote_id, sequence__isnull=False).order_by("sequence")
+    if after is not None:
+        ballots = ballots.filter(sequence__gt=after)
+    if before is not None:
+        ballots = ballots.filter(sequence__lt=before)
+    for row in ballots.values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+        yield row[:-1] + (row[-1].isoformat(),)
+
+
+# Nombre de jetons par requête token__in de lookup_chunks() (SQLite limite le nombre de paramètres)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def lookup_chunks(vote_id, tokens):
+    """
+    Document JSON {"results": [...]} indiquant, dans l'ordre des jetons donnés, si le bulletin de
+    chacun est dans l'urne du vote, avec son numéro, son résultat et sa signature le cas échéant.
+
+    Le document est produit par morceaux, un par requête token__in de LOOKUP_CHUNK_SIZE jetons.
+    """
+    yield b'{"results":['
+    for start in range(0, len(tokens), LOOKUP_CHUNK_SIZE):
+        chunk = tokens[start:start + LOOKUP_CHUNK_SIZE]
+        found = {
+            token: {"sequence": sequence, "result": result, "server_signature": server_signature}
+            for token, sequence, result, server_signature in Ballot.objects.filter(
+                vote_id=vote_id, token__in=set(chunk)
+            ).values_list("token", "sequence", "result", "server_signature")
+        }
+        entries = (
+            json.dumps({"token": token, "found": token in found, **found.get(token, {})}, separators=(',', ':'))
+            for token in chunk
+        )
+        yield (("," if start else "") + ",".join(entries)).encode("utf-8")
+    yield b"]}"
+
+
+class _LineBuffer:
+    """Pseudo-fichier pour csv.writer : writerow() renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(rows, export_format, header=True):
+    if export_format == "ndjson":
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(',', ':')) + "\n"
+        return
+
+    writer = csv.writer(_LineBuffer())
+    if header:
+        yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_chunks(rows, export_format, header=True):
+    """Regroupe les lignes de l'export en morceaux d'environ BUFFER_SIZE octets."""
+    buffer = []
+    size = 0
+    for line in export_lines(rows, export_format, header):
+        line = line.encode("utf-8")
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def export_archive(vote):
+    """
+    Archive binaire (voir archive.py) des bulletins d'un vote, par morceaux.
+
+    Seuls les bulletins de l'arbre de Merkle lu au départ y figurent : la racine de l'en-tête
+    correspond toujours aux bulletins de l'archive, même si d'autres arrivent pendant l'export.
+    """
+    vote.ensure_keys()
+    tree = MerkleTree.objects.filter(vote_id=vote.pk).first() or MerkleTree(vote_id=vote.pk)
+    rows = (
+        Ballot.objects.filter(vote_id=vote.pk, sequence__lt=tree.size)
+        .order_by("sequence")
+        .values_list("token", "result", "server_signature")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return archive.archive_chunks(vote.uuid, vote.public_key_pem, tree.root, tree.size, rows)
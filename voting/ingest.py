@@ -0,0 +1,262 @@
+import base64
+import hashlib
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+
+from . import canonical
+from .backends import get_backend
+from .models import Ballot, BallotBoxClosed, MerkleTree, Vote
+from .schema import InvalidBallotData, get_ballot_schema
+
+CONFLICT_ERROR = "Un bulletin avec ce jeton existe déjà mais son contenu ou sa signature diffèrent."
+
+
+class InvalidBallot(ValueError):
+    """Le bulletin est rejeté ; le message est renvoyé tel quel au client."""
+
+
+def check_ballot(pub_key, token, json_payload, signature_b64, backend=None, schema=None):
+    """
+    Vérifie la forme canonique du JSON, son contenu (si le schéma du vote est donné)
+    et la signature aveugle d'un bulletin.
+
+    Renvoie le résultat décodé, ou lève InvalidBallot avec le message d'erreur à renvoyer au client.
+    """
+    try:
+        result_data = canonical.loads(json_payload)
+    except canonical.InvalidJSON:
+        raise InvalidBallot("Payload JSON invalide")
+    except canonical.CanonicalJSONError as e:
+        raise InvalidBallot(str(e))
+
+    if schema is not None:
+        try:
+            schema.validate(result_data)
+        except InvalidBallotData as e:
+            raise InvalidBallot(str(e))
+
+    # Il est CRUCIAL que json_payload soit identique au caractère près à celui signé par le client JS
+    message_content = f"{token}:{json_payload}".encode('utf-8')
+
+    # Calcul du hash SHA-256 (m)
+    m_int = int.from_bytes(hashlib.sha256(message_content).digest(), "big")
+
+    try:
+        # Décodage de la signature Base64
+        sig_int = int.from_bytes(base64.b64decode(signature_b64), "big")
+    except Exception as e:
+        raise InvalidBallot(f"Erreur de décodage de la signature : {str(e)}")
+
+    # Vérification RSA : sig^e mod n == m
+    if (backend or get_backend()).powmod(sig_int, pub_key.e, pub_key.n) != m_int:
+        raise InvalidBallot("Signature invalide. Le bulletin a été modifié ou la signature est incorrecte.")
+    return result_data
+
+
+def success_response(token, created):
+    """Code HTTP et contenu de la réponse pour un bulletin enregistré (ou déjà présent)."""
+    return 201 if created else 200, {
+        "status": "success",
+        "message": "Votre vote a été enregistré.",
+        "bulletin_id": token,
+        "is_new": created,
+    }
+
+
+def error_response(message):
+    return 400, {"error": message}
+
+
+def store_ballot(ballot):
+    """
+    Insère un bulletin vérifié, ou renvoie le bulletin déjà présent avec le même jeton.
+
+    L'insertion est un INSERT ... ON CONFLICT DO NOTHING suivi d'une seule lecture : deux
+    envois concurrents du même bulletin ne peuvent pas se terminer par une IntegrityError,
+    le second voit simplement le bulletin du premier. Renvoie le couple (code HTTP, contenu).
+
+    Le bulletin est numéroté et ajouté à l'arbre de Merkle du vote après la transaction (voir
+    MerkleTree) ; un bulletin déjà présent ne consomme pas de numéro.
+    """
+    try:
+        ballot.validate_result()
+    except ValueError as e:
+        return error_response(str(e))
+
+    try:
+        with transaction.atomic():
+            MerkleTree.hold_open(ballot.vote_id)
+            Ballot.objects.bulk_create([ballot], ignore_conflicts=True)
+            stored = Ballot.objects.filter(token=ballot.token).values(*STORED_FIELDS).first()
+            if stored["uuid"] == ballot.uuid:
+                MerkleTree.sequence_on_commit(ballot.vote_id)
+    except BallotBoxClosed as e:
+        return error_response(str(e))
+    return _stored_ballot_response(ballot, stored)
+
+
+async def astore_ballot(ballot):
+    """Version asynchrone de store_ballot() (l'insertion a besoin d'une transaction, donc d'un thread)."""
+    return await sync_to_async(store_ballot)(ballot)
+
+
+STORED_FIELDS = ("uuid", "vote_id", "result", "server_signature")
+
+
+def _stored_ballot_response(ballot, stored):
+    if stored["uuid"] == ballot.uuid:
+        return success_response(ballot.token, True)
+    if (
+        stored["vote_id"] == ballot.vote_id
+        and stored["result"] == ballot.result
+        and stored["server_signature"] == ballot.server_signature
+    ):
+        return success_response(ballot.token, False)
+    return error_response(CONFLICT_ERROR)
+
+
+def enqueue_ballot(vote, ballot, ballot_log):
+    """
+    Acquitte un bulletin vérifié en l'ajoutant au journal local, sans l'insérer dans la base.
+
+    Un bulletin déjà présent dans l'urne reçoit la même réponse que dans store_ballot, un
+    bulletin pour une urne close est refusé. Le bulletin n'apparaît dans l'urne publique qu'une
+    fois le journal vidé (drain_ballot_log).
+    """
+    stored = Ballot.objects.filter(token=ballot.token).values("vote_id", "result", "server_signature").first()
+    if stored is not None:
+        if (
+            stored["vote_id"] == ballot.vote_id
+            and stored["result"] == ballot.result
+            and stored["server_signature"] == ballot.server_signature
+        ):
+            return success_response(ballot.token, False)
+        return error_response(CONFLICT_ERROR)
+
+    with ballot_log.accepting():
+        # Un bulletin acquitté doit pouvoir être enregistré : l'urne ne peut pas être close
+        # entre cette vérification et l'écriture (voir snapshot.close_ballot_box)
+        if MerkleTree.objects.filter(vote_id=ballot.vote_id, frozen=True).exists():
+            return error_response(str(BallotBoxClosed()))
+        ballot_log.append(vote.uuid, ballot.token, ballot.result, ballot.server_signature)
+    return 202, {
+        "status": "queued",
+        "message": "Votre vote a été reçu et sera déposé dans l'urne sous peu.",
+        "bulletin_id": ballot.token,
+        "is_new": True,
+    }
+
+
+def ingest_ballots(vote, entries):
+    """
+    Vérifie et enregistre un lot de bulletins (dictionnaires avec token, data et signature).
+
+    La clé publique n'est chargée qu'une fois, les doublons sont détectés avec une seule
+    requête token__in et les nouveaux bulletins sont insérés avec bulk_create.
+    Renvoie, dans l'ordre des entrées, le couple (code HTTP, contenu) qu'aurait renvoyé
+    submit_vote pour chaque bulletin. `vote` peut être un Vote ou ses métadonnées (VoteMetadata).
+    """
+    pub_key = vote.get_public_key()
+    backend = get_backend()
+    schema = get_ballot_schema(vote)
+    results = [None] * len(entries)
+    pending = []
+
+    for i, entry in enumerate(entries):
+        token = str(entry.get("token", ""))
+        json_payload = str(entry.get("data", ""))
+        signature_b64 = str(entry.get("signature", ""))
+        try:
+            result_data = check_ballot(pub_key, token, json_payload, signature_b64, backend, schema)
+        except InvalidBallot as e:
+            results[i] = error_response(str(e))
+            continue
+        ballot = Ballot(token=token, vote_id=vote.id, result=json_payload, server_signature=signature_b64)
+        ballot.set_validated_result(result_data)
+        pending.append((i, ballot))
+
+    # Si un autre processus insère un des jetons entre la requête et l'insertion,
+    # on recommence une fois : le bulletin concurrent sera alors vu comme existant.
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _store_ballots(vote, pending, results)
+        except IntegrityError:
+            if attempt:
+                raise
+        except BallotBoxClosed as e:
+            for i, _ in pending:
+                results[i] = error_response(str(e))
+            break
+        else:
+            break
+
+    return results
+
+
+def _store_ballots(vote, pending, results):
+    # L'urne ne peut pas être close pendant l'insertion du lot
+    MerkleTree.hold_open(vote.id)
+    existing = {
+        ballot.token: ballot
+        for ballot in Ballot.objects.filter(token__in={ballot.token for _, ballot in pending})
+    }
+    to_create = []
+
+    for i, ballot in pending:
+        other = existing.get(ballot.token)
+        if other is None:
+            try:
+                ballot.validate_result()
+            except ValueError as e:
+                results[i] = error_response(str(e))
+                continue
+            existing[ballot.token] = ballot
+            to_create.append(ballot)
+            results[i] = success_response(ballot.token, True)
+        elif (
+            other.vote_id == vote.id
+            and other.result == ballot.result
+            and other.server_signature == ballot.server_signature
+        ):
+            results[i] = success_response(ballot.token, False)
+        else:
+            results[i] = error_response(CONFLICT_ERROR)
+
+    Ballot.objects.bulk_create(to_create)
+    if to_create:
+        MerkleTree.sequence_on_commit(vote.id)
+
+
+def drain_ballot_log(ballot_log, batch_size=1000):
+    """
+    Enregistre par lots dans l'urne les bulletins du journal local, segment par segment.
+
+    Produit, pour chaque segment vidé, le triplet (segment, Counter des codes HTTP, bulletins
+    refusés). Les bulletins du journal ont déjà été acquittés : ceux que la base refuse (vote
+    introuvable, urne close...) ne sont pas perdus mais recopiés, avec l'erreur, dans un fichier
+    rejected-*.log du journal (voir BallotLog.keep_rejected).
+    """
+    ballot_log.rotate()
+    for segment in ballot_log.segments():
+        counts = Counter()
+        rejected = []
+        for vote_uuid, entries in ballot_log.read_segment(segment).items():
+            vote = Vote.objects.filter(uuid=vote_uuid).first()
+            if vote is None:
+                counts[404] += len(entries)
+                rejected.extend({"vote": vote_uuid, **entry, "error": "Vote introuvable."} for entry in entries)
+                continue
+            for start in range(0, len(entries), batch_size):
+                batch = entries[start:start + batch_size]
+                for entry, (status_code, data) in zip(batch, ingest_ballots(vote, batch)):
+                    counts[status_code] += 1
+                    if "error" in data:
+                        rejected.append({"vote": vote_uuid, **entry, "error": data["error"]})
+        if rejected:
+            ballot_log.keep_rejected(segment, rejected)
+        # Le segment n'est supprimé qu'une fois tous ses bulletins enregistrés ou recopiés
+        ballot_log.remove_segment(segment)
+        yield segment, counts, rejected
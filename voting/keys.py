@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import rsa
+
+
+def fingerprint(pem: str) -> str:
+    """Empreinte SHA-256 d'une clé PEM, utilisée pour détecter un changement de clé."""
+    return hashlib.sha256(pem.encode("utf-8")).hexdigest()
+
+
+class KeyCache:
+    """
+    Cache LRU borné des clés RSA déjà désérialisées, partagé par tous les threads du processus.
+
+    Les entrées sont indexées par (type de clé, UUID du vote, empreinte du PEM) : une clé
+    régénérée ne peut donc jamais être confondue avec l'ancienne. Les moitiés publique et privée
+    sont chargées séparément, uniquement quand on les demande.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, kind, vote_uuid, key_fingerprint, load):
+        key = (kind, str(vote_uuid), key_fingerprint)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Le décodage ASN.1 est fait hors du verrou pour ne pas bloquer les autres threads ;
+        # au pire deux threads décodent la même clé en parallèle, avec le même résultat.
+        value = load()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def get_public_key(self, vote_uuid, pem: str) -> rsa.PublicKey:
+        return self._get("public", vote_uuid, fingerprint(pem), lambda: rsa.PublicKey.load_pkcs1(pem.encode("utf-8")))
+
+    def get_private_key(self, vote_uuid, pem: str) -> rsa.PrivateKey:
+        return self._get("private", vote_uuid, fingerprint(pem), lambda: rsa.PrivateKey.load_pkcs1(pem.encode("utf-8")))
+
+    def get_private_key_pem(self, vote_uuid, key_fingerprint, load_pem) -> str:
+        """PEM de la clé privée d'empreinte donnée ; load_pem() n'est appelé que s'il n'est pas en cache."""
+        return self._get("private_pem", vote_uuid, key_fingerprint, load_pem)
+
+    def invalidate(self, vote_uuid):
+        """Supprime toutes les clés en cache pour un vote."""
+        vote_uuid = str(vote_uuid)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == vote_uuid]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+key_cache = KeyCache()
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.export import export_archive
+from voting.models import Vote
+
+
+class Command(BaseCommand):
+    help = "Écrit l'archive binaire des bulletins d'un vote (voir voting/archive.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuid", help="UUID du vote")
+        parser.add_argument("--output", default="-", help="Fichier de sortie (- pour la sortie standard)")
+
+    def handle(self, *args, vote_uuid, output, **options):
+        try:
+            vote = Vote.objects.get(uuid=vote_uuid)
+        except (Vote.DoesNotExist, ValueError):
+            raise CommandError(f"Vote introuvable : {vote_uuid}")
+
+        stream = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            for chunk in export_archive(vote):
+                stream.write(chunk)
+        finally:
+            if output == "-":
+                stream.flush()
+            else:
+                stream.close()
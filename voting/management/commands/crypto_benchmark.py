@@ -0,0 +1,42 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+
+from voting.backends import available_backends
+from voting.signing import sign_blinded
+
+
+def rate(function, duration):
+    """Nombre d'appels à function par seconde, mesuré pendant au moins duration secondes."""
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        function()
+        calls += 1
+    return calls / elapsed
+
+
+class Command(BaseCommand):
+    help = "Mesure les signatures et vérifications par seconde de chaque moteur cryptographique disponible."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--key-sizes", type=int, nargs="+", default=[1024, 2048, 3072], help="Tailles de clés en bits")
+        parser.add_argument("--duration", type=float, default=1.0, help="Durée de chaque mesure en secondes")
+
+    def handle(self, *args, key_sizes, duration, **options):
+        self.stdout.write(f"{'moteur':<14}{'bits':>6}{'génération (s)':>16}{'signatures/s':>15}{'vérifications/s':>18}")
+        for backend in available_backends():
+            for key_size in key_sizes:
+                start = time.perf_counter()
+                pub_key, priv_key = backend.generate_keys(key_size)
+                keygen_time = time.perf_counter() - start
+
+                message = secrets.randbelow(pub_key.n)
+                signature = sign_blinded(priv_key, message, backend)
+                signatures = rate(lambda: sign_blinded(priv_key, message, backend), duration)
+                verifications = rate(lambda: backend.powmod(signature, pub_key.e, pub_key.n), duration)
+
+                self.stdout.write(
+                    f"{backend.name:<14}{key_size:>6}{keygen_time:>16.3f}{signatures:>15.1f}{verifications:>18.1f}"
+                )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.ballot_log import get_ballot_log
+from voting.ingest import drain_ballot_log
+
+
+class Command(BaseCommand):
+    help = "Enregistre par lots dans l'urne les bulletins du journal local (VOTING_BALLOT_LOG_DIR)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Nombre de bulletins par transaction")
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Reste actif et vide le journal toutes les SECONDS secondes",
+        )
+
+    def handle(self, *args, batch_size, watch, **options):
+        ballot_log = get_ballot_log()
+        if ballot_log is None:
+            raise CommandError("L'enregistrement différé n'est pas activé (VOTING_BALLOT_LOG_DIR).")
+
+        while True:
+            rejected = self.drain(ballot_log, batch_size)
+            if watch is None:
+                break
+            time.sleep(watch)
+        if rejected:
+            raise CommandError(
+                f"{rejected} bulletin(s) acquitté(s) refusé(s) par la base, conservé(s) dans {ballot_log.directory}/rejected-*.log."
+            )
+
+    def drain(self, ballot_log, batch_size):
+        total_rejected = 0
+        for segment, counts, rejected in drain_ballot_log(ballot_log, batch_size):
+            for entry in rejected:
+                self.stderr.write(f"Bulletin refusé ({entry['vote']}, {entry['token']}) : {entry['error']}")
+            total_rejected += len(rejected)
+            self.stdout.write(
+                f"{segment.name} : {counts[201]} bulletin(s) ajouté(s), "
+                f"{counts[200]} déjà présent(s), {len(rejected)} refusé(s)"
+                + (f", conservé(s) dans rejected-{segment.name}." if rejected else ".")
+            )
+        return total_rejected
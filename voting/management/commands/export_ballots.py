@@ -0,0 +1,68 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.export import CONTENT_TYPES, export_chunks, export_rows
+from voting.models import Vote
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class Command(BaseCommand):
+    help = "Exporte les bulletins d'un vote (NDJSON ou CSV) avec une mémoire constante."
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuid", help="UUID du vote")
+        parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="ndjson", help="Format de l'export")
+        parser.add_argument("--output", default="-", help="Fichier de sortie (- pour la sortie standard)")
+        parser.add_argument("--gzip", dest="compress", action="store_true", help="Compresse l'export avec gzip")
+        parser.add_argument(
+            "--after",
+            type=int,
+            metavar="SEQUENCE",
+            help="N'exporte que les bulletins arrivés après celui-ci, à la suite du fichier (reprise d'un export)",
+        )
+
+    def handle(self, *args, vote_uuid, format, output, compress, after, **options):
+        try:
+            vote_id = Vote.objects.values_list("pk", flat=True).get(uuid=vote_uuid)
+        except (Vote.DoesNotExist, ValueError):
+            raise CommandError(f"Vote introuvable : {vote_uuid}")
+
+        if output == "-":
+            stream = sys.stdout.buffer
+        else:
+            if after is not None:
+                self.check_resumed_file(output, compress)
+            stream = open(output, "ab" if after is not None else "wb")
+        try:
+            if compress:
+                # Des membres gzip mis bout à bout forment un fichier gzip valide : une reprise peut compléter le fichier
+                with gzip.GzipFile(fileobj=stream, mode="wb") as gzip_stream:
+                    self.write_export(gzip_stream, vote_id, format, after)
+            else:
+                self.write_export(stream, vote_id, format, after)
+        finally:
+            if output == "-":
+                stream.flush()
+            else:
+                stream.close()
+
+    def write_export(self, stream, vote_id, export_format, after):
+        for chunk in export_chunks(export_rows(vote_id, after), export_format, header=after is None):
+            stream.write(chunk)
+
+    def check_resumed_file(self, output, compress):
+        """Refuse de compléter un fichier compressé par un export non compressé, ou l'inverse."""
+        try:
+            with open(output, "rb") as f:
+                magic = f.read(2)
+        except FileNotFoundError:
+            return
+        if not magic:
+            return
+        if compress and magic != GZIP_MAGIC:
+            raise CommandError(f"{output} n'est pas compressé avec gzip : relancez la reprise sans --gzip.")
+        if not compress and magic == GZIP_MAGIC:
+            raise CommandError(f"{output} est compressé avec gzip : relancez la reprise avec --gzip.")
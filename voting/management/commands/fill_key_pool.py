@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from voting.models import PregeneratedKeyPair, Vote
+
+
+class Command(BaseCommand):
+    help = "Remplit la réserve de paires de clés RSA pré-générées et attribue des clés aux votes qui n'en ont pas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=10, help="Nombre de paires de clés à garder en réserve")
+        parser.add_argument("--key-size", type=int, default=settings.VOTING_KEY_SIZE, help="Taille des clés en bits")
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Reste actif et vérifie la réserve toutes les SECONDS secondes (worker en tâche de fond)",
+        )
+
+    def handle(self, *args, size, key_size, watch, **options):
+        while True:
+            self.fill(size, key_size)
+            if watch is None:
+                break
+            time.sleep(watch)
+
+    def fill(self, size, key_size):
+        for vote in Vote.objects.filter(public_key_pem__isnull=True) | Vote.objects.filter(public_key_pem=""):
+            vote.ensure_keys()
+            self.stdout.write(f"Clés attribuées au vote {vote}")
+
+        missing = size - PregeneratedKeyPair.objects.filter(key_size=key_size).count()
+        for i in range(missing):
+            PregeneratedKeyPair.generate(key_size).save()
+            self.stdout.write(f"Paire de clés {i + 1}/{missing} générée")
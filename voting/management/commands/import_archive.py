@@ -0,0 +1,59 @@
+from collections import Counter
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.archive import ArchiveError, BallotArchive
+from voting.ingest import ingest_ballots
+from voting.models import MerkleTree, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe les bulletins d'une archive binaire (voir voting/archive.py) dans leur ordre "
+        "d'arrivée. Chaque bulletin est vérifié comme s'il était déposé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Archive à importer")
+        parser.add_argument("--vote", dest="vote_uuid", help="UUID du vote (par défaut, celui de l'archive)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Nombre de bulletins par transaction")
+
+    def handle(self, *args, file, vote_uuid, batch_size, **options):
+        try:
+            ballot_archive = BallotArchive(file)
+        except (ArchiveError, OSError) as e:
+            raise CommandError(str(e))
+
+        with ballot_archive:
+            vote_uuid = vote_uuid or ballot_archive.vote_uuid
+            try:
+                vote = Vote.objects.get(uuid=vote_uuid)
+            except (Vote.DoesNotExist, ValueError):
+                raise CommandError(f"Vote introuvable : {vote_uuid}")
+            vote.ensure_keys()
+            if vote.public_key_pem.strip() != ballot_archive.public_key_pem.strip():
+                raise CommandError("La clé publique de l'archive n'est pas celle du vote.")
+
+            counts = Counter()
+            entries = (
+                {"token": ballot.token, "data": ballot.result, "signature": ballot.server_signature}
+                for ballot in ballot_archive
+            )
+            while batch := list(islice(entries, batch_size)):
+                for entry, (status_code, data) in zip(batch, ingest_ballots(vote, batch)):
+                    counts[status_code] += 1
+                    if "error" in data:
+                        self.stderr.write(f"Bulletin {entry['token']} rejeté : {data['error']}")
+
+            self.stdout.write(
+                f"{counts[201]} bulletin(s) ajouté(s), {counts[200]} déjà présent(s), {counts[400]} rejeté(s)."
+            )
+            # Bulletins importés pas encore numérotés (numérotation en cours ailleurs)
+            MerkleTree.sequence_pending(vote.pk, wait=True)
+            tree = MerkleTree.objects.filter(vote_id=vote.pk).first()
+            if tree is not None and tree.size == ballot_archive.size:
+                if bytes(tree.root) == ballot_archive.root:
+                    self.stdout.write("La racine de Merkle du vote est celle de l'archive.")
+                else:
+                    self.stderr.write("La racine de Merkle du vote diffère de celle de l'archive.")
@@ -0,0 +1,47 @@
+import json
+import sys
+from collections import Counter
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.ingest import ingest_ballots
+from voting.models import Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des bulletins collectés hors ligne. Le fichier contient un objet JSON "
+        "{\"token\": ..., \"data\": ..., \"signature\": ...} par ligne (NDJSON)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuid", help="UUID du vote")
+        parser.add_argument("file", help="Fichier NDJSON à importer (- pour l'entrée standard)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Nombre de bulletins par transaction")
+
+    def handle(self, *args, vote_uuid, file, batch_size, **options):
+        try:
+            vote = Vote.objects.get(uuid=vote_uuid)
+        except (Vote.DoesNotExist, ValueError):
+            raise CommandError(f"Vote introuvable : {vote_uuid}")
+
+        stream = sys.stdin if file == "-" else open(file, encoding="utf-8")
+        counts = Counter()
+        with stream:
+            lines = (line for line in stream if line.strip())
+            line_number = 0
+            while batch := list(islice(lines, batch_size)):
+                try:
+                    entries = [json.loads(line) for line in batch]
+                except json.JSONDecodeError as e:
+                    raise CommandError(f"Ligne JSON invalide dans le lot commençant ligne {line_number + 1} : {e}")
+                for offset, (status_code, data) in enumerate(ingest_ballots(vote, entries)):
+                    counts[status_code] += 1
+                    if "error" in data:
+                        self.stderr.write(f"Bulletin {line_number + offset + 1} rejeté : {data['error']}")
+                line_number += len(batch)
+
+        self.stdout.write(
+            f"{counts[201]} bulletin(s) ajouté(s), {counts[200]} déjà présent(s), {counts[400]} rejeté(s)."
+        )
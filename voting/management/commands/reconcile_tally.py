@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from voting import tally
+from voting.models import Ballot, MerkleTree, TallyCounter, Vote
+
+
+def count_ballots(vote_id, size):
+    """Décompte recalculé à partir des `size` premiers bulletins d'un vote."""
+    results = (
+        Ballot.objects.filter(vote_id=vote_id, sequence__lt=size)
+        .values_list("result", flat=True).iterator(chunk_size=2000)
+    )
+    return tally.count_results(json.loads(result) for result in results)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule le décompte des votes à partir de leurs bulletins et vérifie qu'il correspond "
+        "aux compteurs (TallyCounter) ; --fix remplace les compteurs erronés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuids", nargs="*", metavar="vote_uuid", help="UUID des votes (par défaut, tous)")
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reconstruit les compteurs erronés (la numérotation des bulletins du vote attend pendant la reconstruction)",
+        )
+
+    def handle(self, *args, vote_uuids, fix, **options):
+        if vote_uuids:
+            votes = []
+            for vote_uuid in vote_uuids:
+                try:
+                    votes.append(Vote.objects.non_polymorphic().get(uuid=vote_uuid))
+                except (Vote.DoesNotExist, ValueError):
+                    raise CommandError(f"Vote introuvable : {vote_uuid}")
+        else:
+            votes = list(Vote.objects.non_polymorphic().all())
+
+        mismatches = 0
+        for vote in votes:
+            # Les compteurs et le nombre de bulletins sont lus ensemble, la numérotation étant bloquée :
+            # les compteurs sont alors exactement ceux des `size` premiers bulletins
+            with transaction.atomic():
+                size = MerkleTree.lock_sequence(vote.pk).size
+                stored = TallyCounter.get_counts(vote.pk)
+            expected = count_ballots(vote.pk, size)
+            if stored == expected:
+                self.stdout.write(f"{vote.uuid} : {size} bulletin(s), décompte correct.")
+                continue
+
+            mismatches += 1
+            for key in sorted(stored.keys() | expected.keys()):
+                if stored.get(key, 0) != expected.get(key, 0):
+                    self.stderr.write(
+                        f"{vote.uuid} : {key[0]} / {key[1]} : {stored.get(key, 0)} au lieu de {expected.get(key, 0)}"
+                    )
+            if fix:
+                self.rebuild(vote)
+                self.stdout.write(f"{vote.uuid} : compteurs reconstruits.")
+
+        if mismatches and not fix:
+            raise CommandError(f"{mismatches} vote(s) avec un décompte erroné (voir --fix).")
+
+    def rebuild(self, vote):
+        with transaction.atomic():
+            size = MerkleTree.lock_sequence(vote.pk).size
+            TallyCounter.objects.filter(vote_id=vote.pk).delete()
+            TallyCounter.objects.bulk_create(
+                [
+                    TallyCounter(vote_id=vote.pk, candidate=candidate, grade=grade, count=count)
+                    for (candidate, grade), count in count_ballots(vote.pk, size).items()
+                ],
+                batch_size=1000,
+            )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from voting.models import Ballot, MerkleTree
+
+
+class Command(BaseCommand):
+    help = (
+        "Numérote et ajoute à l'arbre de Merkle de leur vote les bulletins déposés qui ne le sont pas "
+        "encore (normalement fait juste après le dépôt)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Reste actif et numérote les bulletins toutes les SECONDS secondes",
+        )
+
+    def handle(self, *args, watch, **options):
+        while True:
+            self.sequence()
+            if watch is None:
+                break
+            time.sleep(watch)
+
+    def sequence(self):
+        vote_ids = Ballot.objects.filter(sequence__isnull=True).values_list("vote_id", flat=True).order_by().distinct()
+        for vote_id in list(vote_ids):
+            count = MerkleTree.sequence_pending(vote_id, wait=True)
+            if count:
+                self.stdout.write(f"Vote {vote_id} : {count} bulletin(s) numéroté(s)")
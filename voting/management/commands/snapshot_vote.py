@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from voting.models import Vote
+from voting.snapshot import SnapshotError, create_snapshot, publish_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Ferme l'urne des votes terminés et écrit leurs données publiques (bulletins, preuves, "
+        "empreinte, racine de Merkle, résultats, clé publique) dans STATIC_ROOT/snapshots/. Les vues "
+        "du vote ne redirigent vers ces fichiers qu'une fois l'instantané publié."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuids", nargs="*", metavar="vote_uuid", help="UUID des votes")
+        parser.add_argument("--closed", action="store_true", help="Traite tous les votes terminés")
+        parser.add_argument(
+            "--publish",
+            action="store_true",
+            help="Publie l'instantané dès qu'il est écrit (quand STATIC_ROOT est servi tel quel)",
+        )
+        parser.add_argument(
+            "--mark-published",
+            action="store_true",
+            help="N'écrit rien : publie les instantanés déjà écrits, une fois leurs fichiers déployés",
+        )
+
+    def handle(self, *args, vote_uuids, closed, publish, mark_published, **options):
+        if closed:
+            votes = list(Vote.objects.filter(end_time__lte=now()))
+        elif vote_uuids:
+            votes = []
+            for vote_uuid in vote_uuids:
+                try:
+                    votes.append(Vote.objects.get(uuid=vote_uuid))
+                except (Vote.DoesNotExist, ValueError):
+                    raise CommandError(f"Vote introuvable : {vote_uuid}")
+        else:
+            raise CommandError("Indiquez des UUID de votes ou --closed.")
+
+        for vote in votes:
+            try:
+                if mark_published:
+                    snapshot = publish_snapshot(vote)
+                else:
+                    snapshot = create_snapshot(vote, publish=publish)
+            except SnapshotError as e:
+                raise CommandError(str(e))
+            state = "publié" if snapshot.published else "pas encore publié"
+            self.stdout.write(f"{vote.uuid} : {snapshot.size} bulletin(s), instantané {snapshot.digest} ({state})")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from voting.models import MerkleTree, TokenFilter, Vote
+
+
+class Command(BaseCommand):
+    help = "Met à jour les filtres des jetons (voir voting/token_filter.py) des votes qui ont reçu de nouveaux bulletins."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Reste actif et met à jour les filtres toutes les SECONDS secondes",
+        )
+
+    def handle(self, *args, watch, **options):
+        while True:
+            self.update()
+            if watch is None:
+                break
+            time.sleep(watch)
+
+    def update(self):
+        filter_sizes = dict(TokenFilter.objects.values_list("vote_id", "size"))
+        tree_sizes = dict(MerkleTree.objects.values_list("vote_id", "size"))
+        for vote_id in Vote.objects.values_list("pk", flat=True):
+            size = tree_sizes.get(vote_id, 0)
+            if vote_id in filter_sizes and filter_sizes[vote_id] >= size:
+                continue
+            TokenFilter.update(vote_id)
+            self.stdout.write(f"Filtre des jetons du vote {vote_id} : {size} bulletin(s)")
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.archive import ArchiveError, BallotArchive
+from voting.export import export_rows
+from voting.models import MerkleTree, Vote
+from voting.verify import CHUNK_SIZE, fetch_vote, format_report, read_archive, read_export, verify_ballots
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie tous les bulletins d'un vote (JSON canonique, signatures) dans un groupe de processus, "
+        "puis recalcule son empreinte et sa racine de Merkle. Les bulletins sont lus dans la base, "
+        "dans un export, dans une archive ou sur l'urne publique d'un site."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("vote_uuid", help="UUID du vote")
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument("--file", help="Export NDJSON ou CSV (éventuellement compressé avec gzip)")
+        source.add_argument("--archive", help="Archive binaire (voir archive_ballots)")
+        source.add_argument("--url", help="Adresse du site dont l'urne publique doit être vérifiée")
+        parser.add_argument("--format", choices=["ndjson", "csv"], help="Format de l'export (par défaut, selon son nom)")
+        parser.add_argument("--workers", type=int, help="Nombre de processus (par défaut, un par cœur ; 0 : aucun)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Nombre de bulletins par lot")
+
+    def handle(self, *args, vote_uuid, file, archive, url, format, workers, chunk_size, **options):
+        # Import local : views.py importe de nombreux modules inutiles pour les autres sources
+        from voting.views import vote_hash_digest
+
+        try:
+            vote = Vote.objects.get(uuid=vote_uuid)
+        except (Vote.DoesNotExist, ValueError):
+            raise CommandError(f"Vote introuvable : {vote_uuid}")
+        vote.ensure_keys()
+
+        progress = self.report_progress if options["verbosity"] >= 2 else None
+
+        if url:
+            public_key_pem, expected_hash, expected_root, ballots = fetch_vote(url, vote.uuid)
+            if public_key_pem.strip() != vote.public_key_pem.strip():
+                raise CommandError("La clé publique publiée n'est pas celle du vote.")
+            report = verify_ballots(vote.public_key_pem, ballots, workers, chunk_size, progress)
+        elif archive:
+            try:
+                ballot_archive = BallotArchive(archive)
+            except (ArchiveError, OSError) as e:
+                raise CommandError(str(e))
+            with ballot_archive:
+                if ballot_archive.vote_uuid != str(vote.uuid):
+                    raise CommandError(f"L'archive est celle du vote {ballot_archive.vote_uuid}.")
+                expected_hash, expected_root = None, ballot_archive.root
+                report = verify_ballots(vote.public_key_pem, read_archive(ballot_archive), workers, chunk_size, progress)
+        elif file:
+            export_format = format or ("csv" if ".csv" in file else "ndjson")
+            expected_hash, expected_root = None, None
+            with open(file, "rb") as f:
+                report = verify_ballots(vote.public_key_pem, read_export(f, export_format), workers, chunk_size, progress)
+        else:
+            # Les deux côtés portent sur les mêmes bulletins : ceux numérotés dans l'arbre lu ici
+            # (les bulletins pas encore numérotés sont ignorés)
+            tree = MerkleTree.objects.filter(vote_id=vote.pk).first()
+            size = tree.size if tree is not None else 0
+            expected_hash = vote_hash_digest(vote.uuid, size)
+            expected_root = tree.root if tree is not None else None
+            ballots = (row[:4] for row in export_rows(vote.pk, before=size))
+            report = verify_ballots(vote.public_key_pem, ballots, workers, chunk_size, progress)
+
+        lines = format_report(report, expected_hash, expected_root)
+        self.stdout.write("\n".join(lines[:-1]))
+        if lines[-1] != "OK":
+            raise CommandError(lines[-1])
+        self.stdout.write(self.style.SUCCESS(lines[-1]))
+
+    def report_progress(self, count):
+        self.stderr.write(f"{count} bulletin(s) vérifié(s)...")
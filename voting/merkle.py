@@ -0,0 +1,97 @@
+"""
+Arbre de Merkle des bulletins d'un vote, construit comme celui de Certificate Transparency (RFC 6962).
+
+Les feuilles sont les lignes "jeton:résultat" des bulletins, dans l'ordre d'arrivée (Ballot.sequence).
+Un nœud (niveau, index) couvre les feuilles [index * 2^niveau, (index + 1) * 2^niveau) ; seuls les
+nœuds complets sont stockés. Ce module ne dépend pas de Django : il sert aussi à la vérification
+autonome d'une preuve d'inclusion.
+"""
+import hashlib
+
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaf_hash(token: str, result: str) -> bytes:
+    return hashlib.sha256(b"\x00" + f"{token}:{result}".encode("utf-8")).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def range_nodes(start, end):
+    """Nœuds complets (niveau, index) qui, de gauche à droite, couvrent exactement les feuilles [start, end)."""
+    nodes = []
+    while start < end:
+        level = 0
+        while start % (2 << level) == 0 and start + (2 << level) <= end:
+            level += 1
+        nodes.append((level, start >> level))
+        start += 1 << level
+    return nodes
+
+
+def range_hash(start, end, digests):
+    """Empreinte du sous-arbre des feuilles [start, end), à partir des nœuds de range_nodes(start, end)."""
+    nodes = range_nodes(start, end)
+    if not nodes:
+        return EMPTY_ROOT
+    result = digests[nodes[-1]]
+    for node in reversed(nodes[:-1]):
+        result = node_hash(digests[node], result)
+    return result
+
+
+def append_leaves(size, digests, leaves):
+    """
+    Ajoute des feuilles à un arbre de `size` feuilles.
+
+    `digests` doit contenir au moins les nœuds de range_nodes(0, size) ; il est complété avec
+    les nouveaux nœuds. Renvoie les nouveaux nœuds {(niveau, index): empreinte} et la nouvelle racine.
+    """
+    new_nodes = {}
+    for index, leaf in enumerate(leaves, start=size):
+        new_nodes[(0, index)] = digests[(0, index)] = leaf
+        level = 0
+        # Tant que le nœud est un fils droit, son parent est complet
+        while (index >> level) & 1:
+            parent = node_hash(digests[(level, (index >> level) - 1)], digests[(level, index >> level)])
+            level += 1
+            new_nodes[(level, index >> level)] = digests[(level, index >> level)] = parent
+    return new_nodes, range_hash(0, size + len(leaves), digests)
+
+
+def inclusion_path(index, size):
+    """Plages [début, fin) dont les empreintes forment la preuve d'inclusion de la feuille `index`, de la feuille vers la racine."""
+    path = []
+    start, end = 0, size
+    while end - start > 1:
+        split = 1 << ((end - start - 1).bit_length() - 1)
+        if index < start + split:
+            path.append((start + split, end))
+            end = start + split
+        else:
+            path.append((start, start + split))
+            start += split
+    return path[::-1]
+
+
+def verify_inclusion(leaf, index, size, path, root):
+    """Vérifie une preuve d'inclusion (algorithme de la RFC 9162, section 2.1.3.2)."""
+    if index >= size:
+        return False
+    fn, sn = index, size - 1
+    result = leaf
+    for digest in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(digest, result)
+            while fn and not fn & 1:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, digest)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result == root
@@ -0,0 +1,184 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.timezone import now
+
+from .keys import fingerprint, key_cache
+from .models import ChoiceVote, PersonVote, Vote, VoteSnapshot
+
+CACHE_KEY_PREFIX = "voting:vote-metadata"
+CACHE_VERSION_KEY = f"{CACHE_KEY_PREFIX}:version"
+
+
+@dataclass(frozen=True)
+class VoteMetadata:
+    """
+    Ce dont les vues de signature et de dépôt ont besoin sur un vote, sans requête polymorphe.
+
+    La clé privée n'en fait pas partie (ces métadonnées peuvent être stockées dans un cache
+    partagé) : seule son empreinte y figure, et le PEM est chargé à la demande depuis la base
+    puis gardé dans le cache de clés du processus.
+    """
+    id: int
+    uuid: str
+    name: str
+    vote_type: str  # Nom du modèle concret : "personvote", "choicevote" ou "vote"
+    start_time: datetime
+    end_time: datetime
+    public_key_pem: str
+    private_key_fingerprint: str
+    # Personnes (PersonVote) ou propositions (ChoiceVote) du vote
+    candidate_ids: frozenset = field(default_factory=frozenset)
+    # Dossier de l'instantané statique du vote, si ses fichiers sont publiés (voir snapshot.py)
+    snapshot_digest: str = ""
+
+    @classmethod
+    def from_vote(cls, vote):
+        vote.ensure_keys()
+        if isinstance(vote, PersonVote):
+            candidate_ids = vote.persons.values_list("pk", flat=True)
+        elif isinstance(vote, ChoiceVote):
+            candidate_ids = vote.propositions.values_list("pk", flat=True)
+        else:
+            candidate_ids = []
+        return cls(
+            id=vote.pk,
+            uuid=str(vote.uuid),
+            name=vote.name,
+            vote_type=vote._meta.model_name,
+            start_time=vote.start_time,
+            end_time=vote.end_time,
+            public_key_pem=vote.public_key_pem,
+            private_key_fingerprint=fingerprint(vote.private_key_pem),
+            candidate_ids=frozenset(str(candidate_id) for candidate_id in candidate_ids),
+            snapshot_digest=VoteSnapshot.objects.filter(vote_id=vote.pk, published=True)
+            .values_list("digest", flat=True).first() or "",
+        )
+
+    def __str__(self):
+        return self.name
+
+    def can_vote(self, user):
+        """Même résultat que Vote.can_vote(), sans charger le vote : une seule requête sans jointure."""
+        if now() < self.start_time:
+            return (False, "not_started")
+        if now() > self.end_time:
+            return (False, "ended")
+        if user.is_anonymous or not Vote.allowed_users.through.objects.filter(
+            vote_id=self.id, customuser_id=user.pk
+        ).exists():
+            return (False, "user")
+        return (True, "")
+
+    def get_public_key(self):
+        return key_cache.get_public_key(self.uuid, self.public_key_pem)
+
+    def get_private_key_pem(self):
+        return key_cache.get_private_key_pem(
+            self.uuid,
+            self.private_key_fingerprint,
+            lambda: Vote.objects.filter(pk=self.id).values_list("private_key_pem", flat=True).get(),
+        )
+
+    def get_private_key(self):
+        return key_cache.get_private_key(self.uuid, self.get_private_key_pem())
+
+
+class VoteMetadataCache:
+    """
+    Cache à deux niveaux des métadonnées de vote, indexé par UUID.
+
+    Le premier niveau est un dictionnaire du processus dont les entrées expirent après
+    VOTING_METADATA_CACHE_TTL secondes ; le second est le cache de Django, partagé entre les
+    processus s'il est configuré ainsi. Les signaux (voir signals.py) invalident les deux niveaux,
+    mais les autres processus peuvent garder une copie locale périmée jusqu'à son expiration.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return settings.VOTING_METADATA_CACHE_TTL
+
+    def _cache_key(self, vote_uuid, version):
+        return f"{CACHE_KEY_PREFIX}:{version}:{vote_uuid}"
+
+    def get_local(self, vote_uuid):
+        """Renvoie les métadonnées du cache du processus, ou None (sans aucune entrée-sortie)."""
+        with self._lock:
+            entry = self._entries.get(str(vote_uuid))
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def get(self, vote_uuid):
+        """Renvoie les métadonnées d'un vote ; lève Vote.DoesNotExist s'il n'existe pas."""
+        key = str(vote_uuid)
+        if (metadata := self.get_local(key)) is not None:
+            return metadata
+
+        with self._lock:
+            generation = self._generation
+        cache_key = self._cache_key(key, cache.get_or_set(CACHE_VERSION_KEY, 1, None))
+        metadata = cache.get(cache_key)
+        if metadata is None:
+            metadata = VoteMetadata.from_vote(Vote.objects.get(uuid=key))
+            cache.set(cache_key, metadata, self.ttl)
+
+        with self._lock:
+            # Des métadonnées chargées pendant une invalidation pourraient déjà être périmées
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, metadata)
+        return metadata
+
+    async def aget(self, vote_uuid):
+        if (metadata := self.get_local(vote_uuid)) is not None:
+            return metadata
+        return await sync_to_async(self.get)(vote_uuid)
+
+    def invalidate(self, vote_uuid):
+        key = str(vote_uuid)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+        cache.delete(self._cache_key(key, cache.get_or_set(CACHE_VERSION_KEY, 1, None)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+        # Change le préfixe de toutes les clés du cache de Django
+        try:
+            cache.incr(CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(CACHE_VERSION_KEY, 2, None)
+
+
+metadata_cache = VoteMetadataCache()
+
+
+def get_vote_metadata(vote_uuid):
+    return metadata_cache.get(vote_uuid)
+
+
+def get_vote_metadata_or_404(vote_uuid):
+    try:
+        return metadata_cache.get(vote_uuid)
+    except Vote.DoesNotExist:
+        raise Http404("Vote introuvable")
+
+
+async def aget_vote_metadata_or_404(vote_uuid):
+    try:
+        return await metadata_cache.aget(vote_uuid)
+    except Vote.DoesNotExist:
+        raise Http404("Vote introuvable")
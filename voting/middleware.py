@@ -0,0 +1,205 @@
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+# Catégorie de chaque point d'entrée limité : la signature, le dépôt des bulletins et la lecture
+# de l'urne publique ont chacun leurs propres limites, pour qu'un afflux de demandes de
+# signature ne puisse pas empêcher la consultation de l'urne
+ENDPOINT_CATEGORIES = {
+    "sign_blind_token": "sign",
+    "session_sign": "sign",
+    "submit_vote": "submit",
+    "submit_vote_batch": "submit",
+    "session_submit": "submit",
+    "ballot": "read",
+    "lookup_ballots": "read",
+    "ballot_list": "read",
+    "vote_hash": "read",
+    "export_ballots": "read",
+    "ballot_feed": "read",
+    "token_filter": "read",
+    "token_filter_version": "read",
+    "merkle_root": "read",
+    "ballot_proof": "read",
+    "get_public_key": "read",
+    "session_public_keys": "read",
+}
+
+# Catégories limitées par utilisateur connecté (les autres le sont par adresse IP)
+PER_USER_CATEGORIES = {"sign"}
+
+
+class LocalTokenBuckets:
+    """Seaux à jetons gardés en mémoire : les limites s'appliquent à chaque processus séparément."""
+
+    # Au-delà de ce nombre de seaux, les seaux pleins (donc inutiles) sont supprimés
+    MAX_BUCKETS = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Prend un jeton ; renvoie 0 si c'est possible, sinon le nombre de secondes à attendre."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        return wait
+
+    async def atake(self, key, rate, burst):
+        return self.take(key, rate, burst)
+
+
+class CacheTokenBuckets:
+    """
+    Seaux à jetons stockés dans le cache de Django, partagés entre les processus.
+
+    La lecture et l'écriture d'un seau ne sont pas atomiques : deux requêtes simultanées
+    peuvent prendre le même jeton, la limite est donc approximative.
+    """
+
+    def _update(self, bucket, rate, burst):
+        now = time.time()
+        tokens, last = bucket or (burst, now)
+        tokens = min(burst, tokens + (now - last) * rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait:
+            tokens -= 1
+        return wait, (tokens, now), math.ceil(burst / rate) + 1
+
+    def take(self, key, rate, burst):
+        wait, bucket, timeout = self._update(cache.get(f"voting:bucket:{key}"), rate, burst)
+        cache.set(f"voting:bucket:{key}", bucket, timeout)
+        return wait
+
+    async def atake(self, key, rate, burst):
+        wait, bucket, timeout = self._update(await cache.aget(f"voting:bucket:{key}"), rate, burst)
+        await cache.aset(f"voting:bucket:{key}", bucket, timeout)
+        return wait
+
+
+def get_client_ip(request):
+    if value := request.META.get(settings.VOTING_CLIENT_IP_HEADER):
+        # X-Forwarded-For : "<envoyé par le client>, client, proxy1" ; chaque proxy ajoute à droite
+        # l'adresse qui s'est connectée à lui, seules les VOTING_TRUSTED_PROXY_COUNT dernières
+        # entrées sont donc sûres
+        entries = value.split(",")
+        return entries[max(0, len(entries) - settings.VOTING_TRUSTED_PROXY_COUNT)].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def rejection(status, message, retry_after):
+    response = JsonResponse({"error": message}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Contrôle d'admission des points d'entrée de signature, de dépôt et de lecture de l'urne.
+
+    Chaque catégorie a une limite de requêtes simultanées par processus (VOTING_CONCURRENCY_LIMITS),
+    au-delà de laquelle la requête est refusée immédiatement avec un 503, et un débit par
+    utilisateur ou par adresse IP (VOTING_RATE_LIMITS, seaux à jetons), au-delà duquel elle est
+    refusée avec un 429. Dans les deux cas, l'en-tête Retry-After indique quand réessayer.
+
+    Désactivé sauf si VOTING_ADMISSION_CONTROL est activé. Les limites par adresse IP demandent
+    de choisir l'en-tête qui contient l'adresse du client (VOTING_CLIENT_IP_HEADER) : derrière
+    un proxy, REMOTE_ADDR est la même pour tous les électeurs, qui partageraient un seul seau.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.VOTING_ADMISSION_CONTROL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        self.limiters = {
+            category: threading.BoundedSemaphore(limit)
+            for category, limit in settings.VOTING_CONCURRENCY_LIMITS.items()
+            if limit
+        }
+        self.rates = {category: limits for category, limits in settings.VOTING_RATE_LIMITS.items() if limits[0]}
+        if not settings.VOTING_CLIENT_IP_HEADER and set(self.rates) - PER_USER_CATEGORIES:
+            raise ImproperlyConfigured(
+                "VOTING_RATE_LIMITS limite des requêtes par adresse IP : indiquez dans VOTING_CLIENT_IP_HEADER "
+                "l'en-tête qui contient l'adresse du client (\"REMOTE_ADDR\" sans proxy)."
+            )
+        self.buckets = CacheTokenBuckets() if settings.VOTING_RATE_LIMIT_STORE == "cache" else LocalTokenBuckets()
+
+    def get_category(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return ENDPOINT_CATEGORIES.get(match.url_name)
+
+    def get_bucket_key(self, category, request, user):
+        if category in PER_USER_CATEGORIES and user.is_authenticated:
+            return f"{category}:user:{user.pk}"
+        return f"{category}:ip:{get_client_ip(request)}"
+
+    def too_many_requests(self, wait):
+        return rejection(429, "Trop de requêtes, veuillez réessayer plus tard.", wait)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        category = self.get_category(request)
+        if category is None:
+            return self.get_response(request)
+
+        # La limite de concurrence passe en premier : elle ne coûte rien, alors que
+        # l'identification de l'utilisateur peut nécessiter des requêtes
+        limiter = self.limiters.get(category)
+        if limiter is not None and not limiter.acquire(blocking=False):
+            return rejection(503, "Le serveur est surchargé, veuillez réessayer.", 1)
+        try:
+            if category in self.rates:
+                user = request.user if category in PER_USER_CATEGORIES else None
+                wait = self.buckets.take(self.get_bucket_key(category, request, user), *self.rates[category])
+                if wait:
+                    return self.too_many_requests(wait)
+            return self.get_response(request)
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+    async def __acall__(self, request):
+        category = self.get_category(request)
+        if category is None:
+            return await self.get_response(request)
+
+        limiter = self.limiters.get(category)
+        if limiter is not None and not limiter.acquire(blocking=False):
+            return rejection(503, "Le serveur est surchargé, veuillez réessayer.", 1)
+        try:
+            if category in self.rates:
+                user = await request.auser() if category in PER_USER_CATEGORIES else None
+                wait = await self.buckets.atake(self.get_bucket_key(category, request, user), *self.rates[category])
+                if wait:
+                    return self.too_many_requests(wait)
+            return await self.get_response(request)
+        finally:
+            if limiter is not None:
+                limiter.release()
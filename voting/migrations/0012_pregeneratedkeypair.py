@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("voting", "0011_auto_20260103_1011"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PregeneratedKeyPair",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key_size", models.PositiveIntegerField()),
+                ("public_key_pem", models.TextField(editable=False)),
+                ("private_key_pem", models.TextField(editable=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Paire de clés pré-générée",
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0012_pregeneratedkeypair'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerkleNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('index', models.PositiveBigIntegerField()),
+                ('digest', models.BinaryField(max_length=32)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MerkleTree',
+            fields=[
+                ('vote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='merkle_tree', serialize=False, to='voting.vote')),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('root', models.BinaryField(default=b"\xe3\xb0\xc4B\x98\xfc\x1c\x14\x9a\xfb\xf4\xc8\x99o\xb9$'\xaeA\xe4d\x9b\x93L\xa4\x95\x99\x1bxR\xb8U", max_length=32)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ballot',
+            name='sequence',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='ballot',
+            constraint=models.UniqueConstraint(fields=('vote', 'sequence'), name='unique_ballot_sequence'),
+        ),
+        migrations.AddField(
+            model_name='merklenode',
+            name='vote',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='voting.vote'),
+        ),
+        migrations.AddConstraint(
+            model_name='merklenode',
+            constraint=models.UniqueConstraint(fields=('vote', 'level', 'index'), name='unique_merkle_node'),
+        ),
+    ]
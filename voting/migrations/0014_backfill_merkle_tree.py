@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from voting import merkle
+
+
+def build_trees(apps, schema_editor):
+    Ballot = apps.get_model("voting", "Ballot")
+    MerkleNode = apps.get_model("voting", "MerkleNode")
+    MerkleTree = apps.get_model("voting", "MerkleTree")
+
+    vote_ids = Ballot.objects.values_list("vote_id", flat=True).distinct()
+    for vote_id in vote_ids:
+        # Les bulletins existants sont numérotés dans leur ordre d'arrivée
+        ballots = list(Ballot.objects.filter(vote_id=vote_id).order_by("created_at", "id"))
+        for sequence, ballot in enumerate(ballots):
+            ballot.sequence = sequence
+        Ballot.objects.bulk_update(ballots, ["sequence"], batch_size=1000)
+
+        nodes, root = merkle.append_leaves(0, {}, [merkle.leaf_hash(ballot.token, ballot.result) for ballot in ballots])
+        MerkleNode.objects.bulk_create(
+            [
+                MerkleNode(vote_id=vote_id, level=level, index=index, digest=digest)
+                for (level, index), digest in nodes.items()
+            ],
+            batch_size=1000,
+        )
+        MerkleTree.objects.create(vote_id=vote_id, size=len(ballots), root=root)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("voting", "0013_merkle_tree"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_trees, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0014_backfill_merkle_tree'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteSnapshot',
+            fields=[
+                ('vote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='voting.vote')),
+                ('digest', models.CharField(max_length=64)),
+                ('size', models.PositiveBigIntegerField(help_text="Nombre de bulletins de l'instantané")),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='merkletree',
+            name='frozen',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0015_vote_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ballot',
+            index=models.Index(fields=['vote', 'token'], name='ballot_vote_token_idx'),
+        ),
+    ]
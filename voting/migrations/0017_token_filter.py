@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0016_ballot_vote_token_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenFilter',
+            fields=[
+                ('vote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_filter', serialize=False, to='voting.vote')),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='Nombre de bulletins du filtre')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0017_token_filter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TallyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('candidate', models.CharField(max_length=64)),
+                ('grade', models.CharField(max_length=16)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('vote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='voting.vote')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vote', 'candidate', 'grade'), name='unique_tally_counter')],
+            },
+        ),
+    ]
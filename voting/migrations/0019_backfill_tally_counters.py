@@ -0,0 +1,37 @@
+import json
+
+from django.db import migrations
+
+from voting import tally
+
+
+def count_ballots(apps, schema_editor):
+    Ballot = apps.get_model("voting", "Ballot")
+    TallyCounter = apps.get_model("voting", "TallyCounter")
+
+    vote_ids = Ballot.objects.values_list("vote_id", flat=True).distinct()
+    for vote_id in vote_ids:
+        # Seuls les bulletins de l'arbre de Merkle du vote sont comptés
+        results = (
+            Ballot.objects.filter(vote_id=vote_id, sequence__isnull=False)
+            .values_list("result", flat=True).iterator(chunk_size=2000)
+        )
+        counts = tally.count_results(json.loads(result) for result in results)
+        TallyCounter.objects.bulk_create(
+            [
+                TallyCounter(vote_id=vote_id, candidate=candidate, grade=grade, count=count)
+                for (candidate, grade), count in counts.items()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("voting", "0018_tally_counter"),
+    ]
+
+    operations = [
+        migrations.RunPython(count_ballots, reverse_code=migrations.RunPython.noop),
+    ]
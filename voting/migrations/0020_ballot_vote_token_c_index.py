@@ -0,0 +1,27 @@
+from django.db import migrations
+
+# Index du tri binaire des jetons (voir models.binary_collation). Les autres moteurs n'en ont pas
+# besoin (SQLite compare déjà par octets) ou ne savent pas indexer une expression COLLATE.
+INDEX_NAME = "ballot_vote_token_c_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        table = schema_editor.quote_name(apps.get_model("voting", "Ballot")._meta.db_table)
+        schema_editor.execute(f'CREATE INDEX {schema_editor.quote_name(INDEX_NAME)} ON {table} ("vote_id", "token" COLLATE "C")')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(INDEX_NAME)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("voting", "0019_backfill_tally_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, reverse_code=drop_index),
+    ]
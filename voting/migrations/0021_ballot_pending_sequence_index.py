@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0020_ballot_vote_token_c_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ballot',
+            index=models.Index(condition=models.Q(('sequence__isnull', True)), fields=['vote', 'id'], name='ballot_pending_sequence_idx'),
+        ),
+    ]
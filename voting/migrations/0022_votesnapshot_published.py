@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0021_ballot_pending_sequence_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votesnapshot',
+            name='published',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,12 +1,21 @@
+import json
 import uuid
+from collections import defaultdict
+from functools import partial
 
 from allauth.account.models import EmailAddress
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Collate
 from django.utils.timezone import now
 from django_countries.fields import CountryField
 from polymorphic.models import PolymorphicModel
-import rsa
+
+from . import canonical, merkle, tally, token_filter
+from .backends import get_backend
+from .keys import key_cache
 
 
 class CustomUser(AbstractUser):
@@ -44,6 +53,45 @@ class Person(models.Model):
         return self.name
 
 
+class PregeneratedKeyPair(models.Model):
+    """
+    Réserve de paires de clés RSA générées à l'avance (commande fill_key_pool),
+    pour ne jamais avoir à générer une clé pendant une requête.
+    """
+    key_size = models.PositiveIntegerField()
+    public_key_pem = models.TextField(editable=False)
+    private_key_pem = models.TextField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Paire de clés pré-générée"
+
+    @classmethod
+    def generate(cls, key_size):
+        """Génère une nouvelle paire de clés (non enregistrée) avec le moteur cryptographique configuré."""
+        (pub, priv) = get_backend().generate_keys(key_size)
+        return cls(
+            key_size=key_size,
+            public_key_pem=pub.save_pkcs1().decode('utf-8'),
+            private_key_pem=priv.save_pkcs1().decode('utf-8'),
+        )
+
+    @classmethod
+    def claim(cls, key_size):
+        """
+        Retire une paire de clés de la réserve, ou en génère une si la réserve est vide.
+
+        Le DELETE sert de verrou : seule la requête qui supprime effectivement la ligne
+        peut utiliser la paire, même sur une base sans SELECT ... FOR UPDATE.
+        """
+        for pair in cls.objects.filter(key_size=key_size).order_by("pk")[:5]:
+            deleted, _ = cls.objects.filter(pk=pair.pk).delete()
+            if deleted:
+                pair.pk = None
+                return pair
+        return cls.generate(key_size)
+
+
 class Vote(PolymorphicModel):
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     name = models.CharField(max_length=255)
@@ -55,18 +103,56 @@ class Vote(PolymorphicModel):
     private_key_pem = models.TextField(blank=True, null=True, editable=False)
     public_key_pem = models.TextField(blank=True, null=True, editable=False)
 
-    def get_keys(self):
-        """Récupère les clés ou les génère à la volée si elles n'existent pas."""
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Les clés sont attribuées dès l'enregistrement du vote, pas lors de la première requête
         if not self.public_key_pem or not self.private_key_pem:
-            # Génération d'une paire de clés 2048 bits spécifique à ce vote
-            (pub, priv) = rsa.newkeys(2048)
-            self.public_key_pem = pub.save_pkcs1().decode('utf-8')
-            self.private_key_pem = priv.save_pkcs1().decode('utf-8')
-            self.save()
+            self.ensure_keys()
+
+    def ensure_keys(self):
+        """
+        Attribue une paire de clés à ce vote si elle n'existe pas encore.
 
-        pub = rsa.PublicKey.load_pkcs1(self.public_key_pem.encode('utf-8'))
-        priv = rsa.PrivateKey.load_pkcs1(self.private_key_pem.encode('utf-8'))
-        return pub, priv
+        La paire est prise dans la réserve pré-générée (ou générée à défaut), puis attribuée
+        par un UPDATE conditionnel : si deux requêtes concurrentes arrivent ici, une seule
+        paire de clés peut gagner, et la paire perdante retourne dans la réserve.
+        """
+        if self.public_key_pem and self.private_key_pem:
+            return
+
+        pair = PregeneratedKeyPair.claim(settings.VOTING_KEY_SIZE)
+        missing_keys = (
+            Q(public_key_pem__isnull=True) | Q(public_key_pem="")
+            | Q(private_key_pem__isnull=True) | Q(private_key_pem="")
+        )
+        updated = Vote.objects.filter(missing_keys, pk=self.pk).update(
+            public_key_pem=pair.public_key_pem,
+            private_key_pem=pair.private_key_pem,
+        )
+        if updated:
+            self.public_key_pem = pair.public_key_pem
+            self.private_key_pem = pair.private_key_pem
+        else:
+            pair.save()
+            self.refresh_from_db(fields=["public_key_pem", "private_key_pem"])
+
+    def get_public_key(self):
+        """Récupère la clé publique désérialisée, depuis le cache du processus si possible."""
+        self.ensure_keys()
+        return key_cache.get_public_key(self.uuid, self.public_key_pem)
+
+    def get_private_key(self):
+        """Récupère la clé privée désérialisée, depuis le cache du processus si possible."""
+        self.ensure_keys()
+        return key_cache.get_private_key(self.uuid, self.private_key_pem)
+
+    def get_private_key_pem(self):
+        self.ensure_keys()
+        return self.private_key_pem
+
+    def get_keys(self):
+        """Récupère les clés ou les génère à la volée si elles n'existent pas."""
+        return self.get_public_key(), self.get_private_key()
 
     def can_vote(self, user):
         """Vérifie si l'utilisateur a le droit de voter."""
@@ -119,6 +205,24 @@ class VoterStatus(models.Model):
         unique_together = ('user', 'vote')
         verbose_name = "Statut de signature de l'électeur"
 
+# Nombre maximal de bulletins numérotés et ajoutés à l'arbre de Merkle de leur vote par requête
+SEQUENCE_BATCH_SIZE = 1000
+
+# Collation de chaque moteur de base de données qui compare les chaînes par points de code, comme Python
+BINARY_COLLATIONS = {"postgresql": "C", "sqlite": "BINARY", "mysql": "utf8mb4_bin"}
+
+
+def binary_collation(field_name):
+    """
+    Expression du champ comparée et triée par points de code, quelle que soit la collation de la base.
+
+    vote_hash et la pagination de la liste des bulletins trient par jeton : leur ordre ne doit
+    dépendre ni du moteur ni de la langue de la base, pour qu'un tiers puisse le reproduire.
+    """
+    collation = BINARY_COLLATIONS.get(connection.vendor)
+    return Collate(field_name, collation) if collation else F(field_name)
+
+
 class Ballot(models.Model):
     """
     L'urne numérique. Ce modèle n'a AUCUNE relation avec CustomUser.
@@ -138,17 +242,338 @@ class Ballot(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Numéro d'arrivée du bulletin dans son vote (à partir de 0), qui est aussi l'index de sa feuille
+    # dans l'arbre de Merkle du vote ; vide tant que le bulletin n'a pas été numéroté (voir MerkleTree)
+    sequence = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vote", "sequence"], name="unique_ballot_sequence"),
+        ]
+        indexes = [
+            # Pagination par jeton de la liste des bulletins d'un vote (BallotListView) ; avec
+            # PostgreSQL, l'index ballot_vote_token_c_idx (migration 0020) sert au tri binaire
+            models.Index(fields=["vote", "token"], name="ballot_vote_token_idx"),
+            # Bulletins à numéroter (MerkleTree.append_pending)
+            models.Index(
+                fields=["vote", "id"], condition=models.Q(sequence__isnull=True), name="ballot_pending_sequence_idx"
+            ),
+        ]
+
+    # Objet décodé du champ 'result', une fois sa forme canonique vérifiée
+    result_data = None
+    _validated_result = None
+
+    def validate_result(self):
+        """Vérifie que le JSON est minifié correctement, sinon lève une ValueError."""
+        if self._validated_result != self.result:
+            self.set_validated_result(canonical.loads(self.result))
+
+    def set_validated_result(self, result_data):
+        """Indique que 'result' a déjà été vérifié par canonical.loads(), qui a renvoyé result_data."""
+        self.result_data = result_data
+        self._validated_result = self.result
+
     def save(self, *args, **kwargs):
-        # On vérifie si le JSON est minifié correctement
-        import json
-        try:
-            parsed = json.loads(self.result)
-            expected_result = json.dumps(parsed, sort_keys=True, separators=(',', ':'))
-        except json.JSONDecodeError:
-            raise ValueError("Le champ 'result' doit être un JSON valide.")
-        if self.result != expected_result:
-            raise ValueError("Le champ 'result' doit être un JSON minifié, trié par clés, sans espaces inutiles.")
-        super().save(*args, **kwargs)
+        self.validate_result()
+        if not self._state.adding or self.sequence is not None:
+            super().save(*args, **kwargs)
+            return
+        # Nouveau bulletin : il sera numéroté et ajouté à l'arbre de Merkle après la transaction
+        with transaction.atomic():
+            MerkleTree.hold_open(self.vote_id)
+            super().save(*args, **kwargs)
+            MerkleTree.sequence_on_commit(self.vote_id)
 
     def __str__(self):
         return f"Ballot {self.token[:15]}... ({self.vote.name})"
+
+
+class BallotBoxClosed(Exception):
+    """L'urne du vote est close (son instantané a été publié) : aucun bulletin ne peut plus y entrer."""
+
+    def __init__(self, message="L'urne de ce vote est close : les résultats ont été publiés."):
+        super().__init__(message)
+
+
+class MerkleTree(models.Model):
+    """
+    État de l'arbre de Merkle des bulletins d'un vote (voir merkle.py) : nombre de feuilles et racine.
+
+    La ligne sert aussi de verrou, à trois niveaux :
+    - un dépôt la verrouille en partage (hold_open) : les dépôts d'un vote ne s'attendent pas
+      entre eux, et l'urne ne peut pas être close pendant qu'un dépôt est en cours ;
+    - la numérotation (lock_sequence) ajoute à l'arbre, par lots, les bulletins déposés et pas
+      encore numérotés, sans bloquer les dépôts ; elle est lancée après chaque dépôt
+      (sequence_on_commit), et ne fait rien si une autre numérotation est en cours, celle-ci
+      revérifiant, une fois son verrou relâché, qu'aucun bulletin n'attend plus ;
+    - la fermeture de l'urne (lock) attend la fin des dépôts en cours et bloque les suivants.
+
+    Un bulletin n'apparaît donc dans l'arbre (et dans le décompte) qu'une fois numéroté, un peu
+    après son dépôt. Avec un autre moteur que PostgreSQL, le verrou partagé est un verrou exclusif
+    et les dépôts d'un vote sont sérialisés.
+    """
+    vote = models.OneToOneField(Vote, on_delete=models.CASCADE, primary_key=True, related_name="merkle_tree")
+    size = models.PositiveBigIntegerField(default=0)
+    root = models.BinaryField(max_length=32, default=merkle.EMPTY_ROOT)
+    # Urne close avant la publication de l'instantané du vote (voir snapshot.py)
+    frozen = models.BooleanField(default=False)
+
+    @classmethod
+    def lock(cls, vote_id):
+        """
+        Verrouille l'arbre d'un vote, en le créant au besoin, contre les dépôts et la numérotation.
+        À appeler dans une transaction.
+        """
+        tree, _ = cls.objects.select_for_update().get_or_create(vote_id=vote_id)
+        return tree
+
+    @classmethod
+    def lock_sequence(cls, vote_id, skip_locked=False):
+        """
+        Verrouille l'arbre d'un vote contre les autres numérotations, sans bloquer les dépôts
+        (SELECT ... FOR NO KEY UPDATE avec PostgreSQL). À appeler dans une transaction.
+
+        Avec `skip_locked`, renvoie None au lieu d'attendre si l'arbre est déjà verrouillé.
+        """
+        features = connection.features
+        queryset = cls.objects.select_for_update(
+            no_key=features.has_select_for_no_key_update,
+            skip_locked=skip_locked and features.has_select_for_update_skip_locked,
+        )
+        if skip_locked:
+            return queryset.filter(vote_id=vote_id).first()
+        tree, _ = queryset.get_or_create(vote_id=vote_id)
+        return tree
+
+    @classmethod
+    def hold_open(cls, vote_id):
+        """
+        Lève BallotBoxClosed si l'urne du vote est close, sinon l'empêche d'être close avant la fin
+        de la transaction en cours, sans bloquer les autres dépôts (SELECT ... FOR KEY SHARE avec
+        PostgreSQL). À appeler dans la transaction qui insère les bulletins.
+        """
+        for _ in range(2):
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT frozen FROM {connection.ops.quote_name(cls._meta.db_table)} "
+                        "WHERE vote_id = %s FOR KEY SHARE",
+                        [vote_id],
+                    )
+                    row = cursor.fetchone()
+            else:
+                row = cls.objects.select_for_update().filter(vote_id=vote_id).values_list("frozen").first()
+            if row is not None:
+                break
+            # Premier bulletin du vote
+            cls.objects.get_or_create(vote_id=vote_id)
+        if row[0]:
+            raise BallotBoxClosed
+
+    @classmethod
+    def sequence_pending(cls, vote_id, wait=False):
+        """
+        Numérote et ajoute à l'arbre les bulletins du vote qui ne le sont pas encore ; renvoie leur
+        nombre. Sans `wait`, ne fait rien si une autre numérotation est en cours.
+
+        Un bulletin validé pendant une numérotation, après sa dernière lecture, trouve l'arbre
+        verrouillé et n'est pas numéroté par son propre dépôt : c'est pourquoi, une fois son verrou
+        relâché, la numérotation recommence tant qu'il reste des bulletins à numéroter.
+        """
+        count = 0
+        while True:
+            with transaction.atomic():
+                tree = cls.lock_sequence(vote_id, skip_locked=not wait)
+                if tree is None or tree.frozen:
+                    return count
+                count += tree.append_pending()
+            if not Ballot.objects.filter(vote_id=vote_id, sequence__isnull=True).exists():
+                return count
+
+    @classmethod
+    def sequence_on_commit(cls, vote_id):
+        """Lance la numérotation des bulletins du vote après la transaction en cours (sans attendre)."""
+        transaction.on_commit(partial(cls.sequence_pending, vote_id), robust=True)
+
+    def check_open(self):
+        if self.frozen:
+            raise BallotBoxClosed
+
+    def append_pending(self, batch_size=SEQUENCE_BATCH_SIZE):
+        """
+        Numérote, dans l'ordre d'insertion, les bulletins du vote qui ne le sont pas encore et les
+        ajoute à l'arbre, par lots ; renvoie leur nombre. L'arbre doit avoir été verrouillé avec
+        lock() ou lock_sequence().
+        """
+        count = 0
+        pending = Ballot.objects.filter(vote_id=self.vote_id, sequence__isnull=True).only("id", "token", "result")
+        while ballots := list(pending.order_by("id")[:batch_size]):
+            for sequence, ballot in enumerate(ballots, start=self.size):
+                ballot.sequence = sequence
+            Ballot.objects.bulk_update(ballots, ["sequence"])
+            self.append(ballots)
+            count += len(ballots)
+        return count
+
+    def get_digests(self, nodes):
+        """Empreintes des nœuds (niveau, index) donnés, en une seule requête."""
+        if not nodes:
+            return {}
+        condition = Q()
+        for level, index in nodes:
+            condition |= Q(level=level, index=index)
+        return {
+            (node.level, node.index): bytes(node.digest)
+            for node in MerkleNode.objects.filter(condition, vote_id=self.vote_id)
+        }
+
+    def append(self, ballots):
+        """
+        Ajoute les bulletins donnés, numérotés à partir de self.size, comme feuilles de l'arbre.
+
+        Ne lit et n'écrit que O(log n) nœuds par bulletin. L'arbre doit avoir été verrouillé avec
+        lock() ou lock_sequence().
+        """
+        if not ballots:
+            return
+        self.check_open()
+        new_nodes, root = merkle.append_leaves(
+            self.size,
+            self.get_digests(merkle.range_nodes(0, self.size)),
+            [merkle.leaf_hash(ballot.token, ballot.result) for ballot in ballots],
+        )
+        MerkleNode.objects.bulk_create([
+            MerkleNode(vote_id=self.vote_id, level=level, index=index, digest=digest)
+            for (level, index), digest in new_nodes.items()
+        ])
+        # Les bulletins de l'arbre sont aussi ceux du décompte (voir tally.py)
+        TallyCounter.add(self.vote_id, tally.count_results(
+            ballot.result_data if ballot.result_data is not None else json.loads(ballot.result)
+            for ballot in ballots
+        ))
+        self.size += len(ballots)
+        self.root = root
+        self.save(update_fields=["size", "root"])
+
+    def inclusion_proof(self, sequence):
+        """Empreintes de la preuve d'inclusion de la feuille `sequence`, de la feuille vers la racine."""
+        path = merkle.inclusion_path(sequence, self.size)
+        digests = self.get_digests([node for start, end in path for node in merkle.range_nodes(start, end)])
+        return [merkle.range_hash(start, end, digests) for start, end in path]
+
+
+class MerkleNode(models.Model):
+    """Nœud complet d'un arbre de Merkle : empreinte des feuilles [index * 2^level, (index + 1) * 2^level)."""
+    vote = models.ForeignKey(Vote, on_delete=models.CASCADE, related_name="+")
+    level = models.PositiveSmallIntegerField()
+    index = models.PositiveBigIntegerField()
+    digest = models.BinaryField(max_length=32)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vote", "level", "index"], name="unique_merkle_node"),
+        ]
+
+
+class TallyCounter(models.Model):
+    """
+    Nombre de voix d'un vote pour un (candidat, mention) (voir tally.py).
+
+    Les compteurs sont incrémentés par MerkleTree.append(), lors de la numérotation des bulletins
+    (une mise à jour par lot de bulletins numérotés), hors des requêtes de dépôt. Ils ne comptent
+    donc que les bulletins numérotés : pendant le vote, les résultats affichés peuvent être en
+    retard sur les bulletins déposés (de la durée de la numérotation) ; ils sont exacts une fois
+    l'urne close, sa fermeture numérotant les derniers bulletins.
+    """
+    vote = models.ForeignKey(Vote, on_delete=models.CASCADE, related_name="+")
+    candidate = models.CharField(max_length=64)
+    grade = models.CharField(max_length=16)
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vote", "candidate", "grade"], name="unique_tally_counter"),
+        ]
+
+    @classmethod
+    def add(cls, vote_id, counts):
+        """Ajoute des voix {(candidat, mention): nombre} aux compteurs d'un vote, avec des UPDATE ... SET count = count + n."""
+        if not counts:
+            return
+        cls.objects.bulk_create(
+            [cls(vote_id=vote_id, candidate=candidate, grade=grade) for candidate, grade in counts],
+            ignore_conflicts=True,
+        )
+        # Une requête par incrément différent (une seule pour un bulletin isolé)
+        by_increment = defaultdict(Q)
+        for (candidate, grade), count in counts.items():
+            by_increment[count] |= Q(candidate=candidate, grade=grade)
+        for increment, condition in by_increment.items():
+            cls.objects.filter(condition, vote_id=vote_id).update(count=F("count") + increment)
+
+    @classmethod
+    def get_counts(cls, vote_id):
+        """Compteurs non nuls d'un vote : {(candidat, mention): nombre}."""
+        return {
+            (candidate, grade): count
+            for candidate, grade, count in cls.objects.filter(vote_id=vote_id, count__gt=0)
+            .values_list("candidate", "grade", "count")
+        }
+
+
+class VoteSnapshot(models.Model):
+    """Instantané statique des données publiques d'un vote terminé (voir snapshot.py)."""
+    vote = models.OneToOneField(Vote, on_delete=models.CASCADE, primary_key=True, related_name="snapshot")
+    # Empreinte du manifeste de l'instantané, qui est aussi le nom de son dossier
+    digest = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField(help_text="Nombre de bulletins de l'instantané")
+    # Les fichiers sont servis sous STATIC_URL : les vues publiques du vote peuvent y rediriger
+    published = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now=True)
+
+
+class TokenFilter(models.Model):
+    """
+    Filtre de Bloom des jetons des bulletins d'un vote (voir token_filter.py).
+
+    Mis à jour hors des requêtes, par la commande update_token_filters et à la publication de
+    l'instantané du vote : les vues ne font que le lire.
+    """
+    vote = models.OneToOneField(Vote, on_delete=models.CASCADE, primary_key=True, related_name="token_filter")
+    size = models.PositiveBigIntegerField(default=0, help_text="Nombre de bulletins du filtre")
+    # Filtre sérialisé, tel qu'il est envoyé aux clients
+    data = models.BinaryField()
+
+    @classmethod
+    def update(cls, vote_id):
+        """
+        Ajoute au filtre d'un vote les bulletins arrivés depuis sa dernière mise à jour, et le renvoie.
+
+        Seuls les nouveaux jetons sont lus, sauf quand le filtre doit être agrandi (voir
+        token_filter.capacity_for) : il est alors reconstruit entièrement.
+        """
+        size = MerkleTree.objects.filter(vote_id=vote_id).values_list("size", flat=True).first() or 0
+        current = cls.objects.filter(vote_id=vote_id).defer("data").first()
+        if current is not None and current.size >= size:
+            return cls.objects.get(vote_id=vote_id)
+
+        with transaction.atomic():
+            instance, _ = cls.objects.select_for_update().get_or_create(vote_id=vote_id)
+            if instance.data and instance.size >= size:
+                # Mis à jour par un autre processus pendant l'attente du verrou
+                return instance
+
+            bloom = token_filter.BloomFilter.from_bytes(bytes(instance.data)) if instance.data else None
+            start = instance.size
+            if bloom is None or bloom.capacity != token_filter.capacity_for(size):
+                bloom = token_filter.BloomFilter(token_filter.capacity_for(size))
+                start = 0
+            bloom.update(
+                Ballot.objects.filter(vote_id=vote_id, sequence__gte=start, sequence__lt=size)
+                .values_list("token", flat=True).iterator(chunk_size=2000)
+            )
+            bloom.size = instance.size = size
+            instance.data = bloom.to_bytes()
+            instance.save()
+        return instance
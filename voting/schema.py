@@ -0,0 +1,110 @@
+import threading
+
+from .forms import PERSON_CHOICES
+from .metadata import get_vote_metadata
+
+
+class InvalidBallotData(ValueError):
+    """Le contenu du bulletin ne correspond pas au formulaire du vote."""
+
+
+class BallotSchema:
+    """Bulletin blanc uniquement : "{}" est accepté pour tous les types de vote."""
+
+    def validate(self, result_data):
+        if not isinstance(result_data, dict):
+            raise InvalidBallotData("Bulletin invalide : un objet JSON est attendu.")
+        if result_data:
+            self.validate_fields(result_data)
+
+    def validate_fields(self, result_data):
+        raise InvalidBallotData("Bulletin invalide : ce vote n'accepte pas de réponse.")
+
+
+class ChoiceVoteSchema(BallotSchema):
+    """{"choice": true | false | null} (oui, non, ne sait pas)."""
+
+    def validate_fields(self, result_data):
+        if result_data.keys() != {"choice"}:
+            raise InvalidBallotData("Bulletin invalide : seul le champ 'choice' est attendu.")
+        # Comparaison par identité : 1 == True et 0 == False
+        if not any(result_data["choice"] is value for value in (True, False, None)):
+            raise InvalidBallotData("Bulletin invalide : 'choice' doit valoir true, false ou null.")
+
+
+class PersonVoteSchema(BallotSchema):
+    """{"persons": {"<id de la personne>": <mention de 1 à 7>, ...}}."""
+
+    # Le client JS envoie les mentions sous forme de chaînes, le formulaire Django sous forme d'entiers
+    GRADES = frozenset(range(1, len(PERSON_CHOICES) + 1)) | frozenset(
+        str(grade) for grade in range(1, len(PERSON_CHOICES) + 1)
+    )
+
+    def __init__(self, person_ids):
+        self.person_ids = frozenset(str(person_id) for person_id in person_ids)
+
+    def validate_fields(self, result_data):
+        persons = result_data.get("persons")
+        if result_data.keys() != {"persons"} or not isinstance(persons, dict):
+            raise InvalidBallotData("Bulletin invalide : seul l'objet 'persons' est attendu.")
+        if unknown := persons.keys() - self.person_ids:
+            raise InvalidBallotData(f"Bulletin invalide : candidat(s) inconnu(s) : {', '.join(sorted(unknown))}.")
+        for grade in persons.values():
+            # bool est une sous-classe de int : True ne doit pas passer pour la mention 1
+            if isinstance(grade, bool) or not isinstance(grade, (int, str)) or grade not in self.GRADES:
+                raise InvalidBallotData(
+                    f"Bulletin invalide : les mentions vont de 1 à {len(PERSON_CHOICES)}."
+                )
+
+
+class SchemaCache:
+    """
+    Schémas de bulletin compilés par vote (indexés par UUID), partagés par les threads du processus.
+
+    La compilation se fait à partir des métadonnées du vote (voir metadata.py) ; la validation
+    ne fait aucune requête.
+    Les schémas sont invalidés par les signaux (voir signals.py) quand un vote ou ses candidats changent.
+    """
+
+    def __init__(self):
+        self._schemas = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, vote):
+        key = str(vote.uuid)
+        with self._lock:
+            schema = self._schemas.get(key)
+            generation = self._generation
+        if schema is None:
+            schema = compile_schema(get_vote_metadata(key))
+            with self._lock:
+                # Un schéma compilé pendant une invalidation pourrait déjà être périmé
+                if generation == self._generation:
+                    self._schemas[key] = schema
+        return schema
+
+    def invalidate(self, vote_uuid):
+        with self._lock:
+            self._schemas.pop(str(vote_uuid), None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+            self._generation += 1
+
+
+def compile_schema(metadata):
+    if metadata.vote_type == "choicevote":
+        return ChoiceVoteSchema()
+    if metadata.vote_type == "personvote":
+        return PersonVoteSchema(metadata.candidate_ids)
+    return BallotSchema()
+
+
+schema_cache = SchemaCache()
+
+
+def get_ballot_schema(vote):
+    return schema_cache.get(vote)
@@ -0,0 +1,49 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .keys import key_cache
+from .metadata import metadata_cache
+from .models import ChoiceVote, Person, PersonVote, Vote, VoteSnapshot
+from .schema import schema_cache
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_vote_keys(sender, instance, **kwargs):
+    # Les votes sont polymorphes : on reçoit les signaux de PersonVote, ChoiceVote...
+    if isinstance(instance, Vote):
+        key_cache.invalidate(instance.uuid)
+        schema_cache.invalidate(instance.uuid)
+        metadata_cache.invalidate(instance.uuid)
+
+
+@receiver(m2m_changed, sender=PersonVote.persons.through)
+@receiver(m2m_changed, sender=ChoiceVote.propositions.through)
+def invalidate_vote_schema(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        schema_cache.invalidate(instance.uuid)
+        metadata_cache.invalidate(instance.uuid)
+    elif pk_set:
+        # Modification depuis une personne ou une proposition : pk_set contient les votes concernés
+        for vote_uuid in Vote.objects.filter(pk__in=pk_set).values_list("uuid", flat=True):
+            schema_cache.invalidate(vote_uuid)
+            metadata_cache.invalidate(vote_uuid)
+    else:
+        # clear() depuis une personne ou une proposition : les votes concernés ne sont plus connus
+        schema_cache.clear()
+        metadata_cache.clear()
+
+
+@receiver(post_delete, sender=Person)
+def invalidate_person_schemas(sender, instance, **kwargs):
+    # La suppression en cascade des liens ne déclenche pas m2m_changed
+    schema_cache.clear()
+    metadata_cache.clear()
+
+
+@receiver(post_save, sender=VoteSnapshot)
+@receiver(post_delete, sender=VoteSnapshot)
+def invalidate_vote_snapshot(sender, instance, **kwargs):
+    metadata_cache.invalidate(instance.vote.uuid)
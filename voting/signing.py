@@ -0,0 +1,60 @@
+import base64
+import binascii
+
+import rsa
+
+from .backends import get_backend
+
+
+class SigningError(ValueError):
+    """Le message aveuglé ne peut pas être signé (encodage ou valeur invalide, faute de calcul)."""
+
+
+def key_size_bytes(n: int) -> int:
+    """Taille en octets du module RSA, donc de toute signature produite avec cette clé."""
+    return (n.bit_length() + 7) // 8
+
+
+def decode_blinded_message(blinded_message_b64: str) -> int:
+    """Décode un message aveuglé Base64 en entier."""
+    try:
+        return int.from_bytes(base64.b64decode(blinded_message_b64, validate=True), "big")
+    except (binascii.Error, ValueError) as e:
+        raise SigningError(f"Message aveuglé mal encodé : {e}") from e
+
+
+def encode_signature(sig_int: int, n: int) -> str:
+    """Encode une signature en Base64 sur une largeur fixe égale à celle du module."""
+    return base64.b64encode(sig_int.to_bytes(key_size_bytes(n), "big")).decode()
+
+
+def sign_blinded(priv_key: rsa.PrivateKey, blinded_int: int, backend=None) -> int:
+    """
+    Signe un entier aveuglé (sig = blinded_int^d mod n) avec le théorème des restes chinois.
+
+    Les deux exponentiations modulo p et q sont environ 3 à 4 fois plus rapides qu'un
+    pow(blinded_int, d, n) direct. La signature est vérifiée avec l'exposant public avant
+    d'être renvoyée : une faute de calcul sur une seule des deux moitiés suffirait sinon
+    à révéler p ou q (attaque de Bellcore).
+    """
+    backend = backend or get_backend()
+    n = priv_key.n
+    if not 0 <= blinded_int < n:
+        raise SigningError("Le message aveuglé doit être strictement inférieur au module de la clé.")
+
+    p, q = priv_key.p, priv_key.q
+    s_p = backend.powmod(blinded_int % p, priv_key.exp1, p)
+    s_q = backend.powmod(blinded_int % q, priv_key.exp2, q)
+    # Recombinaison de Garner : coef = q^-1 mod p
+    h = (priv_key.coef * (s_p - s_q)) % p
+    sig_int = s_q + h * q
+
+    if backend.powmod(sig_int, priv_key.e, n) != blinded_int:
+        raise SigningError("La vérification de la signature a échoué.")
+    return sig_int
+
+
+def sign_blinded_message(priv_key: rsa.PrivateKey, blinded_message_b64: str) -> str:
+    """Décode, signe et réencode un message aveuglé Base64."""
+    sig_int = sign_blinded(priv_key, decode_blinded_message(blinded_message_b64))
+    return encode_signature(sig_int, priv_key.n)
@@ -0,0 +1,215 @@
+"""
+Instantanés statiques des données publiques des votes terminés.
+
+Un instantané est écrit dans STATIC_ROOT/snapshots/<uuid du vote>/<empreinte>/, où l'empreinte
+est celle de son manifeste (liste des fichiers et de leurs empreintes) : un même contenu donne
+toujours le même dossier. L'urne est close avant l'écriture, pour que l'instantané reste exact.
+
+Les fichiers écrits ne sont pas forcément servis (ex. : sur Vercel, ils ne le sont qu'après un
+nouveau déploiement) : les vues publiques du vote ne redirigent vers eux qu'une fois l'instantané
+marqué comme publié (VoteSnapshot.published, voir publish_snapshot), et continuent jusque-là de
+répondre à partir de la base.
+"""
+import hashlib
+import json
+import shutil
+import tempfile
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+
+from . import canonical, merkle
+from .ballot_log import get_ballot_log
+from .export import CONTENT_TYPES, export_archive, export_chunks, export_rows
+from .ingest import drain_ballot_log
+from .metadata import aget_vote_metadata_or_404, get_vote_metadata_or_404
+from .models import Ballot, MerkleNode, MerkleTree, TokenFilter, VoteSnapshot
+
+SNAPSHOT_DIR = "snapshots"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def ballot_filename(token):
+    # Le jeton est choisi par le client : il ne doit pas servir tel quel de nom de fichier
+    return f"{hashlib.sha256(token.encode('utf-8')).hexdigest()}.json"
+
+
+def snapshot_url(vote_meta, name):
+    return f"{settings.STATIC_URL}{SNAPSHOT_DIR}/{vote_meta.uuid}/{vote_meta.snapshot_digest}/{name}"
+
+
+def redirect_to_snapshot(name):
+    """
+    Décorateur des vues publiques d'un vote (premier argument : vote_uuid) : si l'instantané
+    du vote est publié, redirige vers son fichier `name`. `name` peut être une fonction
+    (request, **kwargs) renvoyant le nom du fichier, ou None pour laisser la vue répondre.
+    """
+    def get_name(request, kwargs):
+        return name(request, **kwargs) if callable(name) else name
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, vote_uuid, **kwargs):
+                vote_meta = await aget_vote_metadata_or_404(vote_uuid)
+                if vote_meta.snapshot_digest and (filename := get_name(request, kwargs)):
+                    return redirect(snapshot_url(vote_meta, filename))
+                return await view(request, vote_uuid, **kwargs)
+        else:
+            @wraps(view)
+            def inner(request, vote_uuid, **kwargs):
+                vote_meta = get_vote_metadata_or_404(vote_uuid)
+                if vote_meta.snapshot_digest and (filename := get_name(request, kwargs)):
+                    return redirect(snapshot_url(vote_meta, filename))
+                return view(request, vote_uuid, **kwargs)
+        return inner
+    return decorator
+
+
+def close_ballot_box(vote):
+    """
+    Ferme l'urne du vote : les bulletins en cours d'enregistrement se terminent avant, aucun ne suit.
+
+    Avec l'enregistrement différé (VOTING_BALLOT_LOG_DIR), le journal local est d'abord vidé
+    pendant que les acquittements attendent : tout bulletin acquitté (202) est dans l'urne close.
+    Le journal d'un autre serveur doit avoir été vidé avant.
+    """
+    ballot_log = get_ballot_log()
+    if ballot_log is None:
+        return _freeze(vote)
+    with ballot_log.closing():
+        rejected = [
+            entry
+            for _, _, entries in drain_ballot_log(ballot_log)
+            for entry in entries
+            if entry["vote"] == str(vote.uuid)
+        ]
+        if rejected:
+            raise SnapshotError(
+                f"{len(rejected)} bulletin(s) acquitté(s) du vote {vote.uuid} refusé(s) par la base, "
+                f"conservé(s) dans {ballot_log.directory}/rejected-*.log : urne laissée ouverte."
+            )
+        return _freeze(vote)
+
+
+def _freeze(vote):
+    with transaction.atomic():
+        tree = MerkleTree.lock(vote.pk)
+        if not tree.frozen:
+            # Derniers bulletins déposés, pas encore numérotés
+            tree.append_pending()
+            tree.frozen = True
+            tree.save(update_fields=["frozen"])
+    return tree
+
+
+def create_snapshot(vote, publish=False):
+    """
+    Ferme l'urne d'un vote terminé et écrit son instantané ; renvoie le VoteSnapshot.
+
+    Avec `publish`, l'instantané est aussitôt publié (à utiliser quand STATIC_ROOT est servi tel
+    quel). Un instantané déjà publié le reste si son contenu n'a pas changé.
+    """
+    # Import local : views.py dépend de ce module pour ses redirections
+    from .views import calculate_choice_results, calculate_majority_judgment, vote_hash_digest
+
+    if vote.end_time > now():
+        raise SnapshotError(f"Le vote {vote.uuid} n'est pas terminé.")
+    tree = close_ballot_box(vote)
+
+    vote_dir = Path(settings.STATIC_ROOT) / SNAPSHOT_DIR / str(vote.uuid)
+    vote_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=vote_dir, prefix=".tmp-"))
+    files = {}
+
+    def write(name, chunks):
+        path = tmp_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sha256 = hashlib.sha256()
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                sha256.update(chunk)
+                f.write(chunk)
+        files[name] = sha256.hexdigest()
+
+    try:
+        root = bytes(tree.root).hex()
+        write("public-key.pem", [vote.public_key_pem.encode()])
+        write("hash.txt", [vote_hash_digest(vote.uuid, tree.size).encode()])
+        write("merkle-root.json", [json.dumps({"size": tree.size, "root": root}).encode()])
+        for export_format in CONTENT_TYPES:
+            write(f"ballots.{export_format}", export_chunks(export_rows(vote.pk), export_format))
+        write("ballots.bin", export_archive(vote))
+        write("token-filter.bin", [bytes(TokenFilter.update(vote.pk).data)])
+        write("results.html", [render_to_string("voting/results.html", {
+            "vote": vote,
+            "results": calculate_majority_judgment(vote.uuid),
+            "choice_results": calculate_choice_results(vote.uuid),
+        }).encode()])
+
+        # Bulletins et preuves d'inclusion : l'arbre entier est chargé une fois pour toutes
+        digests = {
+            (level, index): bytes(digest)
+            for level, index, digest in MerkleNode.objects.filter(vote_id=vote.pk)
+            .values_list("level", "index", "digest").iterator(chunk_size=10000)
+        }
+        ballots = Ballot.objects.filter(vote_id=vote.pk, sequence__isnull=False).order_by("sequence")
+        for token, result, sequence in ballots.values_list("token", "result", "sequence").iterator(chunk_size=2000):
+            filename = ballot_filename(token)
+            write(f"ballots/{filename}", [result.encode()])
+            write(f"proofs/{filename}", [json.dumps({
+                "token": token,
+                "sequence": sequence,
+                "size": tree.size,
+                "root": root,
+                "leaf": merkle.leaf_hash(token, result).hex(),
+                "path": [
+                    merkle.range_hash(start, end, digests).hex()
+                    for start, end in merkle.inclusion_path(sequence, tree.size)
+                ],
+            }).encode()])
+
+        manifest = canonical.dumps({"vote": str(vote.uuid), "size": tree.size, "root": root, "files": files})
+        write("manifest.json", [manifest.encode()])
+        digest = hashlib.sha256(manifest.encode()).hexdigest()
+
+        final_dir = vote_dir / digest
+        if final_dir.exists():
+            # Même contenu qu'un instantané déjà écrit
+            shutil.rmtree(tmp_dir)
+        else:
+            tmp_dir.rename(final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    previous = VoteSnapshot.objects.filter(vote=vote).values_list("digest", "published").first()
+    published = publish or previous == (digest, True)
+    snapshot, _ = VoteSnapshot.objects.update_or_create(
+        vote=vote, defaults={"digest": digest, "size": tree.size, "published": published}
+    )
+    return snapshot
+
+
+def publish_snapshot(vote):
+    """
+    Marque l'instantané écrit d'un vote comme publié, une fois ses fichiers servis sous
+    STATIC_URL : les vues publiques du vote y redirigent alors. Renvoie le VoteSnapshot.
+    """
+    try:
+        snapshot = VoteSnapshot.objects.get(vote=vote)
+    except VoteSnapshot.DoesNotExist:
+        raise SnapshotError(f"Le vote {vote.uuid} n'a pas d'instantané.")
+    if not snapshot.published:
+        snapshot.published = True
+        snapshot.save(update_fields=["published"])
+    return snapshot
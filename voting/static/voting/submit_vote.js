@@ -368,6 +368,21 @@ class SubmitVoteForm extends HTMLElement {
                     // All the remaining ballots are stuck at the same status as before, stop processing
                     break;
                 }
+                // Sign or submit several ballots in a single request
+                const groupStatus = this.getBallot(toProcess[0]).status || "";
+                if (toProcess.length > 1 && (groupStatus == "INITIAL" || groupStatus == "TO_BE_SUBMITTED")) {
+                    try {
+                        if (groupStatus == "INITIAL")
+                            await this.blindAndSignAll(toProcess);
+                        else
+                            await this.submitBallots(toProcess);
+                    } catch(e) {
+                        for (const voteToken of toProcess)
+                            this.errorsAt[voteToken] = this.getBallot(voteToken).status || "";
+                        throw e;
+                    }
+                    continue;
+                }
                 // If all of them are done, continue to the next step
                 let stop = false;
                 for (const voteToken of toProcess) {
@@ -607,21 +622,40 @@ class SubmitVoteForm extends HTMLElement {
             const res = await fetch(`/vote/${voteId}/public-key`);
             if (!res.ok) throw new Error("Impossible de récupérer la clé");
             const pem = await res.text();
+            await this.checkPublicKey(voteToken, pem);
+            return pem;
+        } finally {
+            this.currentElement.remove();
+        }
+    }
 
-            const hashBuffer = await crypto.subtle.digest("SHA-256", new TextEncoder().encode("test"));
-            const smallHash = Array.from(new Uint8Array(hashBuffer).slice(0, 4)).map((b) => b.toString(16).padStart(2, "0")).join("");
+    async getPublicKeys(voteTokens) {
+        const voteIds = [...new Set(voteTokens.map(voteToken => this.getBallot(voteToken).voteId))];
+        const params = new URLSearchParams(voteIds.map(voteId => ["vote", voteId]));
+        const res = await fetch(`/vote/session/public-keys?${params}`);
+        if (!res.ok) throw new Error("Impossible de récupérer les clés");
+        const { keys } = await res.json();
+        const pems = {};
+        for (const voteToken of voteTokens) {
+            const pem = keys[this.getBallot(voteToken).voteId];
+            if (!pem) throw new Error("Impossible de récupérer la clé");
+            await this.checkPublicKey(voteToken, pem);
+            pems[voteToken] = pem;
+        }
+        return pems;
+    }
 
-            const expectedHash = ballot.publicKeyHash;
+    async checkPublicKey(voteToken, pem) {
+        const ballot = this.getBallot(voteToken);
+        const hashBuffer = await crypto.subtle.digest("SHA-256", new TextEncoder().encode("test"));
+        const smallHash = Array.from(new Uint8Array(hashBuffer).slice(0, 4)).map((b) => b.toString(16).padStart(2, "0")).join("");
 
-            if (expectedHash && expectedHash != smallHash)
-                throw new Error("La clé publique a changé depuis votre dernière visite. Ceci peut indiquer une attaque de type 'man-in-the-middle'. Veuillez contacter l'administrateur du vote.");
+        const expectedHash = ballot.publicKeyHash;
 
-            this.updateStorage(voteToken, { publicKeyHash: smallHash });
+        if (expectedHash && expectedHash != smallHash)
+            throw new Error("La clé publique a changé depuis votre dernière visite. Ceci peut indiquer une attaque de type 'man-in-the-middle'. Veuillez contacter l'administrateur du vote.");
 
-            return pem;
-        } finally {
-            this.currentElement.remove();
-        }
+        this.updateStorage(voteToken, { publicKeyHash: smallHash });
     }
 
     async blindAndSign(voteToken) {
@@ -634,6 +668,52 @@ class SubmitVoteForm extends HTMLElement {
         this.wrapper.appendChild(messageContainer);
         this.currentElement = messageContainer;
 
+        const blinded = this.blindBallot(voteToken, publicKeyPem);
+
+        const signRes = await fetch(`/vote/${blinded.voteId}/sign`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json", "X-CSRFToken": this.getCsrf() },
+            body: JSON.stringify({ blinded_message: blinded.blindedB64 }),
+        });
+        if (!signRes.ok) throw new Error("Le serveur a refusé la signature : " + (await signRes.json()).error);
+        const { signature: sigBlindB64 } = await signRes.json();
+
+        this.unblindSignature(voteToken, blinded, sigBlindB64);
+    }
+
+    async blindAndSignAll(voteTokens) {
+        let messageContainer = document.createElement("p");
+        messageContainer.className = "notification is-info";
+        messageContainer.textContent = "Étapes 1 et 2/3 : Signature anonyme des bulletins...";
+
+        this.wrapper.appendChild(messageContainer);
+        this.currentElement = messageContainer;
+
+        const publicKeyPems = await this.getPublicKeys(voteTokens);
+        const blindedBallots = voteTokens.map(voteToken => this.blindBallot(voteToken, publicKeyPems[voteToken]));
+
+        const signRes = await fetch("/vote/session/sign", {
+            method: "POST",
+            headers: { "Content-Type": "application/json", "X-CSRFToken": this.getCsrf() },
+            body: JSON.stringify({
+                requests: blindedBallots.map(blinded => ({ vote: blinded.voteId, blinded_message: blinded.blindedB64 })),
+            }),
+        });
+        if (!signRes.ok) throw new Error("Le serveur a refusé la signature : " + (await signRes.json()).error);
+        const { results } = await signRes.json();
+
+        // Each vote is handled independently: keep the signatures we got before reporting errors
+        const errors = [];
+        voteTokens.forEach((voteToken, i) => {
+            if (results[i].status_code == 200)
+                this.unblindSignature(voteToken, blindedBallots[i], results[i].signature);
+            else
+                errors.push(`${this.formSpecs[blindedBallots[i].voteId].title} : ${results[i].error}`);
+        });
+        if (errors.length) throw new Error("Le serveur a refusé la signature : " + errors.join(", "));
+    }
+
+    blindBallot(voteToken, publicKeyPem) {
         const ballot = this.getBallot(voteToken);
         const publicKey = forge.pki.publicKeyFromPem(publicKeyPem);
 
@@ -647,14 +727,10 @@ class SubmitVoteForm extends HTMLElement {
         const blinded = m.multiply(r.modPow(publicKey.e, publicKey.n)).mod(publicKey.n);
         const blindedB64 = forge.util.encode64(forge.util.hexToBytes(blinded.toString(16)));
 
-        const signRes = await fetch(`/vote/${ballot.voteId}/sign`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json", "X-CSRFToken": this.getCsrf() },
-            body: JSON.stringify({ blinded_message: blindedB64 }),
-        });
-        if (!signRes.ok) throw new Error("Le serveur a refusé la signature : " + (await signRes.json()).error);
-        const { signature: sigBlindB64 } = await signRes.json();
+        return { voteId: ballot.voteId, publicKey, messageContent, r, blindedB64 };
+    }
 
+    unblindSignature(voteToken, { publicKey, messageContent, r }, sigBlindB64) {
         const sigBlindInt = new forge.jsbn.BigInteger(forge.util.bytesToHex(forge.util.decode64(sigBlindB64)), 16);
         const rInv = r.modInverse(publicKey.n);
         const finalSigInt = sigBlindInt.multiply(rInv).mod(publicKey.n);
@@ -759,6 +835,41 @@ class SubmitVoteForm extends HTMLElement {
         this.updateStorage(voteToken, { status: "SUBMITTED" });
     }
 
+    async submitBallots(voteTokens) {
+        let messageContainer = document.createElement("p");
+        messageContainer.className = "notification is-info";
+        messageContainer.textContent = "Étape 3/3 : Dépôt des bulletins dans l'urne...";
+
+        this.wrapper.appendChild(messageContainer);
+        this.currentElement = messageContainer;
+
+        const ballots = voteTokens.map(voteToken => this.getBallot(voteToken));
+        const res = await fetch("/vote/session/submit", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                ballots: ballots.map(ballot => ({
+                    vote: ballot.voteId,
+                    token: ballot.token,
+                    data: safeStringify(ballot.data || {}),
+                    signature: ballot.signature,
+                })),
+            }),
+            credentials: "omit",
+        });
+        if (!res.ok) throw new Error("Urne fermée ou bulletin invalide");
+        const { results } = await res.json();
+
+        const errors = [];
+        voteTokens.forEach((voteToken, i) => {
+            if (results[i].status_code == 200 || results[i].status_code == 201)
+                this.updateStorage(voteToken, { status: "SUBMITTED" });
+            else
+                errors.push(`${this.formSpecs[ballots[i].voteId].title} : ${results[i].error}`);
+        });
+        if (errors.length) throw new Error("Urne fermée ou bulletin invalide : " + errors.join(", "));
+    }
+
     async displaySuccess() {
         let messageContainer = document.createElement("p");
         messageContainer.className = "notification is-success";
@@ -0,0 +1,58 @@
+// Lecture du filtre des jetons d'un vote (format décrit dans voting/token_filter.py).
+// Un jeton absent du filtre n'est pas parmi les `size` premiers bulletins de l'urne, mais peut
+// être celui d'un bulletin plus récent (le filtre est mis à jour en différé) ; un jeton présent
+// y est très probablement, ce que confirme isBallotCounted().
+
+const TOKEN_FILTER_MAGIC = [0x56, 0x4f, 0x54, 0x45, 0x42, 0x4c, 0x4d, 0x01]; // "VOTEBLM\x01"
+const TOKEN_FILTER_HEADER_SIZE = 17;
+
+class TokenFilter {
+    constructor(buffer) {
+        const view = new DataView(buffer);
+        if (buffer.byteLength < TOKEN_FILTER_HEADER_SIZE || TOKEN_FILTER_MAGIC.some((byte, i) => view.getUint8(i) !== byte))
+            throw new Error("Filtre de jetons invalide");
+        // Nombre de bulletins de l'urne pris en compte
+        this.size = Number(view.getBigUint64(8));
+        this.hashCount = view.getUint8(16);
+        this.bits = new Uint8Array(buffer, TOKEN_FILTER_HEADER_SIZE);
+        this.bitCount = this.bits.length * 8;
+    }
+
+    static async load(voteId) {
+        const res = await fetch(`/vote/${voteId}/token-filter`, { credentials: "omit" });
+        if (!res.ok) throw new Error("Impossible de charger le filtre des jetons");
+        return new TokenFilter(await res.arrayBuffer());
+    }
+
+    async positions(token) {
+        const digest = new DataView(await crypto.subtle.digest("SHA-256", new TextEncoder().encode(token)));
+        const h1 = digest.getUint32(0);
+        const h2 = (digest.getUint32(4) | 1) >>> 0;
+        // h1 + j * h2 reste inférieur à 2^53 : le calcul est exact avec des Number
+        return Array.from({ length: this.hashCount }, (_, j) => (h1 + j * h2) % this.bitCount);
+    }
+
+    async mightContain(token) {
+        const positions = await this.positions(token);
+        return positions.every(position => this.bits[position >> 3] & (1 << (position & 7)));
+    }
+}
+
+// Demande au serveur si le bulletin du jeton est dans l'urne : seule réponse négative définitive.
+async function fetchBallotCounted(voteId, token) {
+    const res = await fetch(`/data/ballots/${voteId}/${encodeURIComponent(token)}`, { credentials: "omit" });
+    if (res.ok) return true;
+    if (res.status === 404) return false;
+    throw new Error("Impossible de vérifier le bulletin");
+}
+
+// Renvoie true si le bulletin du jeton est dans l'urne, false s'il n'y est pas, et null si on ne
+// peut pas encore le savoir sans révéler le jeton au serveur : le jeton est absent du filtre, mais
+// le bulletin peut être plus récent que le filtre. Il faut alors réessayer après la prochaine
+// mise à jour du filtre, ou interroger le serveur avec fetchBallotCounted(). Un jeton présent dans
+// le filtre est confirmé par le serveur.
+async function isBallotCounted(voteId, token, tokenFilter) {
+    tokenFilter = tokenFilter || await TokenFilter.load(voteId);
+    if (!await tokenFilter.mightContain(token)) return null;
+    return await fetchBallotCounted(voteId, token);
+}
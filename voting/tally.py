@@ -0,0 +1,39 @@
+"""
+Décompte des bulletins d'un vote : nombre de voix par (candidat, mention).
+
+Pour un PersonVote, le candidat est l'identifiant de la personne et la mention va de "1" à "7" ;
+pour un ChoiceVote, le candidat est CHOICE et la mention "true", "false" ou "null". Les
+compteurs (TallyCounter) sont mis à jour dans la transaction qui ajoute les bulletins à l'arbre
+de Merkle du vote, après leur dépôt (voir MerkleTree) ; ce module ne dépend pas de Django.
+"""
+import json
+from collections import Counter
+
+CHOICE = "choice"
+
+
+def ballot_tally(result_data):
+    """(candidat, mention) comptés pour un bulletin, à partir de son résultat décodé."""
+    if not isinstance(result_data, dict):
+        return []
+    if CHOICE in result_data:
+        return [(CHOICE, json.dumps(result_data[CHOICE]))]
+    persons = result_data.get("persons")
+    if not isinstance(persons, dict):
+        return []
+    entries = []
+    for candidate, grade in persons.items():
+        # Le client JS envoie les mentions sous forme de chaînes, le formulaire Django sous forme d'entiers
+        try:
+            entries.append((str(candidate), str(int(grade))))
+        except (TypeError, ValueError):
+            pass
+    return entries
+
+
+def count_results(results):
+    """Compteurs {(candidat, mention): nombre} de résultats décodés."""
+    counts = Counter()
+    for result_data in results:
+        counts.update(ballot_tally(result_data))
+    return counts
@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from voting import archive
+from voting.export import export_archive
+from voting.models import Ballot, MerkleNode, MerkleTree, TallyCounter
+
+from .utils import add_ballots, make_vote
+
+VOTE_UUID = "12345678-1234-5678-1234-567812345678"
+PUBLIC_KEY = "-----BEGIN RSA PUBLIC KEY-----\nMIIB\n-----END RSA PUBLIC KEY-----\n"
+ROWS = [
+    ("dG9rZW4x", '{"choice":true}', "c2lnbmF0dXJl"),
+    ("pas du Base64", '{"choice":null}', "pas du Base64 non plus"),
+    ("YQ==", '{"persons":{"1":"é"}}', "YQ=="),
+]
+
+
+class ArchiveFileMixin:
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = Path(directory) / "ballots.bin"
+
+    def write(self, chunks):
+        self.path.write_bytes(b"".join(chunks))
+        return self.path
+
+
+class ArchiveFormatTests(ArchiveFileMixin, SimpleTestCase):
+    def test_round_trip(self):
+        root = bytes(range(32))
+        with archive.BallotArchive(self.write(archive.archive_chunks(VOTE_UUID, PUBLIC_KEY, root, 3, ROWS))) as ballots:
+            self.assertEqual((ballots.vote_uuid, ballots.root, len(ballots)), (VOTE_UUID, root, 3))
+            self.assertEqual(ballots.public_key_pem, PUBLIC_KEY)
+            self.assertEqual(
+                list(ballots),
+                [archive.ArchivedBallot(i, token, result, signature) for i, (token, result, signature) in enumerate(ROWS)],
+            )
+            for i, (token, result, signature) in enumerate(ROWS):
+                self.assertEqual(ballots.get(token), (i, token, result, signature))
+            # "YQ==" décodé fait un octet : il ne doit pas être confondu avec un jeton UTF-8 "a"
+            self.assertIsNone(ballots.get("a"))
+            self.assertIsNone(ballots.get("absent"))
+
+    def test_size_mismatch(self):
+        with self.assertRaises(archive.ArchiveError):
+            list(archive.archive_chunks(VOTE_UUID, PUBLIC_KEY, bytes(32), 4, ROWS))
+
+    def test_invalid_files(self):
+        data = b"".join(archive.archive_chunks(VOTE_UUID, PUBLIC_KEY, bytes(32), 3, ROWS))
+        for invalid in (b"", data[:-1], b"X" + data[1:], data + b"\x00"):
+            self.path.write_bytes(invalid)
+            with self.assertRaises(archive.ArchiveError):
+                archive.BallotArchive(self.path)
+
+
+class ArchiveExportTests(ArchiveFileMixin, TestCase):
+    def test_export_then_import(self):
+        vote = make_vote()
+        results = ['{"choice":true}', '{"choice":false}', '{"choice":null}', '{"choice":true}']
+        tokens = add_ballots(vote, results)
+        tree = MerkleTree.objects.get(vote=vote)
+        path = self.write(export_archive(vote))
+        with archive.BallotArchive(path) as ballots:
+            self.assertEqual((ballots.vote_uuid, ballots.root, len(ballots)), (str(vote.uuid), bytes(tree.root), 4))
+            self.assertEqual([ballot.token for ballot in ballots], tokens)
+
+        # Urne vidée puis reconstruite à partir de l'archive
+        for model in (Ballot, MerkleNode, MerkleTree, TallyCounter):
+            model.objects.filter(vote=vote).delete()
+        stdout = StringIO()
+        call_command("import_archive", str(path), stdout=stdout, stderr=StringIO())
+        self.assertIn("4 bulletin(s) ajouté(s)", stdout.getvalue())
+        self.assertIn("La racine de Merkle du vote est celle de l'archive.", stdout.getvalue())
+        self.assertEqual(list(Ballot.objects.filter(vote=vote).order_by("sequence").values_list("token", flat=True)), tokens)
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+
+from voting import async_views, views
+from voting.keys import key_cache
+from voting.metadata import metadata_cache
+from voting.models import Ballot
+from voting.schema import schema_cache
+
+from .utils import blind, make_vote, make_voter, new_token, sign_ballot, unblind
+
+real_to_thread = asyncio.to_thread
+
+
+async def to_thread_without_queries(func, *args, **kwargs):
+    """asyncio.to_thread() qui échoue si la fonction exécutée dans le thread fait une requête."""
+    def refuse_queries(execute, sql, params, many, context):
+        raise AssertionError(f"Requête exécutée dans asyncio.to_thread : {sql}")
+
+    def run():
+        with connection.execute_wrapper(refuse_queries):
+            return func(*args, **kwargs)
+
+    return await real_to_thread(run)
+
+
+class AsyncViewsTests(TestCase):
+    """Vues de voting/async_views.py, appelées directement quel que soit VOTING_ASYNC_VIEWS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def setUp(self):
+        # Caches vides : les clés et le schéma doivent être chargés hors des threads de calcul
+        key_cache.clear()
+        metadata_cache.clear()
+        schema_cache.clear()
+        patcher = mock.patch.object(async_views.asyncio, "to_thread", to_thread_without_queries)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, path, user=None, **kwargs):
+        request = AsyncRequestFactory().post(path, **kwargs)
+        request.user = user or AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return request
+
+    async def test_sign_blind_token(self):
+        user = await sync_to_async(make_voter)(self.vote)
+        public_key = self.vote.get_public_key()
+        token, data = new_token(), '{"choice":true}'
+        blinded_message, r = blind(public_key, token, data)
+        key_cache.clear()
+
+        response = await async_views.sign_blind_token(self.request(
+            "/sign", user, data=json.dumps({"blinded_message": blinded_message}), content_type="application/json"
+        ), self.vote.uuid)
+        self.assertEqual(response.status_code, 200, response.content)
+        signature = unblind(public_key, json.loads(response.content)["signature"], r)
+        self.assertEqual(signature, await sync_to_async(sign_ballot)(self.vote, token, data))
+
+    async def test_submit_vote(self):
+        token, data = new_token(), '{"choice":null}'
+        signature = await sync_to_async(sign_ballot)(self.vote, token, data)
+        key_cache.clear()
+
+        def submit(payload):
+            return async_views.submit_vote(self.request(
+                "/submit", data={"token": token, "data": payload, "signature": signature}
+            ), self.vote.uuid)
+
+        response = await submit(data)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((await Ballot.objects.aget(token=token)).result, data)
+        self.assertEqual((await submit(data)).status_code, 200)
+        self.assertEqual((await submit('{"choice":false}')).status_code, 400)
+
+    async def test_read_views_match_sync_views(self):
+        token, data = new_token(), '{"choice":true}'
+        signature = await sync_to_async(sign_ballot)(self.vote, token, data)
+        await sync_to_async(Ballot.objects.create)(vote=self.vote, token=token, result=data, server_signature=signature)
+        factory = AsyncRequestFactory()
+
+        response = await async_views.ballot_view(factory.get("/ballot"), self.vote.uuid, token=token)
+        self.assertEqual(response.content.decode(), data)
+
+        response = await async_views.vote_hash(factory.get("/hash"), self.vote.uuid)
+        self.assertEqual(response.content.decode(), await sync_to_async(views.vote_hash_digest)(self.vote.uuid))
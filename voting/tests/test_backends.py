@@ -0,0 +1,40 @@
+import secrets
+from math import gcd
+
+import rsa
+from django.test import SimpleTestCase
+
+from voting.backends import BACKENDS
+
+KEY_SIZE = 1024
+
+
+class GenerateKeysTests(SimpleTestCase):
+    def check_keys(self, backend):
+        public_key, private_key = backend.generate_keys(KEY_SIZE)
+        p, q, e = private_key.p, private_key.q, private_key.e
+        self.assertEqual(public_key.n.bit_length(), KEY_SIZE)
+        # rsa décale volontairement la taille des deux nombres premiers d'au plus KEY_SIZE / 16 bits
+        self.assertIn(p.bit_length() + q.bit_length(), (KEY_SIZE, KEY_SIZE + 1))
+        self.assertGreaterEqual(min(p.bit_length(), q.bit_length()), KEY_SIZE // 2 - KEY_SIZE // 16)
+        self.assertNotEqual(p, q)
+        self.assertTrue(rsa.prime.is_prime(p) and rsa.prime.is_prime(q))
+        self.assertEqual((public_key.n, public_key.e), (p * q, e))
+        phi = (p - 1) * (q - 1)
+        self.assertEqual(gcd(e, phi), 1)
+        self.assertEqual(e * private_key.d % phi, 1)
+
+        # Signature aveugle brute (calculée par le moteur) et signature PKCS#1 vérifiée par rsa
+        message = secrets.randbelow(public_key.n)
+        signature = backend.powmod(message, private_key.d, private_key.n)
+        self.assertEqual(backend.powmod(signature, public_key.e, public_key.n), message)
+        self.assertEqual(rsa.verify(b"bulletin", rsa.sign(b"bulletin", private_key, "SHA-256"), public_key), "SHA-256")
+
+    def test_backends(self):
+        for name, backend_class in BACKENDS.items():
+            with self.subTest(backend=name):
+                try:
+                    backend = backend_class()
+                except ImportError:
+                    self.skipTest(f"{name} n'est pas installé")
+                self.check_keys(backend)
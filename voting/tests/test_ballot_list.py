@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from voting.views import BallotListView
+
+from .utils import add_ballots, make_vote
+
+# Jetons dont l'ordre par points de code diffère de l'ordre alphabétique usuel
+TOKENS = ["beta", "Beta", "alpha", "Zeta", "+plus", "/slash", "0zero"]
+
+
+@mock.patch.object(BallotListView, "page_size", 3)
+class BallotListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+        add_ballots(cls.vote, ['{"choice":true}'] * len(TOKENS), TOKENS)
+
+    def page(self, **params):
+        response = self.client.get(
+            reverse("ballot_list", args=[self.vote.uuid]), params, HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_walk_forward_and_backward(self):
+        pages = [self.page()]
+        while pages[-1]["next"]:
+            pages.append(self.page(after=pages[-1]["next"]))
+        self.assertEqual([token for page in pages for token in page["ballots"]], sorted(TOKENS))
+        self.assertEqual([len(page["ballots"]) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]["previous"])
+        self.assertEqual(pages[0]["count"], len(TOKENS))
+
+        backward = [pages[-1]]
+        while backward[-1]["previous"]:
+            backward.append(self.page(before=backward[-1]["previous"]))
+        self.assertEqual([page["ballots"] for page in backward], [page["ballots"] for page in reversed(pages)])
+
+    def test_cursor_between_tokens(self):
+        # Un curseur n'a pas besoin d'être un jeton existant
+        self.assertEqual(self.page(after="Y")["ballots"], ["Zeta", "alpha", "beta"])
+        self.assertEqual(self.page(before="Y")["ballots"], ["/slash", "0zero", "Beta"])
+        self.assertEqual(self.page(after="zz")["ballots"], [])
+
+    def test_html_page(self):
+        response = self.client.get(reverse("ballot_list", args=[self.vote.uuid]))
+        self.assertEqual([ballot.token for ballot in response.context["ballots"]], sorted(TOKENS)[:3])
+        self.assertEqual(response.context["next_cursor"], sorted(TOKENS)[2])
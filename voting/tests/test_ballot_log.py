@@ -0,0 +1,81 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from voting import ballot_log
+from voting.ingest import drain_ballot_log
+from voting.models import Ballot, MerkleTree
+from voting.snapshot import close_ballot_box
+
+from .utils import make_vote, new_token, sign_ballot
+
+
+class BallotLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(VOTING_BALLOT_LOG_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Journal du processus recréé dans le dossier temporaire
+        patcher = mock.patch.object(ballot_log, "_ballot_log", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.log = ballot_log.get_ballot_log()
+
+    def submit(self, token, data):
+        return self.client.post(
+            reverse("submit_vote", args=[self.vote.uuid]),
+            {"token": token, "data": data, "signature": sign_ballot(self.vote, token, data)},
+        )
+
+    def test_queued_ballot_is_stored_by_drain(self):
+        token = new_token()
+        response = self.submit(token, '{"choice":true}')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertFalse(Ballot.objects.filter(token=token).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            [(_, counts, rejected)] = drain_ballot_log(self.log)
+        self.assertEqual(counts[201], 1)
+        self.assertEqual(rejected, [])
+        self.assertEqual(Ballot.objects.get(token=token).sequence, 0)
+        self.assertEqual(self.log.segments(), [])
+
+    def test_closed_ballot_box_refuses_queueing(self):
+        MerkleTree.objects.create(vote=self.vote, frozen=True)
+        response = self.submit(new_token(), '{"choice":true}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(drain_ballot_log(self.log)), [])
+
+    def test_drain_keeps_rejected_ballots(self):
+        token, data = new_token(), '{"choice":false}'
+        self.log.append(self.vote.uuid, token, data, sign_ballot(self.vote, token, data))
+        MerkleTree.objects.create(vote=self.vote, frozen=True)
+
+        [(segment, counts, rejected)] = drain_ballot_log(self.log)
+        self.assertEqual(counts[400], 1)
+        self.assertEqual([entry["token"] for entry in rejected], [token])
+        self.assertFalse(segment.exists())
+        with open(self.log.directory / f"rejected-{segment.name}") as f:
+            [kept] = [json.loads(line) for line in f]
+        self.assertEqual((kept["vote"], kept["token"], kept["data"]), (str(self.vote.uuid), token, data))
+        self.assertIn("error", kept)
+
+    def test_closing_stores_queued_ballots_first(self):
+        token = new_token()
+        self.assertEqual(self.submit(token, '{"choice":true}').status_code, 202)
+
+        tree = close_ballot_box(self.vote)
+        self.assertTrue(tree.frozen)
+        self.assertEqual(tree.size, 1)
+        self.assertEqual(Ballot.objects.get(token=token).sequence, 0)
+        self.assertEqual(self.submit(new_token(), '{"choice":true}').status_code, 400)
@@ -0,0 +1,62 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from voting.caching import IMMUTABLE_CACHE_CONTROL
+from voting.models import Ballot
+from voting.views import vote_hash_digest
+
+from .utils import add_ballots, make_vote, new_token, sign_ballot
+
+
+class BoardCachingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+        cls.tokens = add_ballots(cls.vote, ['{"choice":true}', '{"choice":false}'])
+
+    def add_pending_ballot(self):
+        token, data = new_token(), '{"choice":null}'
+        Ballot.objects.create(vote=self.vote, token=token, result=data, server_signature=sign_ballot(self.vote, token, data))
+        return token
+
+    def test_ballot_is_immutable(self):
+        url = reverse("ballot", args=[self.vote.uuid, self.tokens[0]])
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"autre"').status_code, 200)
+
+    def test_public_key_is_immutable(self):
+        url = reverse("get_public_key", args=[self.vote.uuid])
+        response = self.client.get(url)
+        self.assertEqual(response.content.decode(), self.vote.public_key_pem)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_vote_hash_matches_its_etag(self):
+        url = reverse("vote_hash", args=[self.vote.uuid])
+        response = self.client.get(url)
+        self.assertEqual(response["ETag"], '"2"')
+        # Un bulletin pas encore numéroté ne change ni la version ni le contenu
+        self.add_pending_ballot()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(url).content, response.content)
+        self.assertEqual(response.content.decode(), vote_hash_digest(self.vote.uuid))
+
+        add_ballots(self.vote, ['{"choice":true}'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual((response.status_code, response["ETag"]), (200, '"4"'))
+        self.assertEqual(response.content.decode(), vote_hash_digest(self.vote.uuid, 4))
+
+    def test_ballot_list_matches_its_etag(self):
+        url = reverse("ballot_list", args=[self.vote.uuid])
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response["ETag"], '"2-json"')
+        pending = self.add_pending_ballot()
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response["ETag"], '"2-json"')
+        self.assertNotIn(pending, response.json()["ballots"])
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT="application/json", HTTP_IF_NONE_MATCH='"2-json"').status_code, 304)
@@ -0,0 +1,71 @@
+import json
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from voting import canonical
+
+PAYLOADS = [
+    '{"choice":true}',
+    '{"choice":null}',
+    '{"persons":{"1":"3","12":"7","2":"1"}}',
+    '{"persons":{"2":"1","1":"3"}}',      # Clés non triées
+    '{"choice": true}',                    # Espace inutile
+    '{"a":[1,2,{"b":-3}],"c":"d"}',
+    '{"a":0.5}',
+    '{"a":1.0}',
+    '{"a":1e+16}',
+    '{"a":1E2}',
+    '{"a":18446744073709551616}',          # Entier de plus de 64 bits
+    '{"a":-0}',
+    '{"a":NaN}',
+    '{"a":"\\u00e9"}',
+    '{"a":"é"}',                           # Non ASCII : json.dumps l'échappe
+    '{"a":"\\/"}',
+    '{"a":"\\u001f"}',
+    '{"a":"\\t"}',
+    '{"a":"x","a":"y"}',                   # Clé en double
+    '{"a":',
+    '',
+    '[]',
+    '"texte"',
+]
+
+
+def outcome(payload):
+    try:
+        return canonical.loads(payload)
+    except canonical.CanonicalJSONError as e:
+        return type(e)
+
+
+@unittest.skipIf(canonical.orjson is None, "orjson n'est pas installé")
+class OrjsonFastPathTests(SimpleTestCase):
+    def test_same_outcome_with_and_without_orjson(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                with_orjson = outcome(payload)
+                with mock.patch.object(canonical, "orjson", None):
+                    without_orjson = outcome(payload)
+                self.assertEqual(with_orjson, without_orjson)
+                # Mêmes types aussi (1 et 1.0, True et 1 sont égaux en Python)
+                self.assertEqual(json.dumps(with_orjson, default=repr), json.dumps(without_orjson, default=repr))
+
+    def test_fast_path_output_is_byte_identical(self):
+        orjson = canonical.orjson
+        for obj in ({"choice": True}, {"persons": {"10": "1", "9": 7}}, {"a": [None, -5, {"b": "c"}]}):
+            self.assertEqual(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), canonical.dumps(obj).encode())
+
+
+class CanonicalTests(SimpleTestCase):
+    def test_loads(self):
+        self.assertEqual(canonical.loads('{"choice":false}'), {"choice": False})
+        with self.assertRaises(canonical.InvalidJSON):
+            canonical.loads("{")
+        with self.assertRaises(canonical.CanonicalJSONError):
+            canonical.loads('{"b":1,"a":2}')
+
+    def test_max_size(self):
+        with self.assertRaises(canonical.CanonicalJSONError):
+            canonical.loads('{"a":"' + "x" * 100 + '"}', max_size=100)
@@ -0,0 +1,55 @@
+import os
+
+import rsa
+from django.test import SimpleTestCase
+
+from voting.executor import SigningExecutor, SigningUnavailable
+from voting.signing import sign_blinded_message
+
+from .utils import blind, new_token, shared_key_pair
+
+VOTE_UUID = "12345678-1234-5678-1234-567812345678"
+MAX_PENDING = 4
+
+
+class SigningExecutorTests(SimpleTestCase):
+    def setUp(self):
+        self.executor = SigningExecutor(1, MAX_PENDING, 60)
+        self.addCleanup(self.executor.shutdown)
+        public_key_pem, self.private_key_pem = shared_key_pair()
+        self.blinded_message, _ = blind(rsa.PublicKey.load_pkcs1(public_key_pem.encode("ascii")), new_token(), "{}")
+        self.expected = sign_blinded_message(rsa.PrivateKey.load_pkcs1(self.private_key_pem.encode("ascii")), self.blinded_message)
+
+    def sign(self):
+        return self.executor.sign(VOTE_UUID, self.private_key_pem, self.blinded_message)
+
+    def assertSlotsReleased(self):
+        for _ in range(MAX_PENDING):
+            self.assertTrue(self.executor._slots.acquire(blocking=False))
+        for _ in range(MAX_PENDING):
+            self.executor._slots.release()
+
+    def test_sign(self):
+        self.assertEqual(self.sign(), self.expected)
+        self.assertSlotsReleased()
+
+    def test_broken_pool_is_replaced(self):
+        pool = self.executor._pool
+        # Un processus qui s'arrête brutalement rend tout le pool inutilisable
+        pool.submit(os._exit, 1).exception()
+        with self.assertRaises(SigningUnavailable):
+            self.sign()
+        self.assertIsNot(self.executor._pool, pool)
+        self.assertEqual(self.sign(), self.expected)
+        self.assertSlotsReleased()
+
+    def test_worker_crash_during_signature(self):
+        pool = self.executor._pool
+        crash = pool.submit(os._exit, 1)
+        # La signature est en file derrière le processus qui s'arrête
+        with self.assertRaises(SigningUnavailable):
+            self.sign()
+        crash.exception()
+        self.assertIsNot(self.executor._pool, pool)
+        self.assertEqual(self.sign(), self.expected)
+        self.assertSlotsReleased()
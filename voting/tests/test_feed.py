@@ -0,0 +1,54 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from voting.models import Ballot
+
+from .utils import add_ballots, make_vote, new_token, sign_ballot
+
+
+@override_settings(VOTING_FEED_PAGE_SIZE=2)
+class BallotFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+        cls.tokens = add_ballots(cls.vote, ['{"choice":true}', '{"choice":false}', '{"choice":null}'] * 2)
+
+    def get(self, **params):
+        return self.client.get(reverse("ballot_feed", args=[self.vote.uuid]), params)
+
+    def test_follow_cursor(self):
+        since, tokens = 0, []
+        while True:
+            response = self.get(since=since)
+            data = response.json()
+            self.assertEqual(response["X-Ballot-High-Water-Mark"], "6")
+            self.assertLessEqual(len(data["ballots"]), 2)
+            tokens += [ballot["token"] for ballot in data["ballots"]]
+            self.assertEqual([ballot["sequence"] for ballot in data["ballots"]], list(range(since, data["next"])))
+            if data["next"] == data["high_water_mark"]:
+                break
+            since = data["next"]
+        self.assertEqual(tokens, self.tokens)
+        self.assertEqual(self.get(since=6, limit=1).json()["ballots"], [])
+        self.assertEqual(len(self.get(since=1, limit=1).json()["ballots"]), 1)
+
+    def test_pending_ballots_are_not_served(self):
+        token, data = new_token(), '{"choice":true}'
+        Ballot.objects.create(vote=self.vote, token=token, result=data, server_signature=sign_ballot(self.vote, token, data))
+        # Bulletin pas encore numéroté : absent du flux, qui ne peut donc pas avoir de trou
+        data = self.get(since=6).json()
+        self.assertEqual((data["high_water_mark"], data["ballots"]), (6, []))
+
+    def test_conditional_request(self):
+        etag = self.get(since=6)["ETag"]
+        self.assertEqual(self.client.get(
+            reverse("ballot_feed", args=[self.vote.uuid]), {"since": 6}, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+        add_ballots(self.vote, ['{"choice":true}'])
+        response = self.client.get(reverse("ballot_feed", args=[self.vote.uuid]), {"since": 6}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["ballots"]), 1)
+
+    def test_invalid_parameters(self):
+        for params in ({"since": "x"}, {"since": -1}, {"limit": 0}):
+            self.assertEqual(self.get(**params).status_code, 400)
@@ -0,0 +1,78 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from voting.ingest import CONFLICT_ERROR, ingest_ballots, store_ballot
+from voting.models import Ballot
+
+from .utils import make_vote, new_token, sign_ballot
+
+
+class IngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+        cls.other_vote = make_vote()
+
+    def entry(self, data='{"choice":true}', token=None, vote=None):
+        token = token or new_token()
+        return {"token": token, "data": data, "signature": sign_ballot(vote or self.vote, token, data)}
+
+    def ballot(self, entry, vote=None):
+        return Ballot(
+            vote=vote or self.vote, token=entry["token"], result=entry["data"], server_signature=entry["signature"]
+        )
+
+    def test_batch_statuses(self):
+        stored = self.entry()
+        conflicting = self.entry('{"choice":false}')
+        Ballot.objects.create(vote=self.vote, token=conflicting["token"], result='{"choice":true}', server_signature="")
+        ingest_ballots(self.vote, [stored])
+        new = self.entry('{"choice":null}')
+        tampered = {**self.entry(), "data": '{"choice":false}'}
+
+        results = ingest_ballots(self.vote, [new, stored, conflicting, tampered])
+        self.assertEqual([status for status, _ in results], [201, 200, 400, 400])
+        self.assertEqual(results[0][1]["is_new"], True)
+        self.assertEqual(results[1][1]["is_new"], False)
+        self.assertEqual(results[2][1]["error"], CONFLICT_ERROR)
+        self.assertFalse(Ballot.objects.filter(token=tampered["token"]).exists())
+
+    def test_duplicates_within_a_batch(self):
+        entry = self.entry()
+        other = self.entry('{"choice":false}', token=entry["token"])
+        results = ingest_ballots(self.vote, [entry, entry, other])
+        self.assertEqual([status for status, _ in results], [201, 200, 400])
+        self.assertEqual(Ballot.objects.get(token=entry["token"]).result, entry["data"])
+
+    def test_token_used_in_another_vote(self):
+        entry = self.entry(vote=self.other_vote)
+        self.assertEqual(ingest_ballots(self.other_vote, [entry])[0][0], 201)
+        self.assertEqual(store_ballot(self.ballot(entry, self.vote)), (400, {"error": CONFLICT_ERROR}))
+        self.assertEqual(ingest_ballots(self.vote, [self.entry(token=entry["token"])])[0][0], 400)
+
+    def test_store_ballot_is_idempotent(self):
+        entry = self.entry()
+        self.assertEqual(store_ballot(self.ballot(entry))[0], 201)
+        self.assertEqual(store_ballot(self.ballot(entry))[0], 200)
+        status_code, data = store_ballot(self.ballot({**entry, "data": '{"choice":false}'}))
+        self.assertEqual((status_code, data["error"]), (400, CONFLICT_ERROR))
+        self.assertEqual(Ballot.objects.filter(token=entry["token"]).count(), 1)
+
+    def test_batch_endpoint(self):
+        entries = [self.entry(), {"token": "x"}]
+        response = self.client.post(
+            reverse("submit_vote_batch", args=[self.vote.uuid]),
+            json.dumps({"ballots": entries}),
+            content_type="application/json",
+        )
+        self.assertEqual([result["status_code"] for result in response.json()["results"]], [201, 400])
+
+        with self.settings(VOTING_BATCH_MAX_BALLOTS=1):
+            response = self.client.post(
+                reverse("submit_vote_batch", args=[self.vote.uuid]),
+                json.dumps({"ballots": entries}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 400)
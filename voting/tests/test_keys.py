@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from voting.models import PregeneratedKeyPair, Vote
+
+from .utils import make_vote
+
+
+def pooled_pair(name):
+    return PregeneratedKeyPair.objects.create(
+        key_size=settings.VOTING_KEY_SIZE, public_key_pem=f"{name} pub", private_key_pem=f"{name} priv"
+    )
+
+
+def generated_pair(key_size):
+    return PregeneratedKeyPair(key_size=key_size, public_key_pem="générée pub", private_key_pem="générée priv")
+
+
+@mock.patch.object(PregeneratedKeyPair, "generate", side_effect=generated_pair)
+class KeyPoolTests(TestCase):
+    def test_competing_claims(self, generate):
+        """Deux requêtes lisent la même paire : seule celle qui la supprime l'obtient."""
+        pooled_pair("réserve")
+        original_delete = QuerySet.delete
+        competing = []
+
+        def delete(queryset):
+            # Une autre requête prend la paire entre le SELECT et le DELETE de la première
+            if not delete.interleaved:
+                delete.interleaved = True
+                competing.append(PregeneratedKeyPair.claim(settings.VOTING_KEY_SIZE))
+            return original_delete(queryset)
+
+        delete.interleaved = False
+
+        with mock.patch.object(QuerySet, "delete", delete):
+            pair = PregeneratedKeyPair.claim(settings.VOTING_KEY_SIZE)
+
+        self.assertEqual(competing[0].public_key_pem, "réserve pub")
+        self.assertEqual(pair.public_key_pem, "générée pub")
+        generate.assert_called_once_with(settings.VOTING_KEY_SIZE)
+        self.assertFalse(PregeneratedKeyPair.objects.exists())
+
+    def test_claim_skips_other_sizes(self, generate):
+        PregeneratedKeyPair.objects.create(key_size=settings.VOTING_KEY_SIZE + 1024, public_key_pem="autre", private_key_pem="autre")
+        pooled_pair("réserve")
+        self.assertEqual(PregeneratedKeyPair.claim(settings.VOTING_KEY_SIZE).public_key_pem, "réserve pub")
+        self.assertEqual(PregeneratedKeyPair.objects.get().public_key_pem, "autre")
+        generate.assert_not_called()
+
+    def test_ensure_keys_uses_pool(self, generate):
+        vote = make_vote()
+        Vote.objects.filter(pk=vote.pk).update(public_key_pem=None, private_key_pem=None)
+        pooled_pair("réserve")
+        vote = Vote.objects.get(pk=vote.pk)
+        vote.ensure_keys()
+        vote.refresh_from_db()
+        self.assertEqual((vote.public_key_pem, vote.private_key_pem), ("réserve pub", "réserve priv"))
+        self.assertFalse(PregeneratedKeyPair.objects.exists())
+
+    def test_ensure_keys_does_not_overwrite(self, generate):
+        """Une instance lue avant l'attribution des clés ne les remplace pas : sa paire retourne dans la réserve."""
+        vote = make_vote()
+        keys = (vote.public_key_pem, vote.private_key_pem)
+        pooled_pair("réserve")
+        stale = Vote.objects.get(pk=vote.pk)
+        stale.public_key_pem = stale.private_key_pem = None
+        stale.ensure_keys()
+
+        self.assertEqual((stale.public_key_pem, stale.private_key_pem), keys)
+        vote.refresh_from_db()
+        self.assertEqual((vote.public_key_pem, vote.private_key_pem), keys)
+        self.assertEqual(PregeneratedKeyPair.objects.get().public_key_pem, "réserve pub")
+        generate.assert_not_called()
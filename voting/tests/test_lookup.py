@@ -0,0 +1,96 @@
+import gzip
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from voting import export
+from voting.models import Ballot
+
+from .utils import add_ballots, make_vote, new_token, sign_ballot
+
+RESULTS = ['{"choice":true}', '{"choice":false}', '{"choice":null}']
+
+
+class LookupBallotsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+        cls.tokens = add_ballots(cls.vote, RESULTS)
+        cls.url = reverse("lookup_ballots", args=[cls.vote.uuid])
+
+    def post(self, body, **extra):
+        if not isinstance(body, bytes):
+            body = json.dumps(body)
+        return self.client.post(self.url, body, content_type="application/json", **extra)
+
+    def lookup(self, tokens, **extra):
+        response = self.post({"tokens": tokens}, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def test_found_and_unknown_tokens(self):
+        unknown = new_token()
+        _, content = self.lookup([self.tokens[1], unknown])
+        ballot = Ballot.objects.get(token=self.tokens[1])
+        self.assertEqual(json.loads(content), {"results": [
+            {
+                "token": self.tokens[1], "found": True, "sequence": 1,
+                "result": RESULTS[1], "server_signature": ballot.server_signature,
+            },
+            {"token": unknown, "found": False},
+        ]})
+
+    def test_ballot_of_other_vote_is_not_found(self):
+        other_vote = make_vote()
+        token = add_ballots(other_vote, RESULTS[:1])[0]
+        _, content = self.lookup([token])
+        self.assertEqual(json.loads(content), {"results": [{"token": token, "found": False}]})
+
+    def test_pending_ballot(self):
+        token = new_token()
+        Ballot.objects.create(vote=self.vote, token=token, result=RESULTS[0], server_signature=sign_ballot(self.vote, token, RESULTS[0]))
+        _, content = self.lookup([token])
+        self.assertEqual(json.loads(content)["results"][0]["sequence"], None)
+
+    @mock.patch.object(export, "LOOKUP_CHUNK_SIZE", 2)
+    def test_chunking(self):
+        unknown = new_token()
+        # Les jetons en double et ceux qui chevauchent deux morceaux gardent leur place dans la réponse
+        tokens = [self.tokens[2], unknown, self.tokens[0], self.tokens[2], self.tokens[1]]
+        response = self.post({"tokens": tokens})
+        with self.assertNumQueries(3):
+            content = b"".join(response.streaming_content)
+        results = json.loads(content)["results"]
+        self.assertEqual([(result["token"], result["found"]) for result in results], [
+            (self.tokens[2], True), (unknown, False), (self.tokens[0], True), (self.tokens[2], True), (self.tokens[1], True),
+        ])
+        self.assertEqual([result.get("sequence") for result in results], [2, None, 0, 2, 1])
+
+    def test_empty_and_gzip(self):
+        _, content = self.lookup([])
+        self.assertEqual(json.loads(content), {"results": []})
+        response, content = self.lookup(self.tokens, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual([result["token"] for result in json.loads(gzip.decompress(content))["results"]], self.tokens)
+
+    @override_settings(VOTING_LOOKUP_MAX_TOKENS=3)
+    def test_max_tokens(self):
+        self.lookup(self.tokens)
+        response = self.post({"tokens": self.tokens + [new_token()]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("3 jetons", response.json()["error"])
+
+    def test_malformed_bodies(self):
+        for body in (
+            b"", b"pas du JSON", b'{"tokens": ["\xff"]}', b"[]", b'"tokens"', b"null",
+            {}, {"token": []}, {"tokens": "jeton"}, {"tokens": {"jeton": True}}, {"tokens": ["jeton", 1]}, {"tokens": [None]},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+    def test_method_and_unknown_vote(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        url = reverse("lookup_ballots", args=["12345678-1234-5678-1234-567812345678"])
+        self.assertEqual(self.client.post(url, '{"tokens": []}', content_type="application/json").status_code, 404)
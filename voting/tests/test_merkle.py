@@ -0,0 +1,99 @@
+import hashlib
+
+from django.test import SimpleTestCase, TestCase
+
+from voting import merkle
+from voting.models import Ballot, MerkleTree
+from voting.verify import MerkleRootBuilder
+
+from .utils import make_vote, new_token
+
+# Feuilles et racines des vecteurs de test de Certificate Transparency (RFC 6962)
+LEAVES = [bytes.fromhex(leaf) for leaf in (
+    "", "00", "10", "2021", "3031", "40414243", "5051525354555657", "606162636465666768696a6b6c6d6e6f",
+)]
+ROOTS = [bytes.fromhex(root) for root in (
+    "6e340b9cffb37a989ca544e6bb780a2c78901d3fb33738768511a30617afa01d",
+    "fac54203e7cc696cf0dfcb42c92a1d9dbaf70ad9e621f4bd8d98662f00e3c125",
+    "aeb6bcfe274b70a14fb067a5e5578264db0fa9b51af5e0ba159158f329e06e77",
+    "d37ee418976dd95753c1c73862b9398fa2a2cf9b4ff0fdfe8b30cd95209614b7",
+    "4e3bbb1f7b478dcfe71fb631631519a3bca12c9aefca1612bfce4c13a86264d4",
+    "76e67dadbcdf1e10e1b74ddc608abd2f98dfb16fbce75277b5232a127f2087ef",
+    "ddb89be403809e325750d3d263cd78929c2942b7942a34b77e122c9594a74c8c",
+    "5dc9da79a70659a9ad559cb701ded9a2ab9d823aad2f4960cfe370eff4604328",
+)]
+LEAF_DIGESTS = [hashlib.sha256(b"\x00" + leaf).digest() for leaf in LEAVES]
+
+
+def reference_root(digests):
+    """MTH de la RFC 6962, section 2.1, calculée récursivement."""
+    if len(digests) == 1:
+        return digests[0]
+    split = 1 << ((len(digests) - 1).bit_length() - 1)
+    return merkle.node_hash(reference_root(digests[:split]), reference_root(digests[split:]))
+
+
+def reference_path(index, digests):
+    """PATH de la RFC 6962, section 2.1.1, calculé récursivement."""
+    if len(digests) == 1:
+        return []
+    split = 1 << ((len(digests) - 1).bit_length() - 1)
+    if index < split:
+        return reference_path(index, digests[:split]) + [reference_root(digests[split:])]
+    return reference_path(index - split, digests[split:]) + [reference_root(digests[:split])]
+
+
+class MerkleTests(SimpleTestCase):
+    def test_roots(self):
+        digests = {}
+        builder = MerkleRootBuilder()
+        for size, (leaf, root) in enumerate(zip(LEAF_DIGESTS, ROOTS)):
+            _, new_root = merkle.append_leaves(size, digests, [leaf])
+            builder.append(leaf)
+            self.assertEqual(new_root, root, size + 1)
+            self.assertEqual(builder.root(), root, size + 1)
+            self.assertEqual(reference_root(LEAF_DIGESTS[:size + 1]), root, size + 1)
+
+    def test_append_in_one_batch(self):
+        _, root = merkle.append_leaves(0, {}, LEAF_DIGESTS)
+        self.assertEqual(root, ROOTS[-1])
+        self.assertEqual(merkle.range_hash(0, 0, {}), merkle.EMPTY_ROOT)
+        self.assertEqual(MerkleRootBuilder().root(), merkle.EMPTY_ROOT)
+
+    def test_inclusion_proofs(self):
+        digests = {}
+        merkle.append_leaves(0, digests, LEAF_DIGESTS)
+        for size in range(1, len(LEAVES) + 1):
+            for index in range(size):
+                path = [merkle.range_hash(start, end, digests) for start, end in merkle.inclusion_path(index, size)]
+                self.assertEqual(path, reference_path(index, LEAF_DIGESTS[:size]), (index, size))
+                self.assertTrue(merkle.verify_inclusion(LEAF_DIGESTS[index], index, size, path, ROOTS[size - 1]))
+                # Mauvaise feuille, mauvais index ou racine d'un autre arbre
+                other_leaf = LEAF_DIGESTS[(index + 1) % len(LEAVES)]
+                self.assertFalse(merkle.verify_inclusion(other_leaf, index, size, path, ROOTS[size - 1]))
+                self.assertFalse(merkle.verify_inclusion(LEAF_DIGESTS[index], size, size, path, ROOTS[size - 1]))
+                if size < len(LEAVES):
+                    self.assertFalse(merkle.verify_inclusion(LEAF_DIGESTS[index], index, size, path, ROOTS[size]))
+
+
+class MerkleTreeTests(TestCase):
+    def test_stored_tree_matches_builder(self):
+        vote = make_vote()
+        ballots = [
+            Ballot(vote=vote, token=new_token(), result='{"choice":true}', server_signature="", sequence=i)
+            for i in range(11)
+        ]
+        Ballot.objects.bulk_create(ballots)
+        builder = MerkleRootBuilder()
+        for start, end in ((0, 1), (1, 4), (4, 11)):
+            tree = MerkleTree.lock(vote.pk)
+            tree.append(ballots[start:end])
+            for ballot in ballots[start:end]:
+                builder.append(merkle.leaf_hash(ballot.token, ballot.result))
+            tree = MerkleTree.objects.get(vote=vote)
+            self.assertEqual((tree.size, bytes(tree.root)), (end, builder.root()))
+
+        for ballot in ballots:
+            path = tree.inclusion_proof(ballot.sequence)
+            leaf = merkle.leaf_hash(ballot.token, ballot.result)
+            self.assertTrue(merkle.verify_inclusion(leaf, ballot.sequence, tree.size, path, bytes(tree.root)))
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from voting.metadata import get_vote_metadata, metadata_cache
+from voting.models import Person, PersonVote, Vote, VoteSnapshot
+
+from .utils import make_vote, make_voter
+
+
+class VoteMetadataCacheTests(TestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        self.vote = make_vote(PersonVote)
+
+    def test_served_from_cache(self):
+        get_vote_metadata(self.vote.uuid)
+        with self.assertNumQueries(0):
+            metadata = get_vote_metadata(self.vote.uuid)
+        self.assertEqual((metadata.id, metadata.vote_type, metadata.name), (self.vote.pk, "personvote", "Vote"))
+
+    def test_invalidated_when_vote_is_edited(self):
+        get_vote_metadata(self.vote.uuid)
+        # Modification depuis une autre instance, comme dans l'administration
+        vote = Vote.objects.get(pk=self.vote.pk)
+        vote.name = "Nouveau nom"
+        vote.end_time = timezone.now() - timedelta(minutes=1)
+        vote.save()
+
+        metadata = get_vote_metadata(self.vote.uuid)
+        self.assertEqual((metadata.name, metadata.end_time), ("Nouveau nom", vote.end_time))
+        self.assertEqual(metadata.can_vote(make_voter(self.vote)), (False, "ended"))
+
+    def test_invalidated_when_candidates_change(self):
+        person = Person.objects.create(name="Alice")
+        self.assertEqual(get_vote_metadata(self.vote.uuid).candidate_ids, frozenset())
+        self.vote.persons.add(person)
+        self.assertEqual(get_vote_metadata(self.vote.uuid).candidate_ids, {str(person.pk)})
+        person.delete()
+        self.assertEqual(get_vote_metadata(self.vote.uuid).candidate_ids, frozenset())
+
+    def test_invalidated_when_snapshot_is_published(self):
+        self.assertEqual(get_vote_metadata(self.vote.uuid).snapshot_digest, "")
+        snapshot = VoteSnapshot.objects.create(vote=self.vote, size=0, digest="abc")
+        self.assertEqual(get_vote_metadata(self.vote.uuid).snapshot_digest, "")
+        snapshot.published = True
+        snapshot.save()
+        self.assertEqual(get_vote_metadata(self.vote.uuid).snapshot_digest, "abc")
+
+
+class CanVoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.vote = make_vote()
+        cls.future = make_vote(start_time=now + timedelta(days=1), end_time=now + timedelta(days=2))
+        cls.past = make_vote(start_time=now - timedelta(days=2), end_time=now - timedelta(days=1))
+        cls.voter = make_voter(cls.vote, cls.future, cls.past)
+        cls.other = make_voter()
+
+    def test_same_result_as_vote(self):
+        for vote in (self.vote, self.future, self.past):
+            for user in (self.voter, self.other, AnonymousUser()):
+                with self.subTest(vote=vote, user=user):
+                    self.assertEqual(get_vote_metadata(vote.uuid).can_vote(user), vote.can_vote(user))
+        self.assertEqual(get_vote_metadata(self.vote.uuid).can_vote(self.voter), (True, ""))
+
+    def test_single_query(self):
+        metadata = get_vote_metadata(self.vote.uuid)
+        with self.assertNumQueries(1):
+            metadata.can_vote(self.voter)
+
+    def test_form_spec(self):
+        url = reverse("submit", args=[self.vote.uuid])
+        self.client.force_login(self.other)
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["can_vote"], [False, "user"])
+        self.vote.allowed_users.add(self.other)
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.json()["can_vote"], [True, ""])
@@ -0,0 +1,101 @@
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from voting.middleware import AdmissionControlMiddleware, LocalTokenBuckets, get_client_ip
+
+VOTE_UUID = "00000000-0000-0000-0000-000000000000"
+
+NO_LIMITS = {"sign": 0, "submit": 0, "read": 0}
+NO_RATES = {"sign": (0, 0), "submit": (0, 0), "read": (0, 0)}
+
+
+def ok(request):
+    return HttpResponse("ok")
+
+
+@override_settings(
+    VOTING_ADMISSION_CONTROL=True,
+    VOTING_CONCURRENCY_LIMITS=NO_LIMITS,
+    VOTING_RATE_LIMITS=NO_RATES,
+    VOTING_RATE_LIMIT_STORE="local",
+    VOTING_CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR",
+)
+class AdmissionControlTests(SimpleTestCase):
+    def request(self, name="vote_hash", ip="192.0.2.1"):
+        # Un seul proxy, qui ajoute l'adresse du client
+        return RequestFactory().get(reverse(name, args=[VOTE_UUID]), HTTP_X_FORWARDED_FOR=ip)
+
+    @override_settings(VOTING_ADMISSION_CONTROL=False)
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            AdmissionControlMiddleware(ok)
+
+    @override_settings(VOTING_CLIENT_IP_HEADER="", VOTING_RATE_LIMITS={**NO_RATES, "read": (1, 1)})
+    def test_per_ip_limits_need_client_ip_header(self):
+        with self.assertRaises(ImproperlyConfigured):
+            AdmissionControlMiddleware(ok)
+
+    @override_settings(VOTING_CLIENT_IP_HEADER="", VOTING_RATE_LIMITS={**NO_RATES, "sign": (1, 1)})
+    def test_per_user_limits_do_not_need_client_ip_header(self):
+        AdmissionControlMiddleware(ok)
+
+    @override_settings(VOTING_RATE_LIMITS={**NO_RATES, "read": (0.001, 2)})
+    def test_rate_limit_per_client_ip(self):
+        middleware = AdmissionControlMiddleware(ok)
+        self.assertEqual(middleware(self.request()).status_code, 200)
+        self.assertEqual(middleware(self.request()).status_code, 200)
+        response = middleware(self.request())
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # Autre client derrière le même proxy : autre seau
+        self.assertEqual(middleware(self.request(ip="192.0.2.2")).status_code, 200)
+
+    @override_settings(VOTING_CONCURRENCY_LIMITS={**NO_LIMITS, "submit": 1})
+    def test_concurrency_limit(self):
+        middleware = AdmissionControlMiddleware(ok)
+        limiter = middleware.limiters["submit"]
+        limiter.acquire()
+        try:
+            response = middleware(self.request("submit_vote"))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "1")
+            # Les autres catégories ne sont pas concernées
+            self.assertEqual(middleware(self.request()).status_code, 200)
+        finally:
+            limiter.release()
+        self.assertEqual(middleware(self.request("submit_vote")).status_code, 200)
+
+    @override_settings(VOTING_RATE_LIMITS={**NO_RATES, "read": (0.001, 1)})
+    def test_forged_forwarded_for(self):
+        middleware = AdmissionControlMiddleware(ok)
+
+        def request(forged):
+            # Le client envoie son propre X-Forwarded-For, le proxy y ajoute la vraie adresse
+            return RequestFactory().get(
+                reverse("vote_hash", args=[VOTE_UUID]), HTTP_X_FORWARDED_FOR=f"{forged}, 192.0.2.1"
+            )
+
+        self.assertEqual(middleware(request("198.51.100.1")).status_code, 200)
+        self.assertEqual(middleware(request("198.51.100.2")).status_code, 429)
+
+    @override_settings(VOTING_TRUSTED_PROXY_COUNT=2)
+    def test_trusted_proxy_count(self):
+        # Le second proxy ajoute l'adresse du premier
+        self.assertEqual(get_client_ip(self.request(ip="forged, 192.0.2.1, 10.0.0.1")), "192.0.2.1")
+        self.assertEqual(get_client_ip(RequestFactory().get("/", HTTP_X_FORWARDED_FOR="192.0.2.1")), "192.0.2.1")
+
+    def test_other_urls_are_not_limited(self):
+        middleware = AdmissionControlMiddleware(ok)
+        self.assertEqual(middleware(RequestFactory().get("/help")).status_code, 200)
+
+
+class LocalTokenBucketsTests(SimpleTestCase):
+    def test_burst_then_wait(self):
+        buckets = LocalTokenBuckets()
+        self.assertEqual([buckets.take("key", 1, 3) for _ in range(3)], [0, 0, 0])
+        wait = buckets.take("key", 1, 3)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1)
+        self.assertEqual(buckets.take("other", 1, 3), 0)
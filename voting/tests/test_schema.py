@@ -0,0 +1,80 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from voting.metadata import metadata_cache
+from voting.models import Ballot, Person, PersonVote
+from voting.schema import InvalidBallotData, get_ballot_schema, schema_cache
+
+from .utils import make_vote, new_token, sign_ballot
+
+
+class BallotSchemaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.choice_vote = make_vote()
+        cls.person_vote = make_vote(PersonVote)
+        cls.alice, cls.bob = Person.objects.create(name="Alice"), Person.objects.create(name="Bob")
+        cls.person_vote.persons.add(cls.alice, cls.bob)
+
+    def setUp(self):
+        # Les candidats ajoutés par un test précédent ont disparu avec sa transaction, sans signal
+        metadata_cache.clear()
+        schema_cache.clear()
+
+    def assertValid(self, vote, *ballots):
+        schema = get_ballot_schema(vote)
+        for ballot in ballots:
+            with self.subTest(ballot=ballot):
+                schema.validate(ballot)
+
+    def assertInvalid(self, vote, *ballots):
+        schema = get_ballot_schema(vote)
+        for ballot in ballots:
+            with self.subTest(ballot=ballot), self.assertRaises(InvalidBallotData):
+                schema.validate(ballot)
+
+    def test_choice_vote(self):
+        self.assertValid(self.choice_vote, {}, {"choice": True}, {"choice": False}, {"choice": None})
+        self.assertInvalid(
+            self.choice_vote,
+            [], "oui", None,
+            # Entiers à la place des booléens
+            {"choice": 1}, {"choice": 0}, {"choice": "true"},
+            # Champs manquants ou en trop
+            {"other": True}, {"choice": True, "other": True},
+        )
+
+    def test_person_vote(self):
+        alice, bob = str(self.alice.pk), str(self.bob.pk)
+        self.assertValid(
+            self.person_vote,
+            {}, {"persons": {}}, {"persons": {alice: 1, bob: 7}}, {"persons": {alice: "3"}},
+        )
+        self.assertInvalid(
+            self.person_vote,
+            # Candidat inconnu
+            {"persons": {str(self.bob.pk + 1): 1}}, {"persons": {"Alice": 1}},
+            # Mentions hors de l'intervalle
+            {"persons": {alice: 0}}, {"persons": {alice: 8}}, {"persons": {alice: "8"}},
+            {"persons": {alice: -1}}, {"persons": {alice: 1.0}}, {"persons": {alice: None}},
+            # bool est une sous-classe de int
+            {"persons": {alice: True}}, {"persons": {alice: False}},
+            # Champs manquants ou en trop
+            {"persons": [alice]}, {"persons": {alice: 1}, "choice": True}, {"choice": True},
+        )
+
+    def test_new_candidate_is_accepted(self):
+        carol = Person.objects.create(name="Carol")
+        self.assertInvalid(self.person_vote, {"persons": {str(carol.pk): 1}})
+        self.person_vote.persons.add(carol)
+        self.assertValid(self.person_vote, {"persons": {str(carol.pk): 1}})
+
+    def test_submission_is_rejected(self):
+        """Un bulletin correctement signé mais hors du formulaire du vote n'entre pas dans l'urne."""
+        token, data = new_token(), '{"persons":{"%d":true}}' % self.alice.pk
+        response = self.client.post(
+            reverse("submit_vote", args=[self.person_vote.uuid]),
+            {"token": token, "data": data, "signature": sign_ballot(self.person_vote, token, data)},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ballot.objects.filter(token=token).exists())
@@ -0,0 +1,100 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from voting import merkle
+from voting.ingest import ingest_ballots, store_ballot
+from voting.models import Ballot, BallotBoxClosed, MerkleTree, TallyCounter
+from voting.snapshot import close_ballot_box
+
+from .utils import make_vote, new_token, sign_ballot
+
+
+class SequencingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def ballot(self, data='{"choice":true}'):
+        token = new_token()
+        return Ballot(vote=self.vote, token=token, result=data, server_signature=sign_ballot(self.vote, token, data))
+
+    def test_ballots_are_sequenced_after_commit(self):
+        ballot = self.ballot()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(store_ballot(ballot)[0], 201)
+        self.assertIsNone(Ballot.objects.get(token=ballot.token).sequence)
+        self.assertFalse(MerkleTree.objects.get(vote=self.vote).size)
+
+        for callback in callbacks:
+            callback()
+        tree = MerkleTree.objects.get(vote=self.vote)
+        self.assertEqual(tree.size, 1)
+        self.assertEqual(bytes(tree.root), merkle.leaf_hash(ballot.token, ballot.result))
+        self.assertEqual(Ballot.objects.get(token=ballot.token).sequence, 0)
+        self.assertEqual(TallyCounter.get_counts(self.vote.pk), {("choice", "true"): 1})
+
+    def test_submission_does_not_touch_the_tree(self):
+        store_ballot(self.ballot())
+        with CaptureQueriesContext(connection) as queries:
+            store_ballot(self.ballot())
+        tables = {MerkleTree._meta.db_table, "voting_merklenode", TallyCounter._meta.db_table}
+        writes = [q["sql"] for q in queries if q["sql"].startswith(("INSERT", "UPDATE")) and any(t in q["sql"] for t in tables)]
+        self.assertEqual(writes, [])
+
+    def test_pending_ballots_are_sequenced_in_insertion_order(self):
+        entries = []
+        for data in ('{"choice":true}', '{"choice":false}', '{"choice":null}'):
+            ballot = self.ballot(data)
+            entries.append({"token": ballot.token, "data": ballot.result, "signature": ballot.server_signature})
+        self.assertEqual([status for status, _ in ingest_ballots(self.vote, entries)], [201, 201, 201])
+
+        call_command("sequence_ballots", stdout=StringIO())
+        tokens = Ballot.objects.filter(vote=self.vote).order_by("sequence").values_list("token", flat=True)
+        self.assertEqual(list(tokens), [entry["token"] for entry in entries])
+        self.assertEqual(MerkleTree.objects.get(vote=self.vote).size, 3)
+
+    def test_ballot_stored_while_sequencing_is_not_lost(self):
+        first, second = self.ballot(), self.ballot('{"choice":false}')
+        MerkleTree.objects.create(vote=self.vote)
+        Ballot.objects.bulk_create([first])
+        append_pending = MerkleTree.append_pending
+        lock_sequence = MerkleTree.lock_sequence.__func__
+        held = []
+
+        def append_then_store(tree, *args, **kwargs):
+            count = append_pending(tree, *args, **kwargs)
+            if not held:
+                # Second bulletin validé après la dernière lecture, pendant que l'arbre est verrouillé :
+                # sa propre numérotation trouve le verrou pris et ne fait rien
+                held.append(True)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertEqual(store_ballot(second)[0], 201)
+                held.pop()
+            return count
+
+        def lock_or_skip(cls, vote_id, skip_locked=False):
+            if held and skip_locked:
+                return None
+            return lock_sequence(cls, vote_id, skip_locked)
+
+        with (
+            mock.patch.object(MerkleTree, "append_pending", append_then_store),
+            mock.patch.object(MerkleTree, "lock_sequence", classmethod(lock_or_skip)),
+        ):
+            self.assertEqual(MerkleTree.sequence_pending(self.vote.pk), 2)
+        self.assertEqual(Ballot.objects.get(token=second.token).sequence, 1)
+        self.assertEqual(MerkleTree.objects.get(vote=self.vote).size, 2)
+
+    def test_closing_sequences_pending_ballots(self):
+        ballot = self.ballot()
+        store_ballot(ballot)
+        tree = close_ballot_box(self.vote)
+        self.assertEqual(tree.size, 1)
+        self.assertEqual(Ballot.objects.get(token=ballot.token).sequence, 0)
+        with self.assertRaises(BallotBoxClosed):
+            self.ballot().save()
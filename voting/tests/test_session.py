@@ -0,0 +1,72 @@
+import json
+import uuid
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from voting.models import Ballot
+
+from .utils import blind, make_vote, make_voter, new_token, sign_ballot
+
+
+class SessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def post(self, name, key, entries):
+        return self.client.post(reverse(name), json.dumps({key: entries}), content_type="application/json")
+
+    def test_sign_reports_each_vote(self):
+        self.client.force_login(make_voter(self.vote))
+        blinded_message, _ = blind(self.vote.get_public_key(), new_token(), '{"choice":true}')
+        response = self.post("session_sign", "requests", [
+            # UUID valide mais pas sous sa forme canonique
+            {"vote": str(self.vote.uuid).upper(), "blinded_message": blinded_message},
+            {"vote": "pas-un-uuid", "blinded_message": blinded_message},
+            {"vote": 42, "blinded_message": blinded_message},
+            {"vote": str(uuid.uuid4()), "blinded_message": blinded_message},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["status_code"] for result in results], [200, 400, 400, 404])
+        self.assertIn("signature", results[0])
+        self.assertEqual(results[1]["error"], "UUID de vote invalide")
+        self.assertEqual(results[2]["vote"], 42)
+
+    def test_submit_reports_each_ballot(self):
+        token, data = new_token(), '{"choice":false}'
+        ballot = {"token": token, "data": data, "signature": sign_ballot(self.vote, token, data)}
+        response = self.post("session_submit", "ballots", [
+            {"vote": self.vote.uuid.hex, **ballot},
+            {"vote": None, **ballot},
+            {"vote": str(uuid.uuid4()), **ballot},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["status_code"] for result in results], [201, 400, 404])
+        self.assertEqual(results[1]["error"], "UUID de vote invalide")
+        self.assertTrue(Ballot.objects.filter(token=token, vote=self.vote).exists())
+
+    def test_public_keys(self):
+        unknown = str(uuid.uuid4())
+        response = self.client.get(reverse("session_public_keys"), {"vote": [str(self.vote.uuid), unknown, "pas-un-uuid"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"keys": {str(self.vote.uuid): self.vote.public_key_pem}})
+
+    @override_settings(VOTING_SESSION_MAX_VOTES=2)
+    def test_public_keys_limit(self):
+        url = reverse("session_public_keys")
+        self.assertEqual(self.client.get(url, {"vote": [str(self.vote.uuid)] * 2}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"vote": [str(uuid.uuid4()) for _ in range(3)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("2 votes", response.json()["error"])
+
+    def test_malformed_bodies(self):
+        self.client.force_login(make_voter(self.vote))
+        for name in ("session_sign", "session_submit"):
+            for body in (b"pas du JSON", b'{"requests": ["\xff"]}', b"[]", b'{"requests": [1]}', b'{"ballots": {}}'):
+                with self.subTest(name=name, body=body):
+                    response = self.client.post(reverse(name), body, content_type="application/json")
+                    self.assertEqual(response.status_code, 400)
@@ -0,0 +1,105 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from voting import merkle
+from voting.models import MerkleTree, VoteSnapshot
+from voting.snapshot import SNAPSHOT_DIR, SnapshotError, ballot_filename, create_snapshot, publish_snapshot
+from voting.views import vote_hash_digest
+
+from .utils import add_ballots, make_vote, new_token, sign_ballot
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(STATIC_ROOT=directory, STATIC_URL="/static/")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.static_root = Path(directory)
+
+        self.vote = make_vote()
+        self.tokens = add_ballots(self.vote, ['{"choice":true}', '{"choice":false}'])
+        self.vote.end_time = timezone.now() - timedelta(minutes=1)
+        self.vote.save()
+
+    def snapshot_dir(self, snapshot):
+        return self.static_root / SNAPSHOT_DIR / str(self.vote.uuid) / snapshot.digest
+
+    def test_files(self):
+        snapshot = create_snapshot(self.vote)
+        directory = self.snapshot_dir(snapshot)
+        tree = MerkleTree.objects.get(vote=self.vote)
+        self.assertTrue(tree.frozen)
+        self.assertEqual(snapshot.size, 2)
+
+        manifest = json.loads((directory / "manifest.json").read_text())
+        self.assertEqual((manifest["size"], manifest["root"]), (2, bytes(tree.root).hex()))
+        self.assertEqual((directory / "hash.txt").read_text(), vote_hash_digest(self.vote.uuid))
+        proof = json.loads((directory / "proofs" / ballot_filename(self.tokens[1])).read_text())
+        self.assertTrue(merkle.verify_inclusion(
+            bytes.fromhex(proof["leaf"]), proof["sequence"], proof["size"],
+            [bytes.fromhex(digest) for digest in proof["path"]], bytes(tree.root),
+        ))
+        self.assertEqual((directory / "ballots" / ballot_filename(self.tokens[0])).read_text(), '{"choice":true}')
+
+        # Même contenu, même dossier
+        self.assertEqual(create_snapshot(self.vote).digest, snapshot.digest)
+
+    def test_unfinished_vote(self):
+        self.vote.end_time = timezone.now() + timedelta(days=1)
+        self.vote.save()
+        with self.assertRaises(SnapshotError):
+            create_snapshot(self.vote)
+
+    def test_views_answer_from_database_until_published(self):
+        snapshot = create_snapshot(self.vote)
+        self.assertFalse(snapshot.published)
+        hash_url = reverse("vote_hash", args=[self.vote.uuid])
+        response = self.client.get(hash_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), vote_hash_digest(self.vote.uuid))
+        self.assertEqual(self.client.get(reverse("ballot", args=[self.vote.uuid, self.tokens[0]])).status_code, 200)
+
+        publish_snapshot(self.vote)
+        prefix = f"/static/{SNAPSHOT_DIR}/{self.vote.uuid}/{snapshot.digest}/"
+        self.assertRedirects(self.client.get(hash_url), prefix + "hash.txt", fetch_redirect_response=False)
+        self.assertRedirects(
+            self.client.get(reverse("ballot", args=[self.vote.uuid, self.tokens[0]])),
+            prefix + f"ballots/{ballot_filename(self.tokens[0])}",
+            fetch_redirect_response=False,
+        )
+        self.assertRedirects(
+            self.client.get(reverse("vote_results", args=[self.vote.uuid])), prefix + "results.html",
+            fetch_redirect_response=False,
+        )
+
+    def test_closed_ballot_box_refuses_ballots(self):
+        create_snapshot(self.vote)
+        token, data = new_token(), '{"choice":true}'
+        response = self.client.post(
+            reverse("submit_vote", args=[self.vote.uuid]),
+            {"token": token, "data": data, "signature": sign_ballot(self.vote, token, data)},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        call_command("snapshot_vote", str(self.vote.uuid), stdout=StringIO())
+        self.assertFalse(VoteSnapshot.objects.get(vote=self.vote).published)
+        call_command("snapshot_vote", str(self.vote.uuid), mark_published=True, stdout=StringIO())
+        self.assertTrue(VoteSnapshot.objects.get(vote=self.vote).published)
+        # Contenu inchangé : l'instantané réécrit reste publié
+        call_command("snapshot_vote", "--closed", stdout=StringIO())
+        self.assertTrue(VoteSnapshot.objects.get(vote=self.vote).published)
+
+    def test_publish_right_away(self):
+        self.assertTrue(create_snapshot(self.vote, publish=True).published)
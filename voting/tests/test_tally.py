@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from voting import tally
+from voting.models import Ballot, MerkleTree, PersonVote, TallyCounter
+from voting.views import calculate_choice_results, calculate_majority_judgment
+
+from .utils import make_vote, new_token, sign_ballot
+
+
+class BallotTallyTests(SimpleTestCase):
+    def test_choice(self):
+        self.assertEqual(tally.ballot_tally({"choice": True}), [("choice", "true")])
+        self.assertEqual(tally.ballot_tally({"choice": None}), [("choice", "null")])
+
+    def test_persons(self):
+        # Mentions en chaînes (client JS) ou en entiers (formulaire Django)
+        self.assertEqual(tally.ballot_tally({"persons": {"1": "3", "2": 7}}), [("1", "3"), ("2", "7")])
+        self.assertEqual(tally.ballot_tally({"persons": {"1": "x"}}), [])
+        self.assertEqual(tally.ballot_tally([]), [])
+
+    def test_count_results(self):
+        counts = tally.count_results([{"choice": True}, {"choice": True}, {"choice": False}])
+        self.assertEqual(counts, {("choice", "true"): 2, ("choice", "false"): 1})
+
+
+class TallyCounterTests(TestCase):
+    def store(self, vote, *results):
+        with self.captureOnCommitCallbacks(execute=True):
+            for data in results:
+                token = new_token()
+                Ballot.objects.create(vote=vote, token=token, result=data, server_signature=sign_ballot(vote, token, data))
+
+    def test_choice_results_come_from_counters(self):
+        vote = make_vote()
+        self.assertIsNone(calculate_choice_results(vote.uuid))
+        self.store(vote, '{"choice":true}', '{"choice":true}', '{"choice":false}', '{"choice":null}')
+        self.assertEqual(
+            TallyCounter.get_counts(vote.pk),
+            {("choice", "true"): 2, ("choice", "false"): 1, ("choice", "null"): 1},
+        )
+
+        results = calculate_choice_results(vote.uuid)
+        self.assertEqual(results["total"], 4)
+        self.assertEqual(
+            [(choice["value"], choice["count"], choice["percentage"]) for choice in results["choices"]],
+            [("true", 2, 50.0), ("false", 1, 25.0), ("null", 1, 25.0)],
+        )
+        self.assertEqual(calculate_majority_judgment(vote.uuid), [])
+
+        response = self.client.get(reverse("vote_results", args=[vote.uuid]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["choice_results"], results)
+        self.assertContains(response, "<strong>2</strong>")
+
+    def test_results_count_numbered_ballots_only(self):
+        vote = make_vote()
+        self.store(vote, '{"choice":true}')
+        token, data = new_token(), '{"choice":false}'
+        Ballot.objects.create(vote=vote, token=token, result=data, server_signature=sign_ballot(vote, token, data))
+        # Bulletin déposé mais pas encore numéroté : pas encore décompté
+        self.assertEqual(calculate_choice_results(vote.uuid)["total"], 1)
+        MerkleTree.sequence_pending(vote.pk, wait=True)
+        self.assertEqual(calculate_choice_results(vote.uuid)["total"], 2)
+
+    def test_majority_judgment_comes_from_counters(self):
+        vote = make_vote(PersonVote)
+        self.store(vote, '{"persons":{"1":"1"}}', '{"persons":{"1":"2"}}', '{"persons":{"1":"2"}}')
+        [result] = calculate_majority_judgment(vote.uuid)
+        self.assertEqual((result["candidate"], result["median_grade"], result["total"]), ("1", 2, 3))
+        self.assertIsNone(calculate_choice_results(vote.uuid))
+
+    def test_reconcile_tally_rebuilds_counters(self):
+        vote = make_vote()
+        self.store(vote, '{"choice":true}', '{"choice":false}')
+        TallyCounter.objects.filter(vote=vote, grade="true").update(count=5)
+        with self.assertRaises(CommandError):
+            call_command("reconcile_tally", str(vote.uuid), stdout=StringIO(), stderr=StringIO())
+        call_command("reconcile_tally", str(vote.uuid), fix=True, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(TallyCounter.get_counts(vote.pk), {("choice", "true"): 1, ("choice", "false"): 1})
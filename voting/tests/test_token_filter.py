@@ -0,0 +1,73 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from voting import token_filter
+from voting.models import TokenFilter
+
+from .utils import add_ballots, make_vote, new_token
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_membership_and_false_positives(self):
+        bloom = token_filter.BloomFilter(1024)
+        tokens = [new_token() for _ in range(1024)]
+        bloom.update(tokens)
+        self.assertTrue(all(token in bloom for token in tokens))
+        false_positives = sum(new_token() in bloom for _ in range(10000))
+        self.assertLess(false_positives, 200)
+
+    def test_serialization(self):
+        bloom = token_filter.BloomFilter(1024, size=1)
+        bloom.add("jeton")
+        copy = token_filter.BloomFilter.from_bytes(bloom.to_bytes())
+        self.assertEqual((copy.capacity, copy.size, copy.hash_count), (1024, 1, token_filter.HASH_COUNT))
+        self.assertIn("jeton", copy)
+        self.assertEqual(copy.to_bytes(), bloom.to_bytes())
+        with self.assertRaises(ValueError):
+            token_filter.BloomFilter.from_bytes(b"X" + bloom.to_bytes()[1:])
+
+    def test_capacity(self):
+        self.assertEqual(token_filter.capacity_for(0), token_filter.MIN_CAPACITY)
+        self.assertEqual(token_filter.capacity_for(1025), 2048)
+
+
+@mock.patch.object(token_filter, "MIN_CAPACITY", 4)
+class TokenFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def test_incremental_update_matches_full_build(self):
+        tokens = add_ballots(self.vote, ['{"choice":true}'] * 3)
+        self.assertEqual(TokenFilter.update(self.vote.pk).size, 3)
+        # Ajout au filtre existant, puis reconstruction quand la capacité est dépassée
+        tokens += add_ballots(self.vote, ['{"choice":false}'])
+        self.assertEqual(token_filter.BloomFilter.from_bytes(bytes(TokenFilter.update(self.vote.pk).data)).capacity, 4)
+        tokens += add_ballots(self.vote, ['{"choice":null}'] * 2)
+        instance = TokenFilter.update(self.vote.pk)
+
+        expected = token_filter.BloomFilter(8, size=6)
+        expected.update(tokens)
+        self.assertEqual((instance.size, bytes(instance.data)), (6, expected.to_bytes()))
+
+    def test_views(self):
+        url = reverse("token_filter", args=[self.vote.uuid])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        tokens = add_ballots(self.vote, ['{"choice":true}'] * 2)
+        call_command("update_token_filters", stdout=StringIO())
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse("token_filter_version", args=[self.vote.uuid, 2]), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        bloom = token_filter.BloomFilter.from_bytes(self.client.get(response.url).content)
+        self.assertEqual(bloom.size, 2)
+        self.assertTrue(all(token in bloom for token in tokens))
+        # Version qui n'existe plus : redirection vers la version à jour
+        self.assertRedirects(
+            self.client.get(reverse("token_filter_version", args=[self.vote.uuid, 1])), url, fetch_redirect_response=False
+        )
@@ -0,0 +1,82 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from voting.models import Ballot
+from voting.views import vote_hash_digest
+
+from .utils import blind, make_vote, make_voter, new_token, unblind
+
+
+class SignAndSubmitTests(TestCase):
+    """
+    Parcours complet d'un électeur, par les URL : ces tests passent par les vues synchrones ou
+    asynchrones selon VOTING_ASYNC_VIEWS (voir voting/urls.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vote = make_vote()
+
+    def sign(self, user, token, data):
+        public_key = self.vote.get_public_key()
+        blinded_message, r = blind(public_key, token, data)
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("sign_blind_token", args=[self.vote.uuid]),
+            json.dumps({"blinded_message": blinded_message}),
+            content_type="application/json",
+        )
+        self.client.logout()
+        self.assertEqual(response.status_code, 200, response.content)
+        return unblind(public_key, response.json()["signature"], r)
+
+    def submit(self, token, data, signature):
+        return self.client.post(
+            reverse("submit_vote", args=[self.vote.uuid]),
+            {"token": token, "data": data, "signature": signature},
+        )
+
+    def test_sign_and_submit(self):
+        token, data = new_token(), '{"choice":true}'
+        signature = self.sign(make_voter(self.vote), token, data)
+
+        response = self.submit(token, data, signature)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Ballot.objects.get(token=token).result, data)
+
+        response = self.client.get(reverse("ballot", args=[self.vote.uuid, token]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode(), data)
+
+        response = self.client.get(reverse("vote_hash", args=[self.vote.uuid]))
+        self.assertEqual(response.content.decode(), vote_hash_digest(self.vote.uuid))
+
+    def test_resubmit_is_idempotent(self):
+        token, data = new_token(), '{"choice":false}'
+        signature = self.sign(make_voter(self.vote), token, data)
+        self.assertEqual(self.submit(token, data, signature).status_code, 201)
+        self.assertEqual(self.submit(token, data, signature).status_code, 200)
+        self.assertEqual(Ballot.objects.filter(token=token).count(), 1)
+
+    def test_tampered_ballot_is_rejected(self):
+        token = new_token()
+        signature = self.sign(make_voter(self.vote), token, '{"choice":true}')
+        response = self.submit(token, '{"choice":false}', signature)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ballot.objects.filter(token=token).exists())
+
+    def test_sign_is_idempotent(self):
+        user = make_voter(self.vote)
+        public_key = self.vote.get_public_key()
+        blinded_message, _ = blind(public_key, new_token(), '{"choice":true}')
+        url = reverse("sign_blind_token", args=[self.vote.uuid])
+        self.client.force_login(user)
+        first = self.client.post(url, json.dumps({"blinded_message": blinded_message}), content_type="application/json")
+        retry = self.client.post(url, json.dumps({"blinded_message": blinded_message}), content_type="application/json")
+        self.assertEqual(retry.json()["signature"], first.json()["signature"])
+
+        other, _ = blind(public_key, new_token(), '{"choice":true}')
+        response = self.client.post(url, json.dumps({"blinded_message": other}), content_type="application/json")
+        self.assertEqual(response.status_code, 403)
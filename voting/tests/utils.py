@@ -0,0 +1,74 @@
+"""Outils communs aux tests : votes, électeurs et bulletins signés à l'aveugle comme par le client JS."""
+import base64
+import hashlib
+import secrets
+from datetime import timedelta
+from functools import cache
+
+import rsa
+from django.utils import timezone
+
+from voting.models import Ballot, ChoiceVote, CustomUser, MerkleTree
+from voting.signing import encode_signature
+
+
+@cache
+def shared_key_pair():
+    """Paire de clés partagée par les votes des tests (1024 bits, pour ne pas ralentir les tests)."""
+    public_key, private_key = rsa.newkeys(1024)
+    return public_key.save_pkcs1().decode("ascii"), private_key.save_pkcs1().decode("ascii")
+
+
+def make_vote(cls=ChoiceVote, **kwargs):
+    """Crée un vote en cours, avec la paire de clés des tests."""
+    public_key_pem, private_key_pem = shared_key_pair()
+    kwargs.setdefault("name", "Vote")
+    kwargs.setdefault("start_time", timezone.now() - timedelta(days=1))
+    kwargs.setdefault("end_time", timezone.now() + timedelta(days=1))
+    return cls.objects.create(public_key_pem=public_key_pem, private_key_pem=private_key_pem, **kwargs)
+
+
+def make_voter(*votes):
+    """Crée un utilisateur autorisé à voter aux votes donnés."""
+    user = CustomUser.objects.create(username=f"electeur-{secrets.token_hex(4)}")
+    for vote in votes:
+        vote.allowed_users.add(user)
+    return user
+
+
+def new_token():
+    return base64.b64encode(secrets.token_bytes(32)).decode("ascii")
+
+
+def message_int(token, data):
+    return int.from_bytes(hashlib.sha256(f"{token}:{data}".encode("utf-8")).digest(), "big")
+
+
+def blind(public_key, token, data):
+    """Aveugle le bulletin "jeton:données" : renvoie (message aveuglé en Base64, facteur r)."""
+    r = secrets.randbelow(public_key.n - 2) + 2
+    blinded_int = message_int(token, data) * pow(r, public_key.e, public_key.n) % public_key.n
+    return encode_signature(blinded_int, public_key.n), r
+
+
+def unblind(public_key, signature_b64, r):
+    """Retire le facteur r d'une signature aveugle et renvoie la signature du bulletin en Base64."""
+    sig_int = int.from_bytes(base64.b64decode(signature_b64), "big") * pow(r, -1, public_key.n) % public_key.n
+    return encode_signature(sig_int, public_key.n)
+
+
+def sign_ballot(vote, token, data):
+    """Signature d'un bulletin faite directement avec la clé privée du vote (sans passer par les vues)."""
+    private_key = vote.get_private_key()
+    return encode_signature(pow(message_int(token, data), private_key.d, private_key.n), private_key.n)
+
+
+def add_ballots(vote, results, tokens=None):
+    """Enregistre des bulletins signés pour un vote et les numérote ; renvoie leurs jetons dans l'ordre d'arrivée."""
+    tokens = tokens or [new_token() for _ in results]
+    Ballot.objects.bulk_create([
+        Ballot(vote=vote, token=token, result=data, server_signature=sign_ballot(vote, token, data))
+        for token, data in zip(tokens, results)
+    ])
+    MerkleTree.sequence_pending(vote.pk, wait=True)
+    return tokens
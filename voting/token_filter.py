@@ -0,0 +1,72 @@
+"""
+Filtre de Bloom des jetons des bulletins d'un vote, pour vérifier un reçu sans interroger le serveur.
+
+Un jeton absent du filtre n'est pas dans l'urne (parmi ses `size` premiers bulletins) ; un jeton
+présent y est très probablement, ce que confirme ensuite /data/ballots/<uuid>/<jeton>. Ce module
+ne dépend pas de Django ; voting/static/voting/token_filter.js lit le même format :
+
+    MAGIC (8 octets) | nombre de jetons (8, gros-boutiste) | nombre de fonctions de hachage (1) | bits
+
+Le bit i est le bit de poids i % 8 de l'octet i // 8. Les positions d'un jeton sont
+(h1 + j * h2) % m pour j < k, où h1 et h2 sont les deux premiers entiers de 32 bits
+(gros-boutistes) du SHA-256 du jeton en UTF-8, h2 étant rendu impair.
+"""
+import hashlib
+import struct
+
+MAGIC = b"VOTEBLM\x01"
+HEADER = struct.Struct(">8sQB")
+
+# 10 bits et 7 fonctions de hachage par jeton : moins de 1 % de faux positifs à pleine capacité
+BITS_PER_TOKEN = 10
+HASH_COUNT = 7
+MIN_CAPACITY = 1024
+
+
+def capacity_for(size):
+    """
+    Capacité du filtre d'une urne de `size` bulletins : la plus petite puissance de 2 suffisante.
+
+    Le filtre d'une urne ne dépend ainsi que de ses `size` premiers bulletins, qu'il ait été
+    construit d'un coup ou au fil de l'eau.
+    """
+    capacity = MIN_CAPACITY
+    while capacity < size:
+        capacity *= 2
+    return capacity
+
+
+class BloomFilter:
+    def __init__(self, capacity, size=0, bits=None, hash_count=HASH_COUNT):
+        self.capacity = capacity
+        self.size = size
+        self.hash_count = hash_count
+        self.bit_count = capacity * BITS_PER_TOKEN
+        self.bits = bytearray(self.bit_count // 8) if bits is None else bytearray(bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, size, hash_count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Filtre de jetons invalide.")
+        bits = data[HEADER.size:]
+        return cls(len(bits) * 8 // BITS_PER_TOKEN, size, bits, hash_count)
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, self.size, self.hash_count) + bytes(self.bits)
+
+    def _positions(self, token):
+        h1, h2 = struct.unpack_from(">II", hashlib.sha256(token.encode("utf-8")).digest())
+        h2 |= 1
+        return ((h1 + j * h2) % self.bit_count for j in range(self.hash_count))
+
+    def add(self, token):
+        for position in self._positions(token):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, tokens):
+        for token in tokens:
+            self.add(token)
+
+    def __contains__(self, token):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(token))
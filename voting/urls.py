@@ -1,16 +1,31 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# Vues les plus sollicitées : variantes asynchrones si VOTING_ASYNC_VIEWS est activé
+hot_views = async_views if settings.VOTING_ASYNC_VIEWS else views
 
 urlpatterns = [
     path("", views.HomepageView.as_view(), name="home"),
-    path("data/ballots/<uuid:vote_uuid>/<path:token>", views.ballot_view, name="ballot"),
+    path("data/ballots/<uuid:vote_uuid>/<path:token>", hot_views.ballot_view, name="ballot"),
     path("data/ballots/<uuid:vote_uuid>/", views.BallotListView.as_view(), name="ballot_list"),
-    path('vote/<uuid:vote_uuid>/hash', views.vote_hash, name='vote_hash'),
+    path('vote/session/public-keys', views.session_public_keys, name='session_public_keys'),
+    path('vote/session/sign', views.session_sign, name='session_sign'),
+    path('vote/session/submit', views.session_submit, name='session_submit'),
+    path('vote/<uuid:vote_uuid>/hash', hot_views.vote_hash, name='vote_hash'),
+    path('vote/<uuid:vote_uuid>/export.<str:export_format>', views.export_ballots, name='export_ballots'),
+    path('vote/<uuid:vote_uuid>/feed', views.ballot_feed, name='ballot_feed'),
+    path('vote/<uuid:vote_uuid>/lookup', views.lookup_ballots, name='lookup_ballots'),
+    path('vote/<uuid:vote_uuid>/token-filter', views.token_filter, name='token_filter'),
+    path('vote/<uuid:vote_uuid>/token-filter/<int:size>', views.token_filter_version, name='token_filter_version'),
+    path('vote/<uuid:vote_uuid>/merkle-root', views.merkle_root, name='merkle_root'),
+    path('vote/<uuid:vote_uuid>/proof/<path:token>', views.ballot_proof, name='ballot_proof'),
     path('vote/<uuid:vote_uuid>/results', views.vote_results, name='vote_results'),
     path('vote/<uuid:vote_uuid>/public-key', views.get_public_key, name='get_public_key'),
-    path('vote/<uuid:vote_uuid>/sign', views.sign_blind_token, name='sign_blind_token'),
-    path('vote/<uuid:vote_uuid>/submit', views.submit_vote, name='submit_vote'),
+    path('vote/<uuid:vote_uuid>/sign', hot_views.sign_blind_token, name='sign_blind_token'),
+    path('vote/<uuid:vote_uuid>/submit', hot_views.submit_vote, name='submit_vote'),
+    path('vote/<uuid:vote_uuid>/submit-batch', views.submit_vote_batch, name='submit_vote_batch'),
     path("submit-vote/<uuid:vote_uuid>", views.submit_vote_view, name="submit"),
     path("submit-vote/", views.VotesListView.as_view(), name="submit_list"),
     path("help", views.voting_help, name="help"),
@@ -0,0 +1,332 @@
+"""
+Vérification complète des bulletins d'un vote, utilisable sans projet Django.
+
+Chaque bulletin est vérifié comme dans submit_vote (JSON canonique, signature aveugle
+sha256("jeton:résultat") == signature^e mod n) dans un groupe de processus, pendant que le
+processus principal recalcule l'empreinte du vote (vote_hash) et la racine de l'arbre de Merkle.
+
+Les bulletins peuvent venir d'un export NDJSON ou CSV (voir export.py), d'une archive binaire
+(voir archive.py) ou de l'urne publique du site :
+
+    python -m voting.verify --url https://exemple.org --vote <uuid>
+    python -m voting.verify --file ballots.ndjson.gz --public-key public-key.pem
+    python -m voting.verify --archive ballots.bin
+"""
+import argparse
+import base64
+import csv
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import rsa
+
+from . import canonical, merkle
+from .archive import BallotArchive
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# Nombre de bulletins envoyés à la fois à un processus
+CHUNK_SIZE = 5000
+# Nombre de couples (jeton, résultat) triés en mémoire avant d'être écrits dans un fichier temporaire
+SORT_RUN_SIZE = 200_000
+
+Failure = namedtuple("Failure", ["sequence", "token", "error"])
+
+
+@dataclass
+class Report:
+    count: int = 0
+    failures: list = field(default_factory=list)
+    vote_hash: str = ""
+    merkle_root: bytes = merkle.EMPTY_ROOT
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        """Bulletins vérifiés par seconde."""
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def ok(self):
+        return not self.failures
+
+
+class MerkleRootBuilder:
+    """
+    Racine de l'arbre de Merkle (voir merkle.py) calculée au fil des feuilles : seules les
+    empreintes des sous-arbres complets les plus à droite sont gardées, soit O(log n) empreintes.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._stack = []  # (niveau, empreinte), du plus grand sous-arbre au plus petit
+
+    def append(self, leaf):
+        level = 0
+        while self._stack and self._stack[-1][0] == level:
+            leaf = merkle.node_hash(self._stack.pop()[1], leaf)
+            level += 1
+        self._stack.append((level, leaf))
+        self.size += 1
+
+    def root(self):
+        if not self._stack:
+            return merkle.EMPTY_ROOT
+        result = self._stack[-1][1]
+        for _, digest in reversed(self._stack[:-1]):
+            result = merkle.node_hash(digest, result)
+        return result
+
+
+class SortedEntries:
+    """
+    Tri externe des couples (jeton, résultat) pour le calcul de vote_hash.
+
+    Les couples sont triés par paquets de `run_size`, écrits dans des fichiers temporaires puis
+    fusionnés à la lecture (heapq.merge) : la mémoire utilisée ne dépend pas du nombre de bulletins.
+    """
+
+    def __init__(self, run_size=SORT_RUN_SIZE):
+        self.run_size = run_size
+        self._buffer = []
+        self._runs = []
+
+    def append(self, token, result):
+        self._buffer.append((token, result))
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort()
+        run = tempfile.TemporaryFile("w+", encoding="utf-8")
+        # Une ligne JSON par couple : les retours à la ligne des jetons sont échappés
+        run.writelines(json.dumps(entry) + "\n" for entry in self._buffer)
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def __iter__(self):
+        """Parcourt les couples triés (ordre des points de code, comme models.binary_collation)."""
+        self._buffer.sort()
+        runs = [(tuple(json.loads(line)) for line in run) for run in self._runs]
+        return heapq.merge(self._buffer, *runs)
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def hash_entries(entries, report):
+    """Calcule report.vote_hash au fil des couples (jeton, résultat) triés, en signalant les jetons en double."""
+    sha256 = hashlib.sha256()
+    previous = None
+    for token, result in entries:
+        if previous is not None:
+            if previous == token:
+                report.failures.append(Failure(None, token, "Jeton en double."))
+            sha256.update(b"\n")
+        sha256.update(f"{token}:{result}".encode("utf-8"))
+        previous = token
+    report.vote_hash = sha256.hexdigest()
+
+
+_public_key = None
+
+
+def _init_worker(n, e):
+    global _public_key
+    _public_key = (n, e)
+
+
+def check_chunk(ballots, public_key=None):
+    """Vérifie des bulletins (numéro, jeton, résultat, signature) ; renvoie la liste des échecs."""
+    n, e = public_key or _public_key
+    powmod = gmpy2.powmod if gmpy2 is not None else pow
+    failures = []
+    for sequence, token, result, signature in ballots:
+        try:
+            canonical.loads(result)
+        except canonical.CanonicalJSONError as error:
+            failures.append(Failure(sequence, token, str(error)))
+            continue
+        m_int = int.from_bytes(hashlib.sha256(f"{token}:{result}".encode("utf-8")).digest(), "big")
+        try:
+            sig_int = int.from_bytes(base64.b64decode(signature), "big")
+        except ValueError as error:
+            failures.append(Failure(sequence, token, f"Erreur de décodage de la signature : {error}"))
+            continue
+        if powmod(sig_int, e, n) != m_int:
+            failures.append(Failure(sequence, token, "Signature invalide."))
+    return failures
+
+
+def verify_ballots(public_key_pem, ballots, workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Vérifie les bulletins (numéro, jeton, résultat, signature), dans l'ordre d'arrivée.
+
+    `workers` est le nombre de processus (par défaut, un par cœur ; 0 pour tout vérifier dans
+    le processus courant). Seuls quelques lots sont en cours à la fois et les couples
+    (jeton, résultat) nécessaires au calcul de vote_hash sont triés sur disque (voir
+    SortedEntries) : la mémoire reste donc bornée.
+    `progress`, s'il est donné, est appelé avec le nombre de bulletins vérifiés après chaque lot.
+    """
+    public_key = rsa.PublicKey.load_pkcs1(public_key_pem.encode("ascii"))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    report = Report()
+    tree = MerkleRootBuilder()
+    entries = SortedEntries()
+    start = time.monotonic()
+
+    def collect(failures, size):
+        report.failures.extend(failures)
+        report.count += size
+        if progress is not None:
+            progress(report.count)
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(public_key.n, public_key.e)) if workers else None
+    try:
+        pending = deque()
+        ballots = iter(ballots)
+        while chunk := list(islice(ballots, chunk_size)):
+            for sequence, token, result, _ in chunk:
+                if sequence is not None and int(sequence) != tree.size:
+                    report.failures.append(Failure(sequence, token, f"Numéro d'arrivée inattendu (attendu : {tree.size})."))
+                tree.append(merkle.leaf_hash(token, result))
+                entries.append(token, result)
+
+            if executor is None:
+                collect(check_chunk(chunk, (public_key.n, public_key.e)), len(chunk))
+                continue
+            pending.append((executor.submit(check_chunk, chunk), len(chunk)))
+            if len(pending) > 2 * workers:
+                future, size = pending.popleft()
+                collect(future.result(), size)
+        for future, size in pending:
+            collect(future.result(), size)
+        hash_entries(entries, report)
+    finally:
+        entries.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    report.merkle_root = tree.root()
+    report.elapsed = time.monotonic() - start
+    return report
+
+
+def read_export(stream, export_format):
+    """Bulletins d'un export NDJSON ou CSV, lus dans un flux binaire bufferisé (éventuellement compressé avec gzip)."""
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if export_format == "ndjson":
+        for line in text:
+            if line.strip():
+                ballot = json.loads(line)
+                yield ballot["sequence"], ballot["token"], ballot["result"], ballot["server_signature"]
+    else:
+        for ballot in csv.DictReader(text):
+            yield ballot["sequence"], ballot["token"], ballot["result"], ballot["server_signature"]
+
+
+def read_archive(ballot_archive):
+    for ballot in ballot_archive:
+        yield ballot.sequence, ballot.token, ballot.result, ballot.server_signature
+
+
+def fetch(url):
+    return urllib.request.urlopen(urllib.request.Request(url, headers={"User-Agent": "voting-verify"}))
+
+
+def fetch_vote(base_url, vote_uuid):
+    """Renvoie la clé publique, l'empreinte et la racine publiées, et les bulletins de l'urne publique d'un vote."""
+    vote_url = f"{base_url.rstrip('/')}/vote/{vote_uuid}"
+    with fetch(f"{vote_url}/public-key") as response:
+        public_key_pem = response.read().decode("ascii")
+    with fetch(f"{vote_url}/hash") as response:
+        vote_hash = response.read().decode("ascii").strip()
+    with fetch(f"{vote_url}/merkle-root") as response:
+        root = json.load(response)
+    response = fetch(f"{vote_url}/export.ndjson")
+    return public_key_pem, vote_hash, bytes.fromhex(root["root"]), read_export(io.BufferedReader(response), "ndjson")
+
+
+def format_report(report, expected_hash=None, expected_root=None, max_failures=20):
+    """Lignes du compte rendu d'une vérification ; la dernière vaut "OK" si tout concorde."""
+    lines = [
+        f"{report.count} bulletin(s) vérifié(s) en {report.elapsed:.1f} s ({report.rate:.0f} bulletins/s).",
+        f"Empreinte du vote : {report.vote_hash}",
+        f"Racine de Merkle : {report.merkle_root.hex()}",
+    ]
+    errors = [f"Bulletin {failure.sequence} ({failure.token}) : {failure.error}" for failure in report.failures[:max_failures]]
+    if len(report.failures) > max_failures:
+        errors.append(f"... et {len(report.failures) - max_failures} autre(s) erreur(s).")
+    if expected_hash is not None and expected_hash != report.vote_hash:
+        errors.append(f"L'empreinte publiée ({expected_hash}) est différente.")
+    if expected_root is not None and bytes(expected_root) != report.merkle_root:
+        errors.append(f"La racine publiée ({bytes(expected_root).hex()}) est différente.")
+    return lines + errors + ["OK" if not errors else f"{len(errors)} problème(s) trouvé(s)."]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m voting.verify", description="Vérifie tous les bulletins d'un vote.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="Adresse du site (avec --vote)")
+    source.add_argument("--file", help="Export NDJSON ou CSV (avec --public-key)")
+    source.add_argument("--archive", help="Archive binaire")
+    parser.add_argument("--vote", help="UUID du vote")
+    parser.add_argument("--public-key", help="Clé publique du vote (fichier PEM)")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Format de l'export (par défaut, selon son nom)")
+    parser.add_argument("--workers", type=int, help="Nombre de processus (0 : aucun)")
+    args = parser.parse_args(argv)
+
+    expected_hash = expected_root = None
+    if args.url:
+        if not args.vote:
+            parser.error("--url nécessite --vote")
+        public_key_pem, expected_hash, expected_root, ballots = fetch_vote(args.url, args.vote)
+        report = verify_ballots(public_key_pem, ballots, args.workers)
+    elif args.archive:
+        with BallotArchive(args.archive) as ballot_archive:
+            expected_root = ballot_archive.root
+            report = verify_ballots(ballot_archive.public_key_pem, read_archive(ballot_archive), args.workers)
+    else:
+        if not args.public_key:
+            parser.error("--file nécessite --public-key")
+        with open(args.public_key, encoding="ascii") as f:
+            public_key_pem = f.read()
+        export_format = args.format or ("csv" if ".csv" in args.file else "ndjson")
+        with open(args.file, "rb") as f:
+            report = verify_ballots(public_key_pem, read_export(f, export_format), args.workers)
+
+    lines = format_report(report, expected_hash, expected_root)
+    print("\n".join(lines))
+    return 0 if lines[-1] == "OK" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
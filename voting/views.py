@@ -1,58 +1,66 @@
-import base64
 import hashlib
 import json
+import re
+import uuid
 from collections import Counter, defaultdict
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.db.models import TextField, F, Value
 from django.db.models.functions import Concat
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import get_object_or_404, render
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
+from django.utils.text import compress_sequence
 from django.utils.translation import gettext as _
 from django.views import View
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from django.views.generic.list import ListView
 
+from . import export, merkle, tally
+from .ballot_log import get_ballot_log
+from .caching import board_condition, board_version, immutable_response, patch_board_response
+from .executor import SigningUnavailable, sign_for_vote
 from .forms import get_submit_vote_form
-from .models import Ballot, Vote, VoterStatus
+from .ingest import InvalidBallot, check_ballot, enqueue_ballot, ingest_ballots, store_ballot
+from .keys import fingerprint
+from .metadata import get_vote_metadata, get_vote_metadata_or_404
+from .models import Ballot, BallotBoxClosed, MerkleTree, TallyCounter, TokenFilter, Vote, VoterStatus, binary_collation
+from .schema import get_ballot_schema
+from .signing import SigningError
+from .snapshot import ballot_filename, redirect_to_snapshot
 from project.utils import is_xhr
 
 
+@redirect_to_snapshot("public-key.pem")
 def get_public_key(request, vote_uuid):
     """Expose la clé publique spécifique à un vote au format PEM."""
-    vote_obj = get_object_or_404(Vote, uuid=vote_uuid)
-    # get_keys() génère les clés si elles n'existent pas encore
-    pub_key, _ = vote_obj.get_keys()
-    return HttpResponse(vote_obj.public_key_pem, content_type="application/x-pem-file")
+    # Les métadonnées contiennent le PEM : inutile de charger le vote ou de décoder la clé
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    return immutable_response(
+        request, fingerprint(vote_meta.public_key_pem), vote_meta.public_key_pem, "application/x-pem-file"
+    )
 
 
-@csrf_exempt
-@login_required
-def sign_blind_token(request, vote_uuid):
+def sign_for_voter(user, vote_meta, blinded_message_b64):
     """
-    Signe un jeton aveuglé de manière idempotente.
-    Vérifie si l'utilisateur a déjà demandé une signature pour ce vote précis.
+    Signe un jeton aveuglé de manière idempotente pour un électeur et un vote (VoteMetadata).
+    Renvoie le code HTTP et le contenu de la réponse.
     """
-    if request.method != 'POST':
-        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
-
-    vote_obj = get_object_or_404(Vote, uuid=vote_uuid)
-    try:
-        data = json.loads(request.body)
-    except json.JSONDecodeError:
-        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
-    blinded_message_b64 = data.get("blinded_message")
-
-    if not blinded_message_b64:
-        return JsonResponse({"error": "Message aveuglé manquant"}, status=400)
+    if not blinded_message_b64 or not isinstance(blinded_message_b64, str):
+        return 400, {"error": "Message aveuglé manquant"}
 
     # 1. Gestion de l'idempotence via VoterStatus
     status, created = VoterStatus.objects.get_or_create(
-        user=request.user,
-        vote=vote_obj
+        user=user,
+        vote_id=vote_meta.id
     )
 
     # Calcul du hash du message aveuglé pour comparaison
@@ -61,27 +69,23 @@ def sign_blind_token(request, vote_uuid):
     if status.has_signed:
         # Si le hash correspond, c'est un retry (problème réseau client) : on renvoie la signature
         if status.blinded_message_hash == incoming_hash:
-            return JsonResponse({
+            return 200, {
                 "signature": status.generated_signature,
                 "status": "already_signed_retry"
-            })
+            }
         else:
             # Si le hash est différent, c'est une tentative de signer un DEUXIÈME bulletin
-            return JsonResponse({
+            return 403, {
                 "error": "Vous avez déjà obtenu une signature pour un bulletin différent."
-            }, status=403)
-
-    # 2. Phase de signature cryptographique
-    _, priv_key = vote_obj.get_keys()
-
-    # Décodage Base64 -> Int
-    blinded_int = int.from_bytes(base64.b64decode(blinded_message_b64), "big")
-
-    # Signature RSA : sig = blinded_int^d mod n
-    sig_int = pow(blinded_int, priv_key.d, priv_key.n)
+            }
 
-    # Encodage Int -> Base64
-    sig_b64 = base64.b64encode(sig_int.to_bytes(256, "big")).decode()
+    # 2. Phase de signature cryptographique (RSA-CRT : sig = blinded_int^d mod n)
+    try:
+        sig_b64 = sign_for_vote(vote_meta, blinded_message_b64)
+    except SigningError as e:
+        return 400, {"error": str(e)}
+    except SigningUnavailable as e:
+        return 503, {"error": str(e)}
 
     # 3. Sauvegarde de l'état pour l'idempotence futur
     status.blinded_message_hash = incoming_hash
@@ -89,7 +93,30 @@ def sign_blind_token(request, vote_uuid):
     status.has_signed = True
     status.save()
 
-    return JsonResponse({"signature": sig_b64})
+    return 200, {"signature": sig_b64}
+
+
+@csrf_exempt
+@login_required
+def sign_blind_token(request, vote_uuid):
+    """
+    Signe un jeton aveuglé de manière idempotente.
+    Vérifie si l'utilisateur a déjà demandé une signature pour ce vote précis.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+
+    status_code, data = sign_for_voter(request.user, vote_meta, data.get("blinded_message"))
+    response = JsonResponse(data, status=status_code)
+    if status_code == 503:
+        response["Retry-After"] = "1"
+    return response
 
 
 @csrf_exempt
@@ -101,80 +128,200 @@ def submit_vote(request, vote_uuid):
     if request.method != 'POST':
         return JsonResponse({"error": "Méthode non autorisée"}, status=405)
 
-    # 1. Récupération du vote concerné
-    vote_obj = get_object_or_404(Vote, uuid=vote_uuid)
+    # 1. Récupération du vote concerné (métadonnées en cache, sans requête polymorphe)
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    if vote_meta.snapshot_digest:
+        return JsonResponse({"error": str(BallotBoxClosed())}, status=400)
 
-    # 2. Instanciation du formulaire dynamique avec les données POST
+    # 2. Extraction des composants du bulletin
     json_payload = request.POST.get('data', '')
+    token = request.POST.get('token', '')
+    signature_b64 = request.POST.get('signature', '')
+
+    # 3. Vérification du JSON, de son contenu (schéma compilé du vote) et de la signature
     try:
-        result_data = json.loads(json_payload)
-    except json.JSONDecodeError:
-        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+        result_data = check_ballot(
+            vote_meta.get_public_key(), token, json_payload, signature_b64, schema=get_ballot_schema(vote_meta)
+        )
+    except InvalidBallot as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # 4. Enregistrement anonyme dans l'urne (Ballot)
+    # Une seule insertion idempotente : un renvoi du même bulletin renvoie le bulletin existant,
+    # un bulletin différent avec le même jeton est rejeté
+    ballot = Ballot(
+        token=token,
+        vote_id=vote_meta.id,
+        result=json_payload,
+        server_signature=signature_b64,
+    )
+    # Le JSON vient d'être vérifié : Ballot ne le décodera pas une seconde fois
+    ballot.set_validated_result(result_data)
+    if ballot_log := get_ballot_log():
+        # Enregistrement différé : le bulletin sera inséré par lots par drain_ballots
+        status_code, data = enqueue_ballot(vote_meta, ballot, ballot_log)
+    else:
+        status_code, data = store_ballot(ballot)
+    return JsonResponse(data, status=status_code)
 
-    # TODO: On vérifie si le bulletin est correct
 
-    # 3. Extraction des composants du bulletin
-    token = request.POST.get('token', '')
-    signature_b64 = request.POST.get('signature', '')
+@csrf_exempt
+def submit_vote_batch(request, vote_uuid):
+    """
+    Réceptionne un lot de bulletins (bornes de vote, collecteurs hors ligne...).
 
-    # 4. Reconstruction du message pour vérification du Hash
-    # Il est CRUCIAL d'utiliser sort_keys=True et les séparateurs compacts
-    # pour que le JSON généré ici soit identique au caractère près à celui du client JS.
-    # json_payload = json.dumps(result_data, sort_keys=True, separators=(',', ':'))
-    message_content = f"{token}:{json_payload}".encode('utf-8')
+    Le corps est un JSON {"ballots": [{"token": ..., "data": ..., "signature": ...}, ...]} ;
+    la réponse donne pour chaque bulletin le code et le contenu qu'aurait renvoyés submit_vote.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
 
-    # Calcul du hash SHA-256 (m)
-    hash_obj = hashlib.sha256(message_content).digest()
-    m_int = int.from_bytes(hash_obj, "big")
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    try:
+        entries = json.loads(request.body)["ballots"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if len(entries) > settings.VOTING_BATCH_MAX_BALLOTS:
+        return JsonResponse({
+            "error": f"Un lot ne peut pas contenir plus de {settings.VOTING_BATCH_MAX_BALLOTS} bulletins."
+        }, status=400)
 
-    # 5. Vérification cryptographique avec la clé publique du Singleton
-    pub_key, _priv_key = vote_obj.get_keys()
+    results = ingest_ballots(vote_meta, entries)
+    return JsonResponse({
+        "results": [{"status_code": status_code, **data} for status_code, data in results],
+    })
 
+
+def parse_vote_uuid(value):
+    """Forme canonique de l'UUID de vote donné, ou None s'il est invalide."""
+    if not isinstance(value, str):
+        return None
     try:
-        # Décodage de la signature Base64
-        sig_bytes = base64.b64decode(signature_b64)
-        sig_int = int.from_bytes(sig_bytes, "big")
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
 
-    except Exception as e:
-        return JsonResponse({"error": f"Erreur de décodage de la signature : {str(e)}"}, status=400)
 
-    else:
-        # Vérification RSA : sig^e mod n == m
-        if pow(sig_int, pub_key.e, pub_key.n) != m_int:
-            return JsonResponse({
-                "error": "Signature invalide. Le bulletin a été modifié ou la signature est incorrecte."
-            }, status=400)
-
-    # 6. Enregistrement anonyme dans l'urne (Ballot)
-    # On vérifie si le bulletin existe déjà, s'il n'existe pas, on le crée et on l'enregistre
+def get_votes_by_uuid(vote_uuids):
+    """
+    Renvoie les métadonnées des votes dont les UUID sont donnés, indexées par UUID canonique (voir
+    parse_vote_uuid ; les UUID invalides ou inconnus sont ignorés).
+    """
+    votes = {}
+    for vote_uuid in vote_uuids:
+        vote_uuid = parse_vote_uuid(vote_uuid)
+        if vote_uuid is not None and vote_uuid not in votes:
+            try:
+                votes[vote_uuid] = get_vote_metadata(vote_uuid)
+            except Vote.DoesNotExist:
+                pass
+    return votes
+
+
+def load_session_entries(request, key):
+    """Lit la liste d'objets `key` d'un corps JSON de session ; renvoie None si elle est invalide."""
     try:
-        ballot = Ballot.objects.get(token=token, vote=vote_obj)
-    except Ballot.DoesNotExist:
-        ballot = Ballot(
-            token=token,
-            vote=vote_obj,
-            result=json_payload,
-            server_signature=signature_b64,
-        )
-        try:
-            ballot.save()
-        except ValueError as e:
-            return JsonResponse({"error": str(e)}, status=400)
-        created = True
-    else:
-        if ballot.result != json_payload or ballot.server_signature != signature_b64:
-            return JsonResponse({
-                "error": "Un bulletin avec ce jeton existe déjà mais son contenu ou sa signature diffèrent."
-            }, status=400)
-        created = False
+        entries = json.loads(request.body)[key]
+    # ValueError couvre aussi les corps qui ne sont pas en UTF-8 (UnicodeDecodeError)
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return None
+    return entries
+
+
+VOTE_NOT_FOUND = (404, {"error": "Vote introuvable"})
+INVALID_VOTE_UUID = (400, {"error": "UUID de vote invalide"})
+
+
+def session_public_keys(request):
+    """Expose en une seule requête les clés publiques de plusieurs votes (?vote=<uuid>&vote=<uuid>...)."""
+    vote_uuids = request.GET.getlist("vote")
+    # Chaque UUID inconnu coûte une requête : leur nombre est borné comme pour session_sign
+    if len(vote_uuids) > settings.VOTING_SESSION_MAX_VOTES:
+        return JsonResponse({
+            "error": f"Une session ne peut pas contenir plus de {settings.VOTING_SESSION_MAX_VOTES} votes."
+        }, status=400)
+    votes = get_votes_by_uuid(vote_uuids)
+    return JsonResponse({"keys": {vote_uuid: vote_meta.public_key_pem for vote_uuid, vote_meta in votes.items()}})
+
+
+@csrf_exempt
+@login_required
+def session_sign(request):
+    """
+    Signe en une seule requête les messages aveuglés de plusieurs votes.
+
+    Le corps est un JSON {"requests": [{"vote": <uuid>, "blinded_message": ...}, ...]} ; chaque
+    vote est traité indépendamment, avec la même idempotence que sign_blind_token.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    entries = load_session_entries(request, "requests")
+    if entries is None:
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if len(entries) > settings.VOTING_SESSION_MAX_VOTES:
+        return JsonResponse({
+            "error": f"Une session ne peut pas contenir plus de {settings.VOTING_SESSION_MAX_VOTES} votes."
+        }, status=400)
+
+    vote_uuids = [parse_vote_uuid(entry.get("vote")) for entry in entries]
+    votes = get_votes_by_uuid(vote_uuids)
+    results = []
+    for entry, vote_uuid in zip(entries, vote_uuids):
+        vote_meta = votes.get(vote_uuid)
+        if vote_uuid is None:
+            status_code, data = INVALID_VOTE_UUID
+        elif vote_meta is None:
+            status_code, data = VOTE_NOT_FOUND
+        else:
+            status_code, data = sign_for_voter(request.user, vote_meta, entry.get("blinded_message"))
+        results.append({"vote": entry.get("vote"), "status_code": status_code, **data})
+    return JsonResponse({"results": results})
+
+
+@csrf_exempt
+def session_submit(request):
+    """
+    Réceptionne en une seule requête les bulletins de plusieurs votes.
+
+    Le corps est un JSON {"ballots": [{"vote": <uuid>, "token": ..., "data": ..., "signature": ...}, ...]} ;
+    la réponse donne pour chaque bulletin le code et le contenu qu'aurait renvoyés submit_vote.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    entries = load_session_entries(request, "ballots")
+    if entries is None:
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if len(entries) > settings.VOTING_BATCH_MAX_BALLOTS:
+        return JsonResponse({
+            "error": f"Un lot ne peut pas contenir plus de {settings.VOTING_BATCH_MAX_BALLOTS} bulletins."
+        }, status=400)
+
+    vote_uuids = [parse_vote_uuid(entry.get("vote")) for entry in entries]
+    votes = get_votes_by_uuid(vote_uuids)
+    results = [VOTE_NOT_FOUND if vote_uuid else INVALID_VOTE_UUID for vote_uuid in vote_uuids]
+    indexes_by_vote = defaultdict(list)
+    for i, vote_uuid in enumerate(vote_uuids):
+        if vote_uuid in votes:
+            indexes_by_vote[vote_uuid].append(i)
+
+    # Chaque vote est enregistré indépendamment : un bulletin rejeté n'affecte pas les autres votes
+    for vote_uuid, indexes in indexes_by_vote.items():
+        vote_results = ingest_ballots(votes[vote_uuid], [entries[i] for i in indexes])
+        for i, result in zip(indexes, vote_results):
+            results[i] = result
 
-    status_code = 201 if created else 200
     return JsonResponse({
-        "status": "success",
-        "message": "Votre vote a été enregistré.",
-        "bulletin_id": token,
-        "is_new": created
-    }, status=status_code)
+        "results": [
+            {"vote": entry.get("vote"), "status_code": status_code, **data}
+            for entry, (status_code, data) in zip(entries, results)
+        ],
+    })
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -183,22 +330,89 @@ class HomepageView(View):
         return render(request, "home.html")
 
 
+def ballot_list_etag(request, vote_uuid, size=None):
+    if size is None:
+        size = board_version(get_vote_metadata_or_404(vote_uuid).id)
+    # La page HTML dépend aussi de l'utilisateur connecté (menu, jeton CSRF)
+    variant = "json" if is_xhr(request) else request.user.pk or 0
+    return f"{size}-{variant}"
+
+
+@method_decorator([
+    cache_control(private=True, no_cache=True),
+    vary_on_headers("X-Requested-With", "Accept"),
+    condition(etag_func=ballot_list_etag),
+], name="get")
 class BallotListView(ListView):
+    """
+    Liste des bulletins d'un vote, triés par jeton, paginée par curseur : ?after=<jeton> donne
+    la page suivant ce jeton, ?before=<jeton> la page le précédant. Contrairement à une
+    pagination par numéro de page, le coût d'une page ne dépend pas de sa position.
+    """
     model = Ballot
     context_object_name = "ballots"
     template_name = "voting/ballot_list.html"
+    page_size = 100
+
+    def get_queryset(self):
+        self.vote = get_vote_metadata_or_404(self.kwargs["vote_uuid"])
+        # Seuls les bulletins de la version de l'urne donnée par l'ETag : un bulletin pas encore
+        # numéroté changerait la page sans changer sa version
+        self.size = board_version(self.vote.id)
+        # Jetons comparés par points de code, quelle que soit la collation de la base
+        ballots = (
+            Ballot.objects.filter(vote_id=self.vote.id, sequence__lt=self.size)
+            .only("token").alias(sort_token=binary_collation("token"))
+        )
+        after = self.request.GET.get("after")
+        before = self.request.GET.get("before")
+
+        # Une ligne de plus que la page indique s'il existe une page au-delà
+        if before is not None:
+            page = list(ballots.filter(sort_token__lt=before).order_by("-sort_token")[:self.page_size + 1])[::-1]
+            self.has_previous, self.has_next = len(page) > self.page_size, True
+            page = page[-self.page_size:]
+        else:
+            if after is not None:
+                ballots = ballots.filter(sort_token__gt=after)
+            page = list(ballots.order_by("sort_token")[:self.page_size + 1])
+            self.has_previous, self.has_next = after is not None, len(page) > self.page_size
+            page = page[:self.page_size]
+        return page
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["vote"] = get_object_or_404(Vote, uuid=self.kwargs["vote_uuid"])
+        page = context["ballots"]
+        context["vote"] = self.vote
+        # Le nombre de bulletins est tenu à jour par l'arbre de Merkle : pas de COUNT(*)
+        context["ballot_count"] = self.size
+        context["next_cursor"] = page[-1].token if page and self.has_next else None
+        context["previous_cursor"] = page[0].token if page and self.has_previous else None
         return context
 
-    def get_queryset(self):
-        return Ballot.objects.filter(vote__uuid=self.kwargs["vote_uuid"])
+    def render_to_response(self, context, **response_kwargs):
+        if is_xhr(self.request):
+            response = JsonResponse({
+                "count": context["ballot_count"],
+                "ballots": [ballot.token for ballot in context["ballots"]],
+                "next": context["next_cursor"],
+                "previous": context["previous_cursor"],
+            })
+        else:
+            response = super().render_to_response(context, **response_kwargs)
+        # L'ETag est celui de la version de l'urne réellement lue (condition() ne le remplace pas)
+        response["ETag"] = quote_etag(ballot_list_etag(self.request, self.kwargs["vote_uuid"], self.size))
+        return response
 
 
+@redirect_to_snapshot(lambda request, token: f"ballots/{ballot_filename(token)}")
 def ballot_view(request, vote_uuid, token):
-    return HttpResponse(get_object_or_404(Ballot, vote__uuid=vote_uuid, token=token).result, content_type="application/json")
+    # L'identifiant du vote vient du cache de métadonnées : une seule requête, sans jointure
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    ballot = get_object_or_404(Ballot.objects.only("token", "result"), vote_id=vote_meta.id, token=token)
+    return immutable_response(
+        request, merkle.leaf_hash(ballot.token, ballot.result).hex(), ballot.result, "application/json"
+    )
 
 
 class VotesListView(ListView):
@@ -223,7 +437,7 @@ def submit_vote_view(request, vote_uuid):
         form = get_submit_vote_form(vote)
         form_spec = {
             "title": vote.name,
-            "can_vote": vote.can_vote(request.user),
+            "can_vote": get_vote_metadata(vote.uuid).can_vote(request.user),
             "fields": {},
             "field_order": [],
         }
@@ -249,12 +463,28 @@ def submit_vote_view(request, vote_uuid):
     return render(request, "voting/submit_vote.html", {"vote": vote, "form": get_submit_vote_form(vote)})
 
 
-def vote_hash(request, vote_uuid):
-    sha256 = hashlib.sha256()
-    qs = Ballot.objects.filter(vote__uuid=vote_uuid).order_by("token").annotate(
+def vote_hash_entries(vote_uuid, size):
+    """
+    Lignes "jeton:résultat" des `size` premiers bulletins d'un vote (ceux de la version `size` de
+    l'urne, voir board_version), triées par jeton, pour le calcul de vote_hash.
+
+    Le tri se fait par points de code (voir binary_collation), comme dans voting/verify.py.
+    """
+    return Ballot.objects.filter(vote__uuid=vote_uuid, sequence__lt=size).order_by(binary_collation("token")).annotate(
         entry=Concat(F("token"), Value(":"), F("result"), output_field=TextField())
     ).values_list("entry", flat=True)
 
+
+def vote_hash_digest(vote_uuid, size=None):
+    """
+    Empreinte SHA-256 des lignes "jeton:résultat" des `size` premiers bulletins du vote (par défaut,
+    ceux de la version actuelle de l'urne), séparées par des retours à la ligne.
+    """
+    if size is None:
+        size = board_version(get_vote_metadata_or_404(vote_uuid).id)
+    sha256 = hashlib.sha256()
+    qs = vote_hash_entries(vote_uuid, size)
+
     first = True
     # iterator() uses database cursor fetching in chunks
     for entry in qs.iterator():
@@ -264,15 +494,195 @@ def vote_hash(request, vote_uuid):
             sha256.update(b"\n")
         sha256.update(entry.encode("utf-8"))
 
-    return HttpResponse(sha256.hexdigest(), content_type="text/plain")
+    return sha256.hexdigest()
 
 
-def calculate_majority_judgment(vote_uuid):
-    from .models import Ballot
+@redirect_to_snapshot("hash.txt")
+@board_condition
+def vote_hash(request, vote_uuid):
+    # L'ETag est celui de la version de l'urne réellement lue, pas celle vue par board_condition
+    size = board_version(get_vote_metadata_or_404(vote_uuid).id)
+    response = HttpResponse(vote_hash_digest(vote_uuid, size), content_type="text/plain")
+    response["ETag"] = quote_etag(str(size))
+    return response
+
 
-    # 1. Extraire tous les bulletins
-    ballots = Ballot.objects.filter(vote__uuid=vote_uuid)
-    if not ballots.exists():
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+@redirect_to_snapshot(
+    lambda request, export_format: f"ballots.{export_format}"
+    if export_format in export.CONTENT_TYPES and "after" not in request.GET else None
+)
+def export_ballots(request, vote_uuid, export_format):
+    """
+    Export de tous les bulletins d'un vote (NDJSON ou CSV), envoyé au fil de la lecture.
+
+    ?after=<sequence> reprend un export interrompu après le dernier bulletin reçu (sans ligne
+    d'en-tête en CSV). La réponse est compressée à la volée si le client accepte gzip.
+    """
+    if export_format not in export.CONTENT_TYPES:
+        raise Http404("Format d'export inconnu")
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    try:
+        after = int(request.GET["after"]) if "after" in request.GET else None
+    except ValueError:
+        return JsonResponse({"error": "Le paramètre 'after' doit être un entier."}, status=400)
+
+    chunks = export.export_chunks(export.export_rows(vote_meta.id, after), export_format, header=after is None)
+    if ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+        response = StreamingHttpResponse(compress_sequence(chunks), content_type=export.CONTENT_TYPES[export_format])
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[export_format])
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response["Content-Disposition"] = f'attachment; filename="{vote_uuid}.{export_format}"'
+    return response
+
+
+@csrf_exempt
+def lookup_ballots(request, vote_uuid):
+    """
+    Vérifie en une requête la présence de nombreux bulletins dans l'urne (observateurs, assistance aux électeurs).
+
+    Le corps est un JSON {"tokens": [...]} ; la réponse, envoyée au fil de la lecture, donne pour
+    chaque jeton "found" et, si le bulletin est présent, son numéro, son résultat et sa signature.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"error": "Méthode non autorisée"}, status=405)
+
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    try:
+        tokens = json.loads(request.body)["tokens"]
+    # ValueError couvre aussi les corps qui ne sont pas en UTF-8 (UnicodeDecodeError)
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
+        return JsonResponse({"error": "Payload JSON invalide"}, status=400)
+    if len(tokens) > settings.VOTING_LOOKUP_MAX_TOKENS:
+        return JsonResponse({
+            "error": f"Une recherche ne peut pas porter sur plus de {settings.VOTING_LOOKUP_MAX_TOKENS} jetons."
+        }, status=400)
+
+    chunks = export.lookup_chunks(vote_meta.id, tokens)
+    if ACCEPTS_GZIP.search(request.headers.get("Accept-Encoding", "")):
+        response = StreamingHttpResponse(compress_sequence(chunks), content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = StreamingHttpResponse(chunks, content_type="application/json")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+HIGH_WATER_MARK_HEADER = "X-Ballot-High-Water-Mark"
+
+
+@board_condition
+def ballot_feed(request, vote_uuid):
+    """
+    Flux des bulletins d'un vote dans l'ordre d'arrivée, pour les miroirs de l'urne.
+
+    ?since=<n> renvoie les bulletins à partir du numéro n (le nombre de bulletins déjà reçus),
+    au plus ?limit=<nombre> et au plus VOTING_FEED_PAGE_SIZE. L'en-tête X-Ballot-High-Water-Mark
+    donne le nombre de bulletins de l'urne ; une fois à jour, un miroir n'a plus qu'à attendre
+    qu'il augmente (la requête conditionnelle renvoie alors un 304 en une seule requête SQL).
+    """
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    try:
+        since = int(request.GET.get("since", 0))
+        limit = int(request.GET.get("limit", settings.VOTING_FEED_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "Les paramètres 'since' et 'limit' doivent être des entiers."}, status=400)
+    if since < 0 or limit < 1:
+        return JsonResponse({"error": "Les paramètres 'since' et 'limit' doivent être positifs."}, status=400)
+
+    # Tous les bulletins dont le numéro est inférieur au nombre de bulletins de l'arbre sont
+    # enregistrés : la page ne peut pas avoir de trou
+    high_water_mark = board_version(vote_meta.id)
+    end = min(since + min(limit, settings.VOTING_FEED_PAGE_SIZE), high_water_mark)
+    ballots = [
+        dict(zip(export.EXPORT_FIELDS, row))
+        for row in export.export_rows(vote_meta.id, after=since - 1, before=end)
+    ] if since < end else []
+
+    response = JsonResponse({
+        "since": since,
+        "next": since + len(ballots),
+        "high_water_mark": high_water_mark,
+        "ballots": ballots,
+    })
+    response[HIGH_WATER_MARK_HEADER] = str(high_water_mark)
+    return response
+
+
+@redirect_to_snapshot("token-filter.bin")
+def token_filter(request, vote_uuid):
+    """
+    Redirige vers la dernière version du filtre des jetons du vote (voir token_filter.py).
+
+    Le filtre est construit hors des requêtes, par la commande update_token_filters : il peut
+    ne pas contenir les tout derniers bulletins, ce qu'indique sa taille.
+    """
+    size = TokenFilter.objects.filter(vote_id=get_vote_metadata_or_404(vote_uuid).id).values_list("size", flat=True).first()
+    if size is None:
+        raise Http404("Le filtre des jetons de ce vote n'a pas encore été construit")
+    etag = quote_etag(str(size))
+    response = get_conditional_response(request, etag=etag) or redirect("token_filter_version", vote_uuid=vote_uuid, size=size)
+    return patch_board_response(response, etag)
+
+
+def token_filter_version(request, vote_uuid, size):
+    """
+    Filtre des jetons des `size` premiers bulletins du vote.
+
+    Son contenu ne dépend que de ces bulletins : il peut être gardé indéfiniment en cache.
+    Une version qui n'est plus (ou pas encore) disponible redirige vers la version à jour.
+    """
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    data = TokenFilter.objects.filter(vote_id=vote_meta.id, size=size).values_list("data", flat=True).first()
+    if data is None:
+        return redirect("token_filter", vote_uuid=vote_uuid)
+    return immutable_response(request, str(size), bytes(data), "application/octet-stream")
+
+
+def get_merkle_tree(vote_id):
+    """Arbre de Merkle d'un vote (un arbre vide si aucun bulletin n'a encore été déposé)."""
+    return MerkleTree.objects.filter(vote_id=vote_id).first() or MerkleTree(vote_id=vote_id)
+
+
+@redirect_to_snapshot("merkle-root.json")
+@board_condition
+def merkle_root(request, vote_uuid):
+    """Racine de l'arbre de Merkle des bulletins du vote, et nombre de bulletins qu'il contient."""
+    tree = get_merkle_tree(get_vote_metadata_or_404(vote_uuid).id)
+    return JsonResponse({"size": tree.size, "root": bytes(tree.root).hex()})
+
+
+@redirect_to_snapshot(lambda request, token: f"proofs/{ballot_filename(token)}")
+def ballot_proof(request, vote_uuid, token):
+    """
+    Preuve d'inclusion d'un bulletin dans l'arbre de Merkle du vote.
+
+    Le client recalcule la racine à partir de l'empreinte de sa feuille et des empreintes
+    de "path" (de la feuille vers la racine, voir merkle.verify_inclusion).
+    """
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    ballot = get_object_or_404(Ballot, vote_id=vote_meta.id, token=token, sequence__isnull=False)
+    # L'arbre est lu après le bulletin : il le contient forcément
+    tree = get_merkle_tree(vote_meta.id)
+    return JsonResponse({
+        "token": ballot.token,
+        "sequence": ballot.sequence,
+        "size": tree.size,
+        "root": bytes(tree.root).hex(),
+        "leaf": merkle.leaf_hash(ballot.token, ballot.result).hex(),
+        "path": [digest.hex() for digest in tree.inclusion_proof(ballot.sequence)],
+    })
+
+
+def calculate_majority_judgment(vote_uuid):
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    if not board_version(vote_meta.id):
         return None
 
     # Définition des mentions dans l'ordre décroissant
@@ -286,10 +696,11 @@ def calculate_majority_judgment(vote_uuid):
     # { 'Nom Candidat': ['Très Bien', 'Passable', ...] }
     results_map = defaultdict(Counter)
 
-    for b in ballots:
-        data = b.result["persons"]
-        for candidate, grade in data.items():
-            results_map[candidate][grade] += 1
+    # 1. Lire les compteurs du vote (voir tally.py) : une ligne par (candidat, mention), quel que
+    # soit le nombre de bulletins
+    for (candidate, grade), count in TallyCounter.get_counts(vote_meta.id).items():
+        if candidate != tally.CHOICE:
+            results_map[candidate][int(grade)] += count
 
     final_scores = []
 
@@ -356,14 +767,48 @@ def calculate_majority_judgment(vote_uuid):
     return final_scores
 
 
+def calculate_choice_results(vote_uuid):
+    """Nombre et pourcentage de oui, non et ne sait pas d'un ChoiceVote, lus dans ses compteurs."""
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
+    if not board_version(vote_meta.id):
+        return None
+
+    counts = {
+        grade: count
+        for (candidate, grade), count in TallyCounter.get_counts(vote_meta.id).items()
+        if candidate == tally.CHOICE
+    }
+    total_votes = sum(counts.values())
+    if not total_votes:
+        return None
+
+    # Mentions dans l'ordre d'affichage (voir tally.ballot_tally)
+    CHOICES = {"true": _("Yes"), "false": _("No"), "null": _("Don't know")}
+    return {
+        'total': total_votes,
+        'choices': [
+            {
+                'value': value,
+                'label': label,
+                'count': counts.get(value, 0),
+                'percentage': round(counts.get(value, 0) / total_votes * 100, 2),
+            }
+            for value, label in CHOICES.items()
+        ],
+    }
+
+
+@redirect_to_snapshot("results.html")
 def vote_results(request, vote_uuid):
-    vote_obj = get_object_or_404(Vote, uuid=vote_uuid)
+    vote_meta = get_vote_metadata_or_404(vote_uuid)
 
     results = calculate_majority_judgment(vote_uuid)
+    choice_results = calculate_choice_results(vote_uuid)
 
     return render(request, 'voting/results.html', {
-        'vote': vote_obj,
-        'results': results
+        'vote': vote_meta,
+        'results': results,
+        'choice_results': choice_results,
     })
 
 